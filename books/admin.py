@@ -1,10 +1,13 @@
 """Admin configuration for the books app."""
 from django.contrib import admin
 from django_summernote.admin import SummernoteModelAdmin
-from .models import CustomUser, Book, Review, Comment
+from .models import CustomUser, Book, Review, Comment, Genre, Job, Volume
 
 # Register your models here.
 admin.site.register(CustomUser, SummernoteModelAdmin)
-admin.site.register(Book, SummernoteModelAdmin)
+admin.site.register(Volume, SummernoteModelAdmin)
+admin.site.register(Book)
 admin.site.register(Review, SummernoteModelAdmin)
 admin.site.register(Comment, SummernoteModelAdmin)
+admin.site.register(Genre)
+admin.site.register(Job)
@@ -0,0 +1,83 @@
+"""
+Helpers for the view benchmarks (``manage.py bench_views``) and load tests.
+
+Results are plain JSON so runs from different commits can be compared with
+``compare``, which flags regressions beyond a relative threshold.
+"""
+
+import json
+import statistics
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List
+
+
+def start_stub_upstream(delay: float) -> ThreadingHTTPServer:
+    """Serve a canned Google Books volumes response after ``delay`` seconds."""
+    body = json.dumps(
+        {
+            "items": [
+                {"id": "stub", "volumeInfo": {"title": "Stub Book", "authors": ["A"]}}
+            ]
+        }
+    ).encode()
+
+    class StubHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):  # pylint: disable=invalid-name
+            time.sleep(delay)
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Return the ``pct`` percentile of ``values`` (nearest rank)."""
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(latencies: List[float], queries: List[int]) -> Dict:
+    """Summarize one scenario's latencies (seconds) and query counts."""
+    return {
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 2),
+        "queries": max(queries),
+    }
+
+
+def compare(results: Dict, baseline: Dict, threshold: float) -> List[str]:
+    """
+    List the regressions of ``results`` against ``baseline``.
+
+    A scenario regresses when its p95 latency grows by more than
+    ``threshold`` (a fraction, e.g. 0.25), or when it runs more queries.
+    """
+    regressions = []
+    for name, before in baseline.get("scenarios", {}).items():
+        after = results["scenarios"].get(name)
+        if after is None:
+            continue
+        if after["p95_ms"] > before["p95_ms"] * (1 + threshold):
+            regressions.append(
+                f"{name}: p95 {before['p95_ms']} ms -> {after['p95_ms']} ms"
+            )
+        if after["queries"] > before["queries"]:
+            regressions.append(
+                f"{name}: queries {before['queries']} -> {after['queries']}"
+            )
+    return regressions
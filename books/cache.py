@@ -0,0 +1,121 @@
+"""
+Read-through result cache for upstream API responses.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Tuple
+
+from django.conf import settings
+from django.core.cache import caches
+
+_MISSING = object()
+
+
+class ResultCache:
+    """
+    TTL-bounded, size-bounded LRU cache on top of a Django cache backend.
+
+    Values live in the configured cache alias (in-process, file-based or
+    database-backed), so expiry is handled by the backend. The cache also
+    keeps an in-process index of the keys it wrote, in least-recently-used
+    order, and deletes the oldest ones once ``max_entries`` is exceeded.
+    """
+
+    def __init__(
+        self,
+        alias: str = "default",
+        prefix: str = "results",
+        timeout: int = 3600,
+        negative_timeout: int = 60,
+        max_entries: int = 1000,
+    ):
+        self.alias = alias
+        self.prefix = prefix
+        self.timeout = timeout
+        self.negative_timeout = negative_timeout
+        self.max_entries = max_entries
+        self._keys = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "evictions": 0}
+
+    @classmethod
+    def from_settings(cls, prefix: str) -> "ResultCache":
+        """Build a cache from the ``GOOGLE_BOOKS_CACHE`` setting."""
+        options = getattr(settings, "GOOGLE_BOOKS_CACHE", {})
+        return cls(
+            alias=options.get("ALIAS", "default"),
+            prefix=prefix,
+            timeout=options.get("TIMEOUT", 3600),
+            negative_timeout=options.get("NEGATIVE_TIMEOUT", 60),
+            max_entries=options.get("MAX_ENTRIES", 1000),
+        )
+
+    @property
+    def backend(self):
+        """The Django cache backend the values are stored in."""
+        return caches[self.alias]
+
+    def make_key(self, *parts: Any) -> str:
+        """
+        Build a cache key from normalized lookup parts.
+
+        Strings are stripped, lower-cased and have inner whitespace
+        collapsed, so trivially different spellings share an entry.
+        """
+        normalized = []
+        for part in parts:
+            if isinstance(part, str):
+                part = " ".join(part.split()).lower()
+            normalized.append("" if part is None else str(part))
+        digest = hashlib.sha256("\x1f".join(normalized).encode("utf-8")).hexdigest()
+        return f"{self.prefix}:{digest}"
+
+    def get(self, key: str) -> Tuple[bool, Any]:
+        """
+        Look up a key.
+
+        Returns:
+            A ``(hit, value)`` tuple; ``value`` is None on a miss
+        """
+        value = self.backend.get(key, _MISSING)
+        with self._lock:
+            if value is _MISSING:
+                self._counters["misses"] += 1
+                self._keys.pop(key, None)
+                return False, None
+            self._counters["hits"] += 1
+            self._keys[key] = True
+            self._keys.move_to_end(key)
+        return True, value
+
+    def set(self, key: str, value: Any, negative: bool = False):
+        """
+        Store a value, using the short negative TTL for empty results.
+        """
+        timeout = self.negative_timeout if negative else self.timeout
+        self.backend.set(key, value, timeout)
+        evicted = []
+        with self._lock:
+            self._keys[key] = True
+            self._keys.move_to_end(key)
+            while len(self._keys) > self.max_entries:
+                oldest, _ = self._keys.popitem(last=False)
+                evicted.append(oldest)
+            self._counters["evictions"] += len(evicted)
+        if evicted:
+            self.backend.delete_many(evicted)
+
+    def clear(self):
+        """Remove every entry written by this cache and reset its index."""
+        with self._lock:
+            keys = list(self._keys)
+            self._keys.clear()
+        if keys:
+            self.backend.delete_many(keys)
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit/miss/eviction counters and the current entry count."""
+        with self._lock:
+            return {**self._counters, "entries": len(self._keys)}
@@ -0,0 +1,8 @@
+"""Template context processors for the books app."""
+
+from django.conf import settings
+
+
+def fragment_cache(request):
+    """Expose the fragment cache timeout to ``{% cache %}`` tags."""
+    return {"FRAGMENT_CACHE_TIMEOUT": settings.FRAGMENT_CACHE_TIMEOUT}
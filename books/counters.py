@@ -0,0 +1,56 @@
+"""
+Denormalized per-user shelf counters.
+
+``CustomUser.book_count`` and ``CustomUser.last_book_added_at`` let the
+shelves page order and filter users with an indexed single-table query
+instead of a GROUP BY over every book. They are updated atomically with
+F-expressions as books are added and removed, and can be rebuilt from the
+Book table with ``manage.py recompute_shelf_counters``.
+"""
+
+from typing import Iterable, Optional
+
+from django.db.models import Count, DateTimeField, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import Book, CustomUser
+
+
+def book_added(user_id: int, added_on, count: int = 1):
+    """Record ``count`` new books on a user's shelf, the newest added at ``added_on``."""
+    added_on = Value(added_on, output_field=DateTimeField())
+    CustomUser.objects.filter(pk=user_id).update(
+        book_count=F("book_count") + count,
+        last_book_added_at=Greatest(Coalesce("last_book_added_at", added_on), added_on),
+    )
+
+
+def book_removed(user_id: int, count: int = 1):
+    """Record books removed from a user's shelf, refreshing the latest addition."""
+    latest = Book.objects.filter(user=OuterRef("pk")).order_by("-id")
+    CustomUser.objects.filter(pk=user_id).update(
+        book_count=Greatest(F("book_count") - count, 0),
+        last_book_added_at=Subquery(latest.values("added_on")[:1]),
+    )
+
+
+def recompute_shelf_counters(user_ids: Optional[Iterable[int]] = None) -> int:
+    """
+    Rebuild the counters from the Book table to repair any drift.
+
+    Args:
+        user_ids: Only recompute these users (all users when None)
+
+    Returns:
+        Number of users updated
+    """
+    users = CustomUser.objects.all()
+    if user_ids is not None:
+        users = users.filter(pk__in=list(user_ids))
+    shelf = Book.objects.filter(user=OuterRef("pk")).order_by()
+    counts = shelf.values("user").annotate(total=Count("id")).values("total")
+    latest = shelf.order_by("-id").values("added_on")[:1]
+    return users.update(
+        book_count=Coalesce(Subquery(counts), 0),
+        last_book_added_at=Subquery(latest),
+    )
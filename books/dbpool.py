@@ -0,0 +1,81 @@
+"""
+Database connection statistics for the staff-only pool stats endpoint.
+
+Connections are either pooled (``DATABASE_POOL``: psycopg 3's pool, shared by
+the threads of a process), persistent (each thread keeps its connection for
+``CONN_MAX_AGE`` seconds) or opened per request. The figures are per worker
+process, like the connections themselves.
+"""
+
+import threading
+import time
+from typing import Dict
+
+from django.db import connections
+
+_lock = threading.Lock()
+_connects = {"count": 0}
+
+
+def connection_opened():
+    """Count a Django connect: a new connection, or a pool checkout."""
+    with _lock:
+        _connects["count"] += 1
+
+
+def _pool_stats(pool) -> Dict:
+    raw = pool.get_stats()
+    requests = raw.get("requests_num", 0)
+    return {
+        "min_size": pool.min_size,
+        "max_size": pool.max_size,
+        "size": raw.get("pool_size", 0),
+        "available": raw.get("pool_available", 0),
+        "waiting": raw.get("requests_waiting", 0),
+        "checkouts": requests,
+        "checkout_ms_avg": (
+            round(raw.get("requests_wait_ms", 0) / requests, 2) if requests else 0.0
+        ),
+        "checkout_errors": raw.get("requests_errors", 0),
+        "bad_returns": raw.get("returns_bad", 0),
+        "connections_opened": raw.get("connections_num", 0),
+        "connections_lost": raw.get("connections_lost", 0),
+    }
+
+
+def stats(alias: str = "default") -> Dict:
+    """
+    Return connection settings and statistics of this process.
+
+    ``probe_ms`` is the time to get a connection and run ``SELECT 1`` now,
+    the latency a request pays before its first query.
+    """
+    connection = connections[alias]
+    started = time.perf_counter()
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1")
+    probe_ms = round((time.perf_counter() - started) * 1000, 2)
+
+    # Only the PostgreSQL backend has a pool, and only with OPTIONS["pool"]
+    pool = getattr(connection, "pool", None)
+    max_age = connection.settings_dict["CONN_MAX_AGE"]
+    if pool is not None:
+        mode = "pool"
+    elif max_age is None or max_age > 0:
+        mode = "persistent"
+    else:
+        mode = "per_request"
+    with _lock:
+        connects = _connects["count"]
+    result = {
+        "alias": alias,
+        "vendor": connection.vendor,
+        "mode": mode,
+        "conn_max_age": max_age,
+        "health_checks": connection.settings_dict["CONN_HEALTH_CHECKS"],
+        "connects": connects,
+        "probe_ms": probe_ms,
+    }
+    if pool is not None:
+        result["pool"] = _pool_stats(pool)
+    return result
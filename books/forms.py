@@ -1,7 +1,8 @@
 """Forms for the books app."""
 
 from django import forms
-from .models import Book, Review, Comment, CustomUser
+from django.conf import settings
+from .models import Review, Comment, CustomUser, Volume
 
 
 class BookSearchForm(forms.Form):
@@ -40,10 +41,10 @@ class BookSelectionForm(forms.Form):
 
 
 class BookForm(forms.ModelForm):
-    """Form for adding or editing a book with all fields."""
+    """Form for adding or editing a book's volume details."""
 
     class Meta:
-        model = Book
+        model = Volume
         fields = ["title", "author", "published", "genres", "description", "cover"]
         # Commented out for simplified version
         # 'google_books_id', 'isbn', 'publisher', 'page_count', 'rating']
@@ -110,3 +111,29 @@ class UserProfileForm(forms.ModelForm):
                 attrs={"class": "form-control", "accept": "image/*"}
             ),
         }
+
+
+class LibraryImportForm(forms.Form):
+    """Form for uploading a CSV or Goodreads export to add to the shelf."""
+
+    file = forms.FileField(
+        label="CSV file",
+        widget=forms.FileInput(attrs={"class": "form-control", "accept": ".csv"}),
+    )
+
+    def clean_file(self):
+        """Check the upload's size and header line; the rows are parsed by the job."""
+        upload = self.cleaned_data["file"]
+        if upload.size > settings.BOOK_IMPORT["MAX_UPLOAD_BYTES"]:
+            raise forms.ValidationError("The file is too large to import.")
+        upload.seek(0)
+        try:
+            header = upload.readline().decode("utf-8-sig").lower()
+        except UnicodeDecodeError as e:
+            raise forms.ValidationError("The file must be UTF-8 encoded CSV.") from e
+        finally:
+            upload.seek(0)
+        if "title" not in header and "isbn" not in header:
+            raise forms.ValidationError("The file needs a Title or ISBN column.")
+        self.cleaned_data["filename"] = upload.name
+        return upload
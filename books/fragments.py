@@ -0,0 +1,72 @@
+"""
+Version keys for cached template fragments.
+
+Each cached shelf fragment is keyed on a single version number: the owning
+user's for shelf cards and the "more from this shelf" block, the book's for
+book cards. Saving or deleting a Book, Volume or CustomUser bumps the
+relevant versions (see ``books.signals``), so stale fragments are never
+looked up again and simply expire.
+"""
+
+import time
+from typing import Dict, Iterable
+
+from django.conf import settings
+from django.core.cache import caches
+
+from .models import Book
+
+
+def _cache():
+    return caches[settings.FRAGMENT_CACHE_ALIAS]
+
+
+def _key(kind: str, pk: int) -> str:
+    return f"fragment-version:{kind}:{pk}"
+
+
+def _fresh_version() -> int:
+    # Time-based, so a version lost to eviction never reuses an old number
+    return time.time_ns() // 1000
+
+
+def versions(kind: str, pks: Iterable[int]) -> Dict[int, int]:
+    """
+    Return the current version of each object, in one cache round-trip.
+
+    Args:
+        kind: "user" or "book"
+        pks: Primary keys of the objects
+
+    Returns:
+        Mapping of primary key to version number
+    """
+    pks = list(dict.fromkeys(pks))
+    keys = {_key(kind, pk): pk for pk in pks}
+    found = _cache().get_many(keys)
+    missing = {key: _fresh_version() for key in keys if key not in found}
+    if missing:
+        _cache().set_many(missing, timeout=None)
+        found.update(missing)
+    return {keys[key]: version for key, version in found.items()}
+
+
+def version(kind: str, pk: int) -> int:
+    """Return the current version of a single object."""
+    return versions(kind, [pk])[pk]
+
+
+def bump(kind: str, pk: int):
+    """Invalidate every fragment keyed on this object's version."""
+    try:
+        _cache().incr(_key(kind, pk))
+    except ValueError:
+        _cache().set(_key(kind, pk), _fresh_version(), timeout=None)
+
+
+def bump_volume(volume_id: int):
+    """Invalidate the cards of every shelf entry of a volume, and their shelves."""
+    shelved = Book.objects.filter(volume_id=volume_id).values_list("id", "user_id")
+    for book_id, user_id in shelved:
+        bump("book", book_id)
+        bump("user", user_id)
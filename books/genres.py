@@ -0,0 +1,69 @@
+"""
+Helpers for parsing genre strings and tagging volumes with Genre rows.
+"""
+
+from typing import Iterable, List
+
+from django.utils.text import slugify
+
+from .models import Genre, Volume
+
+
+def parse_genres(value: str) -> List[str]:
+    """
+    Split a comma-joined genre string into clean, de-duplicated names.
+
+    Args:
+        value: Genres as stored on ``Volume.genres``, e.g. "Fiction, Fantasy"
+
+    Returns:
+        Genre names in their original order, without empty or repeated entries
+    """
+    names = {}
+    for name in (value or "").split(","):
+        name = " ".join(name.split())
+        slug = slugify(name)
+        if slug and slug not in names:
+            names[slug] = name[:100]
+    return list(names.values())
+
+
+def upsert_genres(names: Iterable[str]) -> List[Genre]:
+    """
+    Fetch or create Genre rows for the given names in two queries.
+
+    Args:
+        names: Genre display names
+
+    Returns:
+        The matching Genre instances
+    """
+    by_slug = {slugify(name)[:120]: name for name in names if slugify(name)}
+    if not by_slug:
+        return []
+    Genre.objects.bulk_create(
+        [Genre(name=name, slug=slug) for slug, name in by_slug.items()],
+        ignore_conflicts=True,
+    )
+    return list(Genre.objects.filter(slug__in=by_slug))
+
+
+def set_volume_genres(volume, value: str):
+    """Tag a saved volume with the genres in a comma-joined genre string."""
+    volume.genre_tags.set(upsert_genres(parse_genres(value)))
+
+
+def tag_volumes(volumes: Iterable[Volume]):
+    """Tag many saved volumes with their genre strings in three queries."""
+    names = {volume.pk: parse_genres(volume.genres) for volume in volumes}
+    genres = upsert_genres({name for value in names.values() for name in value})
+    by_slug = {genre.slug: genre.pk for genre in genres}
+    Through = Volume.genre_tags.through
+    Through.objects.bulk_create(
+        [
+            Through(volume_id=volume_id, genre_id=by_slug[slugify(name)[:120]])
+            for volume_id, value in names.items()
+            for name in value
+        ],
+        ignore_conflicts=True,
+    )
@@ -0,0 +1,124 @@
+"""
+Shared HTTP session factory for upstream API clients.
+"""
+
+import random
+from typing import Dict, Optional, Tuple
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import MaxRetryError, ResponseError
+from urllib3.util.retry import Retry
+
+from .timing import timed
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class JitteredRetry(Retry):
+    """
+    Retry policy that adds random jitter to the exponential backoff.
+
+    A Retry-After longer than ``max_retry_after`` seconds ends the retries
+    instead of blocking the worker, and the response is returned as is.
+    """
+
+    def __init__(
+        self,
+        *args,
+        backoff_jitter: float = 0.0,
+        max_retry_after: Optional[float] = None,
+        **kwargs,
+    ):
+        self.backoff_jitter = backoff_jitter
+        self.max_retry_after = max_retry_after
+        super().__init__(*args, **kwargs)
+
+    def new(self, **kwargs):
+        kwargs.setdefault("backoff_jitter", self.backoff_jitter)
+        kwargs.setdefault("max_retry_after", self.max_retry_after)
+        return super().new(**kwargs)
+
+    def increment(self, method=None, url=None, response=None, *args, **kwargs):
+        if (
+            response is not None
+            and self.max_retry_after is not None
+            and self.respect_retry_after_header
+            and (self.get_retry_after(response) or 0) > self.max_retry_after
+        ):
+            # Like running out of retries, so the pool returns the response
+            raise MaxRetryError(
+                kwargs.get("_pool"), url, ResponseError("Retry-After over the cap")
+            )
+        return super().increment(method, url, response, *args, **kwargs)
+
+    def get_backoff_time(self):
+        backoff = super().get_backoff_time()
+        if backoff <= 0 or not self.backoff_jitter:
+            return backoff
+        return backoff + random.uniform(0, self.backoff_jitter)
+
+
+class TimedHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter that reports the time spent on its requests, retries included."""
+
+    def __init__(self, *args, metric: str = "google", **kwargs):
+        self.metric = metric
+        super().__init__(*args, **kwargs)
+
+    def send(self, request, *args, **kwargs):  # pylint: disable=arguments-differ
+        with timed(self.metric):
+            return super().send(request, *args, **kwargs)
+
+
+def http_options() -> Dict:
+    """Return the ``GOOGLE_BOOKS_HTTP`` setting merged with defaults."""
+    options = {
+        "POOL_CONNECTIONS": 4,
+        "POOL_MAXSIZE": 10,
+        "CONNECT_TIMEOUT": 3.05,
+        "READ_TIMEOUT": 10,
+        "RETRIES": 3,
+        "BACKOFF_FACTOR": 0.3,
+        "BACKOFF_JITTER": 0.2,
+        "MAX_RETRY_AFTER": 30,
+    }
+    options.update(getattr(settings, "GOOGLE_BOOKS_HTTP", {}))
+    return options
+
+
+def http_timeout() -> Tuple[float, float]:
+    """Return the ``(connect, read)`` timeout pair for upstream requests."""
+    options = http_options()
+    return options["CONNECT_TIMEOUT"], options["READ_TIMEOUT"]
+
+
+def build_session() -> requests.Session:
+    """
+    Build a keep-alive session with a bounded connection pool.
+
+    Idempotent requests are retried with jittered exponential backoff on
+    connection errors and on 429/5xx responses, honouring Retry-After up to
+    ``MAX_RETRY_AFTER`` seconds.
+    """
+    options = http_options()
+    retry = JitteredRetry(
+        total=options["RETRIES"],
+        backoff_factor=options["BACKOFF_FACTOR"],
+        backoff_jitter=options["BACKOFF_JITTER"],
+        status_forcelist=RETRY_STATUSES,
+        respect_retry_after_header=True,
+        max_retry_after=options["MAX_RETRY_AFTER"],
+        raise_on_status=False,
+    )
+    adapter = TimedHTTPAdapter(
+        pool_connections=options["POOL_CONNECTIONS"],
+        pool_maxsize=options["POOL_MAXSIZE"],
+        pool_block=True,
+        max_retries=retry,
+    )
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
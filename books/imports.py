@@ -0,0 +1,316 @@
+"""
+Bulk import of a reading list (a plain CSV or a Goodreads export) to a shelf.
+
+Rows are read lazily from the uploaded file, in batches. Each batch is first resolved against the
+volumes already in the catalog (by ISBN, then by title and author), and
+only the rest are looked up on Google Books, concurrently but rate limited.
+New volumes and shelf entries are then written with ``bulk_create``.
+"""
+
+import csv
+import io
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from itertools import islice
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+from django.conf import settings
+from django.db.models import Q
+from django.db.models.functions import Lower
+from django.utils import timezone
+
+from . import fragments, recommendations, search, suggest
+from .counters import recompute_shelf_counters
+from .genres import tag_volumes
+from .models import Book, CustomUser, LibraryImport, Volume
+from .services import GoogleBooksService
+from .tasks import enqueue_many
+from .volumes import parse_published
+
+# Header names (lower-cased) accepted for each field, in order of preference
+COLUMNS = {
+    "title": ("title", "book title", "name"),
+    "author": ("author", "authors", "author l-f"),
+    "isbn": ("isbn13", "isbn", "isbn10"),
+}
+
+# Goodreads appends the series to titles, e.g. "Dune (Dune Chronicles, #1)"
+SERIES_RE = re.compile(r"\s*\([^()]*#\s*[\d.]+\)\s*$")
+
+
+@dataclass
+class ImportProgress:
+    """Running totals of an import."""
+
+    processed: int = 0
+    added: int = 0
+    duplicates: int = 0
+    not_found: int = 0
+    # Rows another request shelved while the import was running
+    skipped: int = 0
+
+
+class RateLimiter:
+    """Spaces calls at least ``1 / rate`` seconds apart, across threads."""
+
+    def __init__(self, rate: float):
+        self.interval = 1 / rate if rate else 0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        """Block until the next call is allowed."""
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next)
+            self._next = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+
+def clean_isbn(value: Optional[str]) -> str:
+    """Strip Goodreads' ``="..."`` quoting and any separators from an ISBN."""
+    isbn = re.sub(r"[^0-9Xx]", "", value or "").upper()
+    return isbn if len(isbn) in (10, 13) else ""
+
+
+def read_rows(lines: Iterable[str]) -> Iterator[Dict[str, str]]:
+    """
+    Parse CSV lines into ``title``/``author``/``isbn`` dictionaries, lazily.
+
+    Rows without a title or an ISBN are skipped.
+
+    Args:
+        lines: Text lines, e.g. an open file or a ``StringIO``
+    """
+    reader = csv.DictReader(lines)
+    headers = {name.strip().lower(): name for name in reader.fieldnames or []}
+    columns = {
+        field: next((headers[h] for h in names if h in headers), None)
+        for field, names in COLUMNS.items()
+    }
+    for row in reader:
+        title = SERIES_RE.sub("", (row.get(columns["title"]) or "").strip())
+        isbn = clean_isbn(row.get(columns["isbn"]))
+        if title or isbn:
+            yield {
+                "title": title,
+                "author": (row.get(columns["author"]) or "").strip(),
+                "isbn": isbn,
+            }
+
+
+def _identity(title: str, author: str):
+    return (title.lower(), author.lower())
+
+
+def _find_local(rows: List[Dict]) -> Dict[int, Volume]:
+    """Match rows to known volumes in two queries, keyed by row index."""
+    isbns = {row["isbn"] for row in rows if row["isbn"]}
+    by_isbn = {v.isbn: v for v in Volume.objects.filter(isbn__in=isbns)}
+    found = {
+        i: by_isbn[row["isbn"]] for i, row in enumerate(rows) if row["isbn"] in by_isbn
+    }
+
+    # Compared through Lower() so the lookup can use volume_title_author_idx
+    wanted = Q()
+    for i, row in enumerate(rows):
+        if i not in found and row["title"] and row["author"]:
+            wanted |= Q(
+                lower_title=row["title"].lower(), lower_author=row["author"].lower()
+            )
+    if wanted:
+        candidates = Volume.objects.alias(
+            lower_title=Lower("title"), lower_author=Lower("author")
+        ).filter(wanted)
+        by_identity = {_identity(v.title, v.author): v for v in candidates}
+        for i, row in enumerate(rows):
+            volume = by_identity.get(_identity(row["title"], row["author"]))
+            if i not in found and volume is not None:
+                found[i] = volume
+    return found
+
+
+def _lookup(row: Dict, limiter: RateLimiter) -> Optional[Dict]:
+    """Find a row on Google Books, by ISBN if it has one."""
+    book = None
+    if row["isbn"]:
+        limiter.wait()
+        book = GoogleBooksService.find_by_isbn(row["isbn"])
+    if book is None and row["title"]:
+        limiter.wait()
+        books = GoogleBooksService.search_books(
+            row["title"], row["author"], max_results=1
+        )
+        book = books[0] if books else None
+    # Volumes are deduplicated on their Google ID, so a result needs one
+    return book if book and book.get("google_books_id") else None
+
+
+def _create_volumes(results: List[Dict]) -> Dict[str, Volume]:
+    """Fetch or bulk-create the volumes for Google results, keyed by Google ID."""
+    results = {book["google_books_id"]: book for book in results}
+    volumes = {
+        v.google_books_id: v for v in Volume.objects.filter(google_books_id__in=results)
+    }
+    new = [
+        Volume(
+            google_books_id=google_books_id,
+            title=book["title"][:200],
+            author=book["author"][:100],
+            isbn=(book.get("isbn") or "")[:20],
+            description=book.get("description", ""),
+            genres=book.get("genres", "")[:300],
+            published=parse_published(book.get("published")),
+            cover_pending=bool(book.get("cover_url")),
+        )
+        for google_books_id, book in results.items()
+        if google_books_id not in volumes
+    ]
+    if not new:
+        return volumes
+
+    # Another import may create the same volumes meanwhile, so ignore
+    # conflicts and read back what was actually stored. The steps below are
+    # idempotent, so it doesn't matter which of them did the insert.
+    Volume.objects.bulk_create(new, ignore_conflicts=True)
+    created = list(
+        Volume.objects.filter(google_books_id__in=[v.google_books_id for v in new])
+    )
+    tag_volumes(created)
+    search.index_volumes([v.pk for v in created])
+    suggest.add_volumes(created)
+    enqueue_many(
+        "import_volume_cover",
+        (
+            (
+                {"volume_id": volume.pk, "cover_url": cover_url},
+                f"cover:volume:{volume.pk}",
+            )
+            for volume in created
+            if volume.cover_pending
+            and (cover_url := results[volume.google_books_id].get("cover_url"))
+        ),
+    )
+    volumes.update({v.google_books_id: v for v in created})
+    return volumes
+
+
+def import_rows(
+    user: CustomUser,
+    rows: Iterable[Dict],
+    progress: Callable[[ImportProgress], None] = None,
+) -> ImportProgress:
+    """
+    Add every row to the user's shelf, skipping books already on it.
+
+    Args:
+        user: Owner of the shelf
+        rows: Dictionaries as produced by ``read_rows``
+        progress: Called with the running totals after each batch
+
+    Returns:
+        The final totals
+    """
+    options = settings.BOOK_IMPORT
+    limiter = RateLimiter(options["RATE_LIMIT"])
+    totals = ImportProgress()
+    shelved = {
+        _identity(title, author)
+        for title, author in Book.objects.filter(user=user).values_list(
+            "title", "author"
+        )
+    }
+
+    rows = iter(rows)
+    with ThreadPoolExecutor(max_workers=options["WORKERS"]) as executor:
+        while batch := list(islice(rows, options["BATCH_SIZE"])):
+            volumes = _find_local(batch)
+            missing = [i for i in range(len(batch)) if i not in volumes]
+            results = dict(
+                zip(
+                    missing,
+                    executor.map(lambda i: _lookup(batch[i], limiter), missing),
+                )
+            )
+            found = {i: book for i, book in results.items() if book}
+            remote = _create_volumes(list(found.values()))
+            for i, book in found.items():
+                volumes[i] = remote[book["google_books_id"]]
+
+            now = timezone.now()
+            books = []
+            for i in range(len(batch)):
+                volume = volumes.get(i)
+                if volume is None:
+                    totals.not_found += 1
+                elif _identity(volume.title, volume.author) in shelved:
+                    totals.duplicates += 1
+                else:
+                    shelved.add(_identity(volume.title, volume.author))
+                    books.append(
+                        Book(
+                            user=user,
+                            volume=volume,
+                            title=volume.title,
+                            author=volume.author,
+                            added_on=now,
+                        )
+                    )
+            # Rows shelved elsewhere since ``shelved`` was read are ignored by
+            # the constraint, so count what was actually inserted
+            shelf = Book.objects.filter(user=user)
+            before = shelf.count()
+            Book.objects.bulk_create(books, ignore_conflicts=True)
+            inserted = shelf.count() - before
+            # bulk_create skips the signals, so update the counters directly
+            recompute_shelf_counters([user.pk])
+            recommendations.mark_stale({book.volume_id for book in books})
+            fragments.bump("user", user.pk)
+
+            totals.processed += len(batch)
+            totals.added += inserted
+            totals.skipped += len(books) - inserted
+            if progress is not None:
+                progress(totals)
+    return totals
+
+
+def run_library_import(library_import: LibraryImport):
+    """
+    Process an uploaded import, recording progress on it after every batch.
+
+    A retried import resumes after the rows it had already processed.
+    """
+    done = ImportProgress(
+        processed=library_import.processed,
+        added=library_import.added,
+        duplicates=library_import.duplicates,
+        not_found=library_import.not_found,
+        skipped=library_import.skipped,
+    )
+    imports = LibraryImport.objects.filter(pk=library_import.pk)
+    imports.update(status=LibraryImport.RUNNING)
+
+    def record(totals: ImportProgress):
+        imports.update(
+            processed=done.processed + totals.processed,
+            added=done.added + totals.added,
+            duplicates=done.duplicates + totals.duplicates,
+            not_found=done.not_found + totals.not_found,
+            skipped=done.skipped + totals.skipped,
+        )
+
+    # Decoded and split into lines as the rows are read, a chunk at a time
+    upload = library_import.upload.open("rb")
+    with io.TextIOWrapper(
+        upload, encoding="utf-8-sig", errors="replace", newline=""
+    ) as lines:
+        rows = read_rows(lines)
+        import_rows(library_import.user, islice(rows, done.processed, None), record)
+    imports.update(status=LibraryImport.DONE, finished_on=timezone.now())
+    library_import.upload.delete(save=False)
+    imports.update(upload="")
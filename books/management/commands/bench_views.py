@@ -0,0 +1,168 @@
+"""Management command that benchmarks the shelf and search views in-process."""
+
+import json
+import subprocess
+import time
+import uuid
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections, connection
+from django.db.models import Max
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from books import dbpool
+from books.benchmarks import compare, start_stub_upstream, summarize
+from books.models import Book, CustomUser, Volume
+from books.services import GoogleBooksService
+from books.upstream import QuotaLimiter, metrics
+
+
+def _commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def _request_cycle(request):
+    """
+    Wrap a test client call in the connection handling of a real request.
+
+    The test client skips closing connections at the start and end of each
+    request, so without this the cost of (re)connecting would never show.
+    """
+
+    def cycle():
+        close_old_connections()
+        try:
+            return request()
+        finally:
+            close_old_connections()
+
+    return cycle
+
+
+class Command(BaseCommand):
+    """
+    Measure p50/p95 latency and query counts of the main views.
+
+    Run it against a database filled by ``seed_bench``. Google Books is
+    replaced by a local stub, so searches measure this app, not the network.
+    """
+
+    help = "Benchmark display_shelves, user_shelf, book_detail and search."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, default=50)
+        parser.add_argument("--upstream-delay", type=float, default=0.05)
+        parser.add_argument("--label", default="", help="Dataset label, e.g. 100k.")
+        parser.add_argument("--output", help="Write the JSON results to this file.")
+        parser.add_argument("--baseline", help="JSON results to compare against.")
+        parser.add_argument(
+            "--threshold",
+            type=float,
+            default=0.25,
+            help="Allowed relative p95 increase over the baseline.",
+        )
+
+    def handle(self, *args, **options):
+        largest = CustomUser.objects.order_by("-book_count").first()
+        # The most reviewed book, so runs against the same data are comparable
+        book = Book.objects.order_by("-review_count", "id").first()
+        if largest is None or book is None:
+            raise CommandError("No books to benchmark; run seed_bench first.")
+        shelved = CustomUser.objects.filter(book_count__gt=0).order_by("book_count")
+        typical = shelved[shelved.count() // 2]
+
+        stub = start_stub_upstream(options["upstream_delay"])
+        # The async service's client reads this base URL too
+        GoogleBooksService.BASE_URL = f"http://127.0.0.1:{stub.server_port}"
+        # The stub has no quota, so searches aren't throttled to the real one
+        GoogleBooksService._limiter = QuotaLimiter(qps=0)
+        metrics.reset()
+
+        client = Client()
+        client.force_login(largest)
+        scenarios = {
+            "display_shelves": lambda: client.get(reverse("shelves")),
+            "user_shelf_largest": lambda: client.get(
+                reverse("user_shelf", args=[largest.username, largest.id])
+            ),
+            "user_shelf_median": lambda: client.get(
+                reverse("user_shelf", args=[typical.username, typical.id])
+            ),
+            "book_detail": lambda: client.get(reverse("book_detail", args=[book.pk])),
+            # A unique title each time, so the result cache never answers
+            "search_books_ajax": lambda: client.post(
+                reverse("search_books_ajax"),
+                json.dumps({"title": f"winter {uuid.uuid4().hex[:8]}"}),
+                content_type="application/json",
+            ),
+        }
+
+        results = {
+            "label": options["label"],
+            "commit": _commit(),
+            "created": timezone.now().isoformat(),
+            "dataset": {
+                "users": CustomUser.objects.count(),
+                "volumes": Volume.objects.count(),
+                "books": Book.objects.count(),
+                "largest_shelf": largest.book_count,
+                "last_book_id": Book.objects.aggregate(Max("id"))["id__max"],
+            },
+            "database": {
+                key: value
+                for key, value in dbpool.stats().items()
+                if key in ("vendor", "mode", "conn_max_age")
+            },
+            "iterations": options["iterations"],
+            "scenarios": {},
+        }
+        try:
+            with override_settings(ALLOWED_HOSTS=["testserver"]):
+                for name, request in scenarios.items():
+                    results["scenarios"][name] = self.measure(
+                        request, options["iterations"]
+                    )
+                    self.stdout.write(f"{name}: {results['scenarios'][name]}")
+        finally:
+            stub.shutdown()
+        results["upstream"] = metrics.stats()
+
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as out:
+                json.dump(results, out, indent=2)
+
+        if options["baseline"]:
+            with open(options["baseline"], encoding="utf-8") as baseline:
+                regressions = compare(
+                    results, json.load(baseline), options["threshold"]
+                )
+            if regressions:
+                raise CommandError("Regressions:\n" + "\n".join(regressions))
+            self.stdout.write(self.style.SUCCESS("No regressions against baseline."))
+
+    @staticmethod
+    def measure(request, iterations):
+        """Time ``request`` after one warm-up call, counting its queries."""
+        request = _request_cycle(request)
+        response = request()
+        if response.status_code != 200:
+            raise CommandError(f"Request failed with {response.status_code}.")
+        latencies, queries = [], []
+        for _ in range(iterations):
+            with CaptureQueriesContext(connection) as context:
+                started = time.perf_counter()
+                request()
+                latencies.append(time.perf_counter() - started)
+            queries.append(len(context))
+        return summarize(latencies, queries)
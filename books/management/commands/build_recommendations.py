@@ -0,0 +1,25 @@
+"""Management command that rebuilds the "readers also shelved" recommendations."""
+
+from django.core.management.base import BaseCommand
+
+from books.recommendations import rebuild_related
+
+
+class Command(BaseCommand):
+    """Recompute the related volumes of volumes whose readers changed."""
+
+    help = "Rebuild related-book recommendations for stale (or all) volumes."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--full", action="store_true", help="Recompute every volume."
+        )
+
+    def handle(self, *args, **options):
+        def progress(done, written):
+            self.stdout.write(f"{done} volumes, {written} neighbors written...")
+
+        done = rebuild_related(full=options["full"], progress=progress)
+        self.stdout.write(
+            self.style.SUCCESS(f"Rebuilt recommendations for {done} volume(s).")
+        )
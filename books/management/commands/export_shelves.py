@@ -0,0 +1,32 @@
+"""Management command that dumps every shelf as CSV or JSON Lines."""
+
+import sys
+
+from django.core.management.base import BaseCommand
+
+from books.exports import FORMATS, SITE_FIELDS, export_lines
+from books.models import Book
+
+
+class Command(BaseCommand):
+    """Stream all shelf entries, or one user's, to stdout or a file."""
+
+    help = "Export shelves as CSV or JSON Lines with bounded memory."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--format", choices=sorted(FORMATS), default="csv")
+        parser.add_argument("--output", help="File to write (default: stdout).")
+        parser.add_argument("--user", help="Only export this username's shelf.")
+
+    def handle(self, *args, **options):
+        books = Book.objects.all()
+        if options["user"]:
+            books = books.filter(user__username=options["user"])
+        blocks = export_lines(books, options["format"], SITE_FIELDS)
+
+        if options["output"]:
+            with open(options["output"], "w", newline="", encoding="utf-8") as out:
+                out.writelines(blocks)
+            self.stderr.write(self.style.SUCCESS(f"Wrote {options['output']}."))
+        else:
+            sys.stdout.writelines(blocks)
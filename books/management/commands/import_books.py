@@ -0,0 +1,40 @@
+"""Management command that imports a CSV or Goodreads export to a user's shelf."""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from books.imports import import_rows, read_rows
+from books.models import CustomUser
+
+
+class Command(BaseCommand):
+    """Stream a reading-list CSV onto a user's shelf, reporting progress."""
+
+    help = "Import a CSV or Goodreads export to a user's shelf."
+
+    def add_arguments(self, parser):
+        parser.add_argument("username", help="Owner of the shelf to import to.")
+        parser.add_argument("path", help="CSV file with Title/Author/ISBN columns.")
+
+    def handle(self, *args, **options):
+        user = CustomUser.objects.filter(username=options["username"]).first()
+        if user is None:
+            raise CommandError(f"No user named {options['username']!r}.")
+
+        def report(totals):
+            self.stdout.write(
+                f"{totals.processed} read, {totals.added} added, "
+                f"{totals.duplicates} duplicates, {totals.not_found} not found, "
+                f"{totals.skipped} skipped"
+            )
+
+        try:
+            with open(options["path"], newline="", encoding="utf-8-sig") as lines:
+                totals = import_rows(user, read_rows(lines), report)
+        except OSError as e:
+            raise CommandError(str(e)) from e
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Imported {totals.added} book(s) to {user.username}; "
+                f"skipped {totals.skipped} shelved meanwhile."
+            )
+        )
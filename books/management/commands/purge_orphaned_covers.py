@@ -0,0 +1,48 @@
+"""Management command that deletes the covers of shelf copies merged into volumes."""
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from books.models import Job, Volume
+
+
+class Command(BaseCommand):
+    """Release the held jobs deleting the covers orphaned by the volume backfill."""
+
+    help = (
+        "Queue deletion of the Cloudinary covers of duplicate books merged into "
+        "volumes. Run once the deploy that created the volumes is verified."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only report how many covers would be deleted.",
+        )
+
+    def handle(self, *args, **options):
+        held = Job.objects.filter(task="destroy_cloudinary_image", status=Job.HELD)
+        if options["dry_run"]:
+            self.stdout.write(f"{held.count()} orphaned cover(s) would be deleted.")
+            return
+
+        now = timezone.now()
+        released, kept = [], []
+        for job in held.iterator():
+            # A cover some volume uses after all must stay
+            if Volume.objects.filter(cover=job.payload["cover"]).exists():
+                kept.append(job.pk)
+                continue
+            job.payload = {"public_id": job.payload["public_id"]}
+            job.status = Job.PENDING
+            job.run_at = now
+            released.append(job)
+        Job.objects.bulk_update(released, ["payload", "status", "run_at"])
+        Job.objects.filter(pk__in=kept).delete()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Queued {len(released)} orphaned cover(s) for deletion; "
+                f"kept {len(kept)} still in use."
+            )
+        )
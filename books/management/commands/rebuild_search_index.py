@@ -0,0 +1,15 @@
+"""Management command that rebuilds the local full-text search index."""
+
+from django.core.management.base import BaseCommand
+
+from books.search import rebuild_index
+
+
+class Command(BaseCommand):
+    """Re-index every book, e.g. after bulk updates that bypassed signals."""
+
+    help = "Rebuild the full-text search index over all books."
+
+    def handle(self, *args, **options):
+        rebuild_index()
+        self.stdout.write(self.style.SUCCESS("Search index rebuilt."))
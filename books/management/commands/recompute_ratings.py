@@ -0,0 +1,22 @@
+"""Management command that rebuilds the denormalized rating aggregates."""
+
+from django.core.management.base import BaseCommand
+
+from books.ratings import recompute_ratings
+
+
+class Command(BaseCommand):
+    """Recompute review_count, rating_sum and the star histogram of every book."""
+
+    help = "Recompute per-book rating aggregates from the Review table to repair drift."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "book_ids", nargs="*", type=int, help="Only recompute these books."
+        )
+
+    def handle(self, *args, **options):
+        updated = recompute_ratings(options["book_ids"] or None)
+        self.stdout.write(
+            self.style.SUCCESS(f"Recomputed ratings for {updated} book(s).")
+        )
@@ -0,0 +1,22 @@
+"""Management command that rebuilds the denormalized shelf counters."""
+
+from django.core.management.base import BaseCommand
+
+from books.counters import recompute_shelf_counters
+
+
+class Command(BaseCommand):
+    """Recompute book_count and last_book_added_at for every user."""
+
+    help = "Recompute per-user shelf counters from the Book table to repair drift."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "user_ids", nargs="*", type=int, help="Only recompute these users."
+        )
+
+    def handle(self, *args, **options):
+        updated = recompute_shelf_counters(options["user_ids"] or None)
+        self.stdout.write(
+            self.style.SUCCESS(f"Recomputed counters for {updated} user(s).")
+        )
@@ -0,0 +1,68 @@
+"""Management command that runs the database-backed background job queue."""
+
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from books.tasks import process_jobs, prune_jobs
+
+# Seconds between deletions of old finished jobs
+PRUNE_INTERVAL = 3600
+
+
+class Command(BaseCommand):
+    """Poll the Job table and execute due jobs until interrupted."""
+
+    help = "Process queued background jobs (cover imports, Cloudinary cleanup)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=4,
+            help="Jobs to run in parallel within this worker.",
+        )
+        parser.add_argument(
+            "--batch-size", type=int, default=10, help="Jobs to claim per poll."
+        )
+        parser.add_argument(
+            "--sleep",
+            type=float,
+            default=2.0,
+            help="Seconds to wait between polls when the queue is empty.",
+        )
+        parser.add_argument(
+            "--keep-done-days",
+            type=float,
+            default=7,
+            help="Delete jobs finished this many days ago (0 keeps them).",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Process the jobs that are currently due, then exit.",
+        )
+
+    def handle(self, *args, **options):
+        processed = 0
+        pruned_at = None
+        try:
+            while True:
+                if options["keep_done_days"] and (
+                    pruned_at is None or time.monotonic() - pruned_at > PRUNE_INTERVAL
+                ):
+                    prune_jobs(timedelta(days=options["keep_done_days"]))
+                    pruned_at = time.monotonic()
+                count = process_jobs(
+                    batch_size=options["batch_size"],
+                    concurrency=options["concurrency"],
+                )
+                processed += count
+                if count == 0:
+                    if options["once"]:
+                        break
+                    time.sleep(options["sleep"])
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS(f"Processed {processed} job(s)."))
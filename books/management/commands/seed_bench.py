@@ -0,0 +1,179 @@
+"""Management command that generates synthetic shelves for benchmarking."""
+
+import random
+from datetime import timedelta
+from itertools import islice
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from books import search, suggest
+from books.counters import recompute_shelf_counters
+from books.genres import tag_volumes
+from books.ratings import recompute_ratings
+from books.models import Book, Comment, CustomUser, Review, Volume
+
+PREFIX = "bench_"
+WORDS = (
+    "shadow winter river crown glass garden silent iron paper storm "
+    "golden hollow last lost midnight night ocean quiet red secret "
+    "stone summer wild wolf"
+).split()
+GENRES = ("Fiction", "Fantasy", "Science Fiction", "History", "Mystery", "Romance")
+
+
+def _batched(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def shelf_sizes(users: int, books: int, skew: float, rng: random.Random):
+    """
+    Split ``books`` across ``users`` following a Zipf distribution.
+
+    With the default skew a handful of users own most of the books, as on a
+    real site, instead of every shelf having the same size.
+    """
+    weights = [1 / (rank**skew) for rank in range(1, users + 1)]
+    total = sum(weights)
+    sizes = [int(books * weight / total) for weight in weights]
+    for index in rng.sample(range(users), books - sum(sizes)):
+        sizes[index] += 1
+    rng.shuffle(sizes)
+    return sizes
+
+
+class Command(BaseCommand):
+    """Create users, volumes, shelves, reviews and comments with bulk_create."""
+
+    help = "Generate a synthetic, skewed dataset for the view benchmarks."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=1000)
+        parser.add_argument("--books", type=int, default=100_000)
+        parser.add_argument(
+            "--volumes",
+            type=int,
+            help="Distinct volumes shelved (default: a quarter of --books).",
+        )
+        parser.add_argument("--reviews", type=int, default=10_000)
+        parser.add_argument("--comments", type=int, default=20_000)
+        parser.add_argument(
+            "--skew", type=float, default=1.1, help="Zipf exponent of shelf sizes."
+        )
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument(
+            "--clear",
+            action="store_true",
+            help="Delete previously generated data first.",
+        )
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        batch_size = options["batch_size"]
+        if options["clear"]:
+            self.clear()
+
+        volume_count = options["volumes"] or max(options["books"] // 4, 1)
+        self.stdout.write(f"Creating {options['users']} users...")
+        # Every generated user shares one precomputed password hash
+        password = CustomUser(username="x")
+        password.set_password("bench-password")
+        users = CustomUser.objects.bulk_create(
+            (
+                CustomUser(username=f"{PREFIX}{i}", password=password.password)
+                for i in range(options["users"])
+            ),
+            batch_size=batch_size,
+        )
+
+        self.stdout.write(f"Creating {volume_count} volumes...")
+        volumes = []
+        for batch in _batched(range(volume_count), batch_size):
+            created = Volume.objects.bulk_create(
+                Volume(
+                    google_books_id=f"bench-{options['seed']}-{i}",
+                    title=" ".join(rng.sample(WORDS, 3)).title() + f" {i}",
+                    author=f"{rng.choice(WORDS).title()} {rng.choice(WORDS).title()}",
+                    description=" ".join(rng.choices(WORDS, k=60)),
+                    genres=", ".join(rng.sample(GENRES, 2)),
+                )
+                for i in batch
+            )
+            tag_volumes(created)
+            suggest.add_volumes(created)
+            volumes += created
+
+        self.stdout.write(f"Creating {options['books']} shelf entries...")
+        now = timezone.now()
+        sizes = shelf_sizes(len(users), options["books"], options["skew"], rng)
+
+        def shelf_entries():
+            for user, size in zip(users, sizes):
+                for volume in rng.sample(volumes, min(size, len(volumes))):
+                    yield Book(
+                        user=user,
+                        volume=volume,
+                        title=volume.title,
+                        author=volume.author,
+                        added_on=now - timedelta(minutes=rng.randrange(1_000_000)),
+                    )
+
+        book_ids = []
+        for batch in _batched(shelf_entries(), batch_size):
+            book_ids += [book.pk for book in Book.objects.bulk_create(batch)]
+
+        self.stdout.write(f"Creating {options['reviews']} reviews...")
+        review_ids = []
+        for batch in _batched(range(options["reviews"]), batch_size):
+            review_ids += [
+                review.pk
+                for review in Review.objects.bulk_create(
+                    Review(
+                        book_id=rng.choice(book_ids),
+                        user=rng.choice(users),
+                        rating=rng.choices(range(1, 6), weights=(1, 2, 4, 6, 4))[0],
+                        content=" ".join(rng.choices(WORDS, k=40)),
+                    )
+                    for _ in batch
+                )
+            ]
+
+        self.stdout.write(f"Creating {options['comments']} comments...")
+        if review_ids:
+            for batch in _batched(range(options["comments"]), batch_size):
+                Comment.objects.bulk_create(
+                    Comment(
+                        review_id=rng.choice(review_ids),
+                        user=rng.choice(users),
+                        content=" ".join(rng.choices(WORDS, k=15)),
+                        approved=rng.random() < 0.8,
+                    )
+                    for _ in batch
+                )
+
+        # bulk_create skips the signals maintaining counters and the index
+        self.stdout.write("Recomputing counters, ratings and the search index...")
+        recompute_shelf_counters()
+        recompute_ratings()
+        search.rebuild_index()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Seeded {len(users)} users, {len(volumes)} volumes and "
+                f"{len(book_ids)} books (largest shelf: {max(sizes, default=0)})."
+            )
+        )
+
+    def clear(self):
+        """Delete the users and volumes created by earlier runs."""
+        self.stdout.write("Deleting previous benchmark data...")
+        user_ids = CustomUser.objects.filter(username__startswith=PREFIX).values_list(
+            "pk", flat=True
+        )
+        # In batches, so the cascade doesn't load every shelf entry at once
+        for batch in _batched(list(user_ids), 100):
+            CustomUser.objects.filter(pk__in=batch).delete()
+        Volume.objects.filter(google_books_id__startswith="bench-").delete()
+        search.rebuild_index()
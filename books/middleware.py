@@ -0,0 +1,144 @@
+"""Middleware for the books app."""
+
+import json
+import logging
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import JsonResponse
+
+from . import timing, warmup
+
+logger = logging.getLogger(__name__)
+
+# Server-Timing metric names and descriptions, in header order
+METRICS = (
+    ("db", "Database"),
+    ("google", "Google Books API"),
+    ("cloudinary", "Cloudinary"),
+    ("template", "Template rendering"),
+)
+
+
+class ServerTimingMiddleware:
+    """
+    Report where each request's time went, in Server-Timing headers and logs.
+
+    Records the number and duration of database queries, the time spent
+    blocked on Google Books and Cloudinary, and template render time. Each
+    request is logged as one JSON line, at WARNING when it exceeds the query
+    or latency budget in ``REQUEST_TIMING``. Enabled by
+    ``REQUEST_TIMING["ENABLED"]``; otherwise it removes itself at startup.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.options = settings.REQUEST_TIMING
+        if not self.options["ENABLED"]:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        timing.instrument_templates()
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with timing.collect() as timings:
+            started = time.perf_counter()
+            response = self.get_response(request)
+            return self._report(request, response, timings, started)
+
+    async def __acall__(self, request):
+        with timing.collect() as timings:
+            started = time.perf_counter()
+            response = await self.get_response(request)
+            return self._report(request, response, timings, started)
+
+    def _report(self, request, response, timings, started):
+        total = time.perf_counter() - started
+        queries = timings.counts["db"]
+        over_budget = (
+            queries > self.options["QUERY_BUDGET"]
+            or total * 1000 > self.options["LATENCY_BUDGET_MS"]
+        )
+
+        entries = [
+            f'{name};dur={timings.durations[name] * 1000:.1f};desc="{desc} '
+            f'({timings.counts[name]})"'
+            for name, desc in METRICS
+            if timings.counts[name]
+        ]
+        entries.append(f"total;dur={total * 1000:.1f}")
+        if over_budget:
+            entries.append('budget;desc="Over budget"')
+        response["Server-Timing"] = ", ".join(entries)
+
+        record = {
+            "method": request.method,
+            "path": request.path,
+            "status": response.status_code,
+            "total_ms": round(total * 1000, 1),
+            "queries": queries,
+            "over_budget": over_budget,
+        }
+        for name, _ in METRICS:
+            record[f"{name}_ms"] = round(timings.durations[name] * 1000, 1)
+        logger.log(
+            logging.WARNING if over_budget else logging.INFO,
+            "request_timing %s",
+            json.dumps(record),
+            extra={"timing": record},
+        )
+        return response
+
+
+class HealthCheckMiddleware:
+    """
+    Answer the ``/healthz`` and ``/readyz`` probes ahead of the rest of the stack.
+
+    Load balancers probe by IP, with Host headers that ALLOWED_HOSTS rejects,
+    and a probe needs no session, CSRF or account handling, so it is answered
+    before any of that runs. ``/healthz`` reports that the process is up;
+    ``/readyz`` is a 503 until warmup is done and the database answers.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if request.path_info == "/healthz":
+            return self._healthz()
+        if request.path_info == "/readyz":
+            return self._readyz(warmup.readiness())
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        if request.path_info == "/healthz":
+            return self._healthz()
+        if request.path_info == "/readyz":
+            return self._readyz(await sync_to_async(warmup.readiness)())
+        return await self.get_response(request)
+
+    @staticmethod
+    def _healthz():
+        return JsonResponse({"status": "ok"})
+
+    @staticmethod
+    def _readyz(checks):
+        ready = all(checks.values())
+        return JsonResponse(
+            {"status": "ready" if ready else "unavailable", "checks": checks},
+            status=200 if ready else 503,
+        )
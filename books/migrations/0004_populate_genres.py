@@ -0,0 +1,60 @@
+# Generated by Django 5.2.6 on 2026-10-17 22:32
+
+from django.db import migrations
+from django.utils.text import slugify
+
+BATCH_SIZE = 500
+
+
+def populate_genres(apps, schema_editor):
+    """Parse existing comma-joined Book.genres strings into Genre tags."""
+    Book = apps.get_model("books", "Book")
+    Genre = apps.get_model("books", "Genre")
+    Through = Book.genre_tags.through
+
+    def flush(batch):
+        names = {}
+        for _, book_genres in batch:
+            for slug, name in book_genres.items():
+                names.setdefault(slug, name)
+        Genre.objects.bulk_create(
+            [Genre(name=name, slug=slug) for slug, name in names.items()],
+            ignore_conflicts=True,
+        )
+        ids = dict(Genre.objects.filter(slug__in=names).values_list("slug", "id"))
+        Through.objects.bulk_create(
+            [
+                Through(book_id=book_id, genre_id=ids[slug])
+                for book_id, book_genres in batch
+                for slug in book_genres
+            ],
+            ignore_conflicts=True,
+        )
+
+    batch = []
+    books = Book.objects.exclude(genres="").values_list("id", "genres")
+    for book_id, genres in books.iterator(chunk_size=BATCH_SIZE):
+        book_genres = {}
+        for name in genres.split(","):
+            name = " ".join(name.split())
+            slug = slugify(name)[:120]
+            if slug:
+                book_genres.setdefault(slug, name[:100])
+        if book_genres:
+            batch.append((book_id, book_genres))
+        if len(batch) >= BATCH_SIZE:
+            flush(batch)
+            batch = []
+    if batch:
+        flush(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("books", "0003_genre"),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_genres, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 5.2.6 on 2026-10-17 22:33
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    """Create the vendor-specific full-text index and fill it."""
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        schema_editor.execute(
+            "CREATE INDEX books_book_search_vector_gin "
+            "ON books_book USING gin (search_vector)"
+        )
+        schema_editor.execute(
+            "UPDATE books_book SET search_vector = "
+            "setweight(to_tsvector(COALESCE(title, '')), 'A') || "
+            "setweight(to_tsvector(COALESCE(author, '')), 'B') || "
+            "setweight(to_tsvector(COALESCE(description, '')), 'C')"
+        )
+    elif vendor == "sqlite":
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE books_book_fts USING fts5("
+            "title, author, description, tokenize='porter unicode61')"
+        )
+        schema_editor.execute(
+            "INSERT INTO books_book_fts(rowid, title, author, description) "
+            "SELECT id, title, author, description FROM books_book"
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        schema_editor.execute("DROP INDEX IF EXISTS books_book_search_vector_gin")
+    elif vendor == "sqlite":
+        schema_editor.execute("DROP TABLE IF EXISTS books_book_fts")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("books", "0004_populate_genres"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="book",
+            name="search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(
+                editable=False, null=True
+            ),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,94 @@
+# Generated by Django 5.2.6 on 2026-10-17 22:34
+
+import logging
+
+import django.db.models.functions.text
+from django.db import migrations, models
+from django.db.models import Count, Min
+from django.db.models.functions import Lower
+
+logger = logging.getLogger(__name__)
+
+
+def remove_duplicate_books(apps, schema_editor):
+    """
+    Keep the oldest copy of each title/author pair on a shelf.
+
+    The reviews (and with them their comments and ratings) and genre tags of
+    the other copies are moved to the kept one before they are deleted, and
+    each merge is logged.
+    """
+    Book = apps.get_model("books", "Book")
+    Review = apps.get_model("books", "Review")
+    duplicates = (
+        Book.objects.values(
+            "user", lower_title=Lower("title"), lower_author=Lower("author")
+        )
+        .annotate(keep_id=Min("id"), copies=Count("id"))
+        .filter(copies__gt=1)
+    )
+    merged = moved_reviews = 0
+    for group in duplicates.iterator():
+        keep = Book.objects.get(id=group["keep_id"])
+        copies = (
+            Book.objects.annotate(
+                lower_title=Lower("title"), lower_author=Lower("author")
+            )
+            .filter(
+                user=group["user"],
+                lower_title=group["lower_title"],
+                lower_author=group["lower_author"],
+            )
+            .exclude(id=keep.id)
+        )
+        for book in copies:
+            keep.genre_tags.add(*book.genre_tags.all())
+            reviews = Review.objects.filter(book=book).update(book=keep)
+            logger.info(
+                "Merged duplicate book %s (%r by %r, user %s) into %s, "
+                "moving %s review(s)",
+                book.id,
+                book.title,
+                book.author,
+                book.user_id,
+                keep.id,
+                reviews,
+            )
+            merged += 1
+            moved_reviews += reviews
+        copies.delete()
+    if merged:
+        logger.warning(
+            "Merged %s duplicate book(s) into the oldest copy on their shelf, "
+            "moving %s review(s)",
+            merged,
+            moved_reviews,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("books", "0005_book_search_vector"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="book",
+            index=models.Index(
+                models.F("user"),
+                models.OrderBy(models.F("id"), descending=True),
+                name="book_user_id_desc_idx",
+            ),
+        ),
+        migrations.RunPython(remove_duplicate_books, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="book",
+            constraint=models.UniqueConstraint(
+                models.F("user"),
+                django.db.models.functions.text.Lower("title"),
+                django.db.models.functions.text.Lower("author"),
+                name="unique_book_per_user",
+            ),
+        ),
+    ]
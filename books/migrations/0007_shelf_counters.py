@@ -0,0 +1,81 @@
+# Generated by Django 5.2.6 on 2026-10-17 22:36
+
+from datetime import timedelta
+
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_added_on(apps, schema_editor):
+    """
+    Give existing books distinct added_on times that rise with their id.
+
+    AddField stamps every existing row with the same time, which would tie
+    every user's last_book_added_at. Counting back one second per book from
+    now keeps the shelves ordered by each user's most recent addition.
+    """
+    Book = apps.get_model("books", "Book")
+    now = django.utils.timezone.now()
+    batch = []
+    books = Book.objects.order_by("-id").only("id")
+    for offset, book in enumerate(books.iterator(chunk_size=2000)):
+        book.added_on = now - timedelta(seconds=offset)
+        batch.append(book)
+        if len(batch) == 2000:
+            Book.objects.bulk_update(batch, ["added_on"])
+            batch = []
+    Book.objects.bulk_update(batch, ["added_on"])
+
+
+def populate_shelf_counters(apps, schema_editor):
+    """Compute the shelf counters for existing users in one UPDATE."""
+    CustomUser = apps.get_model("books", "CustomUser")
+    Book = apps.get_model("books", "Book")
+    shelf = Book.objects.filter(user=OuterRef("pk")).order_by()
+    counts = shelf.values("user").annotate(total=Count("id")).values("total")
+    latest = shelf.order_by("-id").values("added_on")[:1]
+    CustomUser.objects.update(
+        book_count=Coalesce(Subquery(counts), 0),
+        last_book_added_at=Subquery(latest),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("auth", "0012_alter_user_first_name_max_length"),
+        ("books", "0006_book_shelf_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="book",
+            name="added_on",
+            field=models.DateTimeField(
+                default=django.utils.timezone.now, editable=False
+            ),
+        ),
+        migrations.AddField(
+            model_name="customuser",
+            name="book_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="customuser",
+            name="last_book_added_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(backfill_added_on, migrations.RunPython.noop),
+        migrations.RunPython(populate_shelf_counters, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="customuser",
+            index=models.Index(
+                models.OrderBy(models.F("last_book_added_at"), descending=True),
+                models.OrderBy(models.F("id"), descending=True),
+                condition=models.Q(("book_count__gt", 0)),
+                name="user_shelf_recency_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,73 @@
+# Generated by Django 5.2.6 on 2026-10-17 22:40
+
+import cloudinary.models
+import django.contrib.postgres.search
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("books", "0007_shelf_counters"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Volume",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "google_books_id",
+                    models.CharField(blank=True, max_length=40, null=True, unique=True),
+                ),
+                ("isbn", models.CharField(blank=True, max_length=20)),
+                ("title", models.CharField(max_length=200)),
+                ("author", models.CharField(max_length=100)),
+                ("published", models.DateField(blank=True, null=True)),
+                (
+                    "cover",
+                    cloudinary.models.CloudinaryField(
+                        blank=True, max_length=255, null=True, verbose_name="cover"
+                    ),
+                ),
+                ("genres", models.CharField(blank=True, max_length=300)),
+                ("description", models.TextField(blank=True)),
+                ("cover_pending", models.BooleanField(default=False)),
+                (
+                    "search_vector",
+                    django.contrib.postgres.search.SearchVectorField(
+                        editable=False, null=True
+                    ),
+                ),
+                ("created_on", models.DateTimeField(auto_now_add=True)),
+                (
+                    "genre_tags",
+                    models.ManyToManyField(
+                        blank=True, related_name="volumes", to="books.genre"
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["title"],
+            },
+        ),
+        migrations.AddField(
+            model_name="book",
+            name="volume",
+            field=models.ForeignKey(
+                null=True,
+                on_delete=django.db.models.deletion.PROTECT,
+                related_name="books",
+                to="books.volume",
+            ),
+        ),
+    ]
@@ -0,0 +1,183 @@
+# Generated by Django 5.2.6 on 2026-10-17 22:41
+
+from django.db import migrations
+
+BATCH_SIZE = 500
+
+BOOK_FIELDS = ("published", "cover", "genres", "description", "cover_pending")
+
+# Key prefix of the held jobs deleting the covers of merged duplicate copies
+ORPHANED_COVER_KEY = "destroy:orphaned-cover:"
+
+
+def _public_id(cover):
+    return getattr(cover, "public_id", cover) or ""
+
+
+def populate_volumes(apps, schema_editor):
+    """
+    Create one Volume per distinct title/author and point shelf entries at it.
+
+    The first copy of a book becomes its volume (taking the cover of a later
+    copy if it has none). Deleting the covers of the other copies from
+    Cloudinary is queued as held jobs, which ``manage.py purge_orphaned_covers``
+    releases once the deploy is verified, so a rollback can still use them.
+    """
+    Book = apps.get_model("books", "Book")
+    Volume = apps.get_model("books", "Volume")
+    Job = apps.get_model("books", "Job")
+    cover_field = Book._meta.get_field("cover")
+
+    volume_ids = {}
+    volume_covers = {}
+
+    def flush(batch):
+        new = {}
+        for book in batch:
+            identity = (book.title.lower(), book.author.lower())
+            if identity not in volume_ids and identity not in new:
+                new[identity] = Volume(
+                    title=book.title,
+                    author=book.author,
+                    **{field: getattr(book, field) for field in BOOK_FIELDS},
+                )
+        for identity, volume in zip(new, Volume.objects.bulk_create(new.values())):
+            volume_ids[identity] = volume.pk
+            volume_covers[volume.pk] = _public_id(volume.cover)
+
+        adopted, orphaned = {}, {}
+        for book in batch:
+            book.volume_id = volume_ids[(book.title.lower(), book.author.lower())]
+            cover = _public_id(book.cover)
+            if not cover or cover == volume_covers[book.volume_id]:
+                continue
+            if volume_covers[book.volume_id]:
+                # Kept with the copies using it, so a rollback can restore it
+                orphan = orphaned.setdefault(
+                    cover,
+                    {
+                        "public_id": cover,
+                        "cover": cover_field.get_prep_value(book.cover),
+                        "book_ids": [],
+                    },
+                )
+                orphan["book_ids"].append(book.pk)
+            else:
+                volume_covers[book.volume_id] = cover
+                adopted[book.volume_id] = book.cover
+        for volume_id, cover in adopted.items():
+            Volume.objects.filter(pk=volume_id).update(cover=cover, cover_pending=False)
+        Book.objects.bulk_update(batch, ["volume"])
+        Job.objects.bulk_create(
+            [
+                Job(
+                    task="destroy_cloudinary_image",
+                    key=f"{ORPHANED_COVER_KEY}{public_id}"[:255],
+                    payload=orphan,
+                    status="held",
+                )
+                for public_id, orphan in orphaned.items()
+            ],
+            ignore_conflicts=True,
+        )
+
+    batch = []
+    for book in Book.objects.order_by("id").iterator(chunk_size=BATCH_SIZE):
+        batch.append(book)
+        if len(batch) >= BATCH_SIZE:
+            flush(batch)
+            batch = []
+    if batch:
+        flush(batch)
+
+    # A volume is tagged with the genres of all its former copies
+    BookTags = Book.genre_tags.through
+    VolumeTags = Volume.genre_tags.through
+    tags = (
+        BookTags.objects.order_by()
+        .values_list("book__volume_id", "genre_id")
+        .distinct()
+    )
+    batch = []
+    for volume_id, genre_id in tags.iterator(chunk_size=BATCH_SIZE):
+        batch.append(VolumeTags(volume_id=volume_id, genre_id=genre_id))
+        if len(batch) >= BATCH_SIZE:
+            VolumeTags.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    VolumeTags.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+def restore_books(apps, schema_editor):
+    """
+    Copy volume data back onto the shelf entries, with their own covers.
+
+    Covers of merged copies are only deleted once their held jobs are
+    released, so the held ones are restored and their jobs dropped.
+    """
+    Book = apps.get_model("books", "Book")
+    Job = apps.get_model("books", "Job")
+
+    batch = []
+    books = (
+        Book.objects.filter(volume__isnull=False)
+        .select_related("volume")
+        .order_by("id")
+    )
+    for book in books.iterator(chunk_size=BATCH_SIZE):
+        for field in BOOK_FIELDS:
+            setattr(book, field, getattr(book.volume, field))
+        batch.append(book)
+        if len(batch) >= BATCH_SIZE:
+            Book.objects.bulk_update(batch, BOOK_FIELDS)
+            batch = []
+    Book.objects.bulk_update(batch, BOOK_FIELDS)
+
+    held = Job.objects.filter(
+        task="destroy_cloudinary_image",
+        key__startswith=ORPHANED_COVER_KEY,
+        status="held",
+    )
+    for job in held.iterator():
+        Book.objects.filter(pk__in=job.payload["book_ids"]).update(
+            cover=job.payload["cover"]
+        )
+    held.delete()
+
+
+def move_search_index(apps, schema_editor):
+    """Index volumes instead of shelf entries, so each book is indexed once."""
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        schema_editor.execute("DROP INDEX IF EXISTS books_book_search_vector_gin")
+        schema_editor.execute(
+            "CREATE INDEX books_volume_search_vector_gin "
+            "ON books_volume USING gin (search_vector)"
+        )
+        schema_editor.execute(
+            "UPDATE books_volume SET search_vector = "
+            "setweight(to_tsvector(COALESCE(title, '')), 'A') || "
+            "setweight(to_tsvector(COALESCE(author, '')), 'B') || "
+            "setweight(to_tsvector(COALESCE(description, '')), 'C')"
+        )
+    elif vendor == "sqlite":
+        schema_editor.execute("DROP TABLE IF EXISTS books_book_fts")
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE books_volume_fts USING fts5("
+            "title, author, description, tokenize='porter unicode61')"
+        )
+        schema_editor.execute(
+            "INSERT INTO books_volume_fts(rowid, title, author, description) "
+            "SELECT id, title, author, description FROM books_volume"
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("books", "0008_volume"),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_volumes, restore_books),
+        migrations.RunPython(move_search_index, migrations.RunPython.noop),
+    ]
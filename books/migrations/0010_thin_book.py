@@ -0,0 +1,51 @@
+# Generated by Django 5.2.6 on 2026-10-17 22:42
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("books", "0009_populate_volumes"),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name="book",
+            name="cover",
+        ),
+        migrations.RemoveField(
+            model_name="book",
+            name="cover_pending",
+        ),
+        migrations.RemoveField(
+            model_name="book",
+            name="description",
+        ),
+        migrations.RemoveField(
+            model_name="book",
+            name="genre_tags",
+        ),
+        migrations.RemoveField(
+            model_name="book",
+            name="genres",
+        ),
+        migrations.RemoveField(
+            model_name="book",
+            name="published",
+        ),
+        migrations.RemoveField(
+            model_name="book",
+            name="search_vector",
+        ),
+        migrations.AlterField(
+            model_name="book",
+            name="volume",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.PROTECT,
+                related_name="books",
+                to="books.volume",
+            ),
+        ),
+    ]
@@ -0,0 +1,75 @@
+# Generated by Django 5.2.6 on 2026-10-17 22:45
+
+import django.db.models.deletion
+import django.db.models.functions.text
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("books", "0010_thin_book"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="LibraryImport",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("filename", models.CharField(blank=True, max_length=255)),
+                ("source", models.TextField()),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("pending", "Pending"),
+                            ("running", "Running"),
+                            ("done", "Done"),
+                            ("failed", "Failed"),
+                        ],
+                        default="pending",
+                        max_length=10,
+                    ),
+                ),
+                ("processed", models.PositiveIntegerField(default=0)),
+                ("added", models.PositiveIntegerField(default=0)),
+                ("duplicates", models.PositiveIntegerField(default=0)),
+                ("not_found", models.PositiveIntegerField(default=0)),
+                ("created_on", models.DateTimeField(auto_now_add=True)),
+                ("finished_on", models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                "ordering": ["-created_on"],
+            },
+        ),
+        migrations.AddIndex(
+            model_name="volume",
+            index=models.Index(fields=["isbn"], name="volume_isbn_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="volume",
+            index=models.Index(
+                django.db.models.functions.text.Lower("title"),
+                django.db.models.functions.text.Lower("author"),
+                name="volume_title_author_idx",
+            ),
+        ),
+        migrations.AddField(
+            model_name="libraryimport",
+            name="user",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="library_imports",
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.6 on 2026-10-17 22:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("books", "0011_library_import"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="comment",
+            index=models.Index(
+                condition=models.Q(("approved", True)),
+                fields=["review", "posted_on", "id"],
+                name="comment_review_approved_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="review",
+            index=models.Index(
+                models.F("book"),
+                models.OrderBy(models.F("posted_on"), descending=True),
+                models.OrderBy(models.F("id"), descending=True),
+                name="review_book_posted_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,119 @@
+# Generated by Django 5.2.6 on 2026-10-17 23:01
+
+import django.core.validators
+import django.db.models.expressions
+import django.db.models.functions.comparison
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce, Greatest, Least
+
+
+def populate_ratings(apps, schema_editor):
+    """Clamp existing ratings to 1-5 and compute every book's aggregates."""
+    Book = apps.get_model("books", "Book")
+    Review = apps.get_model("books", "Review")
+
+    Review.objects.exclude(rating__range=(1, 5)).update(
+        rating=Least(Greatest("rating", 1), 5)
+    )
+    reviews = Review.objects.filter(book=OuterRef("pk")).order_by().values("book")
+
+    def aggregate(expression):
+        return Coalesce(Subquery(reviews.annotate(value=expression).values("value")), 0)
+
+    Book.objects.filter(pk__in=Review.objects.values("book")).update(
+        review_count=aggregate(Count("id")),
+        rating_sum=aggregate(Sum("rating")),
+        **{
+            f"stars_{rating}": aggregate(Count("id", filter=Q(rating=rating)))
+            for rating in range(1, 6)
+        },
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("books", "0012_review_comment_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="book",
+            name="rating_sum",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="book",
+            name="review_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="book",
+            name="stars_1",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="book",
+            name="stars_2",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="book",
+            name="stars_3",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="book",
+            name="stars_4",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="book",
+            name="stars_5",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name="review",
+            name="rating",
+            field=models.IntegerField(
+                validators=[
+                    django.core.validators.MinValueValidator(1),
+                    django.core.validators.MaxValueValidator(5),
+                ]
+            ),
+        ),
+        migrations.RunPython(populate_ratings, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="review",
+            constraint=models.CheckConstraint(
+                condition=models.Q(("rating__gte", 1), ("rating__lte", 5)),
+                name="review_rating_range",
+            ),
+        ),
+        migrations.AddField(
+            model_name="book",
+            name="rating_average",
+            field=models.GeneratedField(
+                db_persist=True,
+                expression=django.db.models.expressions.CombinedExpression(
+                    django.db.models.functions.comparison.Cast(
+                        "rating_sum", models.FloatField()
+                    ),
+                    "/",
+                    django.db.models.functions.comparison.NullIf("review_count", 0),
+                ),
+                output_field=models.FloatField(),
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="book",
+            index=models.Index(
+                models.OrderBy(models.F("rating_average"), descending=True),
+                models.OrderBy(models.F("review_count"), descending=True),
+                models.OrderBy(models.F("id"), descending=True),
+                condition=models.Q(("review_count__gte", 3)),
+                name="book_top_rated_idx",
+            ),
+        ),
+    ]
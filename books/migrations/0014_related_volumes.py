@@ -0,0 +1,74 @@
+# Generated by Django 5.2.6 on 2026-10-17 23:04
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("books", "0013_book_rating_aggregates"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RelatedVolume",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("score", models.FloatField()),
+            ],
+        ),
+        migrations.AddField(
+            model_name="volume",
+            name="related_stale",
+            field=models.BooleanField(default=True),
+        ),
+        migrations.AddIndex(
+            model_name="volume",
+            index=models.Index(
+                condition=models.Q(("related_stale", True)),
+                fields=["id"],
+                name="volume_related_stale_idx",
+            ),
+        ),
+        migrations.AddField(
+            model_name="relatedvolume",
+            name="related",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="+",
+                to="books.volume",
+            ),
+        ),
+        migrations.AddField(
+            model_name="relatedvolume",
+            name="volume",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="related_volumes",
+                to="books.volume",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="relatedvolume",
+            index=models.Index(
+                models.F("volume"),
+                models.OrderBy(models.F("score"), descending=True),
+                name="related_volume_score_idx",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="relatedvolume",
+            constraint=models.UniqueConstraint(
+                fields=("volume", "related"), name="unique_related_volume"
+            ),
+        ),
+    ]
@@ -0,0 +1,92 @@
+# Generated by Django 5.2.6 on 2026-10-17 23:08
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+
+BATCH_SIZE = 1000
+
+
+def create_suggestion_indexes(apps, schema_editor):
+    """On PostgreSQL, index suggestions for prefix and trigram matching."""
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    schema_editor.execute(
+        "CREATE INDEX books_suggestion_prefix "
+        "ON books_suggestion (normalized varchar_pattern_ops)"
+    )
+    schema_editor.execute(
+        "CREATE INDEX books_suggestion_trgm "
+        "ON books_suggestion USING gin (normalized gin_trgm_ops)"
+    )
+
+
+def drop_suggestion_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute("DROP INDEX IF EXISTS books_suggestion_prefix")
+        schema_editor.execute("DROP INDEX IF EXISTS books_suggestion_trgm")
+
+
+def populate_suggestions(apps, schema_editor):
+    """Suggest the title of every volume, weighted by its shelf entries."""
+    Suggestion = apps.get_model("books", "Suggestion")
+    Volume = apps.get_model("books", "Volume")
+
+    batch = {}
+    volumes = Volume.objects.annotate(weight=Count("books")).order_by("id")
+    for volume in volumes.iterator(chunk_size=BATCH_SIZE):
+        normalized = " ".join(f"{volume.title} {volume.author}".lower().split())
+        if normalized in batch:
+            batch[normalized].weight += volume.weight
+            continue
+        batch[normalized] = Suggestion(
+            normalized=normalized[:300],
+            title=volume.title,
+            author=volume.author,
+            volume_id=volume.pk,
+            weight=volume.weight,
+        )
+        if len(batch) >= BATCH_SIZE:
+            Suggestion.objects.bulk_create(batch.values(), ignore_conflicts=True)
+            batch = {}
+    Suggestion.objects.bulk_create(batch.values(), ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("books", "0014_related_volumes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Suggestion",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("normalized", models.CharField(max_length=300, unique=True)),
+                ("title", models.CharField(max_length=200)),
+                ("author", models.CharField(max_length=100)),
+                ("weight", models.PositiveIntegerField(default=0)),
+                (
+                    "volume",
+                    models.OneToOneField(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        to="books.volume",
+                    ),
+                ),
+            ],
+        ),
+        migrations.RunPython(create_suggestion_indexes, drop_suggestion_indexes),
+        migrations.RunPython(populate_suggestions, migrations.RunPython.noop),
+    ]
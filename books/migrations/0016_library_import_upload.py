@@ -0,0 +1,42 @@
+# Generated by Django 5.2.6 on 2026-10-17 23:42
+
+import books.models
+from django.core.files.base import ContentFile
+from django.db import migrations, models
+
+
+def move_sources_to_files(apps, schema_editor):
+    """Write the text of imports that haven't finished to upload files."""
+    LibraryImport = apps.get_model("books", "LibraryImport")
+    unfinished = LibraryImport.objects.filter(status__in=("pending", "running"))
+    for library_import in unfinished.iterator():
+        library_import.upload.save(
+            library_import.filename or f"import-{library_import.pk}.csv",
+            ContentFile(library_import.source.encode("utf-8")),
+            save=False,
+        )
+        library_import.save(update_fields=["upload"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("books", "0015_suggestions"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="libraryimport",
+            name="upload",
+            field=models.FileField(
+                blank=True,
+                storage=books.models.import_storage,
+                upload_to="imports/%Y/%m/",
+            ),
+        ),
+        migrations.RunPython(move_sources_to_files, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name="libraryimport",
+            name="source",
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-18 00:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("books", "0017_job_held_status"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="libraryimport",
+            name="skipped",
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
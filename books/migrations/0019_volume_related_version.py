@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-18 00:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("books", "0018_library_import_skipped"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="volume",
+            name="related_version",
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
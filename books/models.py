@@ -1,35 +1,185 @@
-"""Defines database models for users, books, reviews, and comments."""
+"""Defines database models for users, volumes, books, genres, reviews, comments, suggestions, recommendations, jobs, and imports."""
 
 from django.db import models
+from django.db.models import F, Q
+from django.core.validators import MaxValueValidator, MinValueValidator
+from django.db.models.functions import Cast, Lower, NullIf
 from django.contrib.auth.models import AbstractUser
+from django.contrib.postgres.search import SearchVectorField
+from django.core.files.storage import storages
+from django.utils import timezone
 from cloudinary.models import CloudinaryField
 
 
 # Create your models here.
-class CustomUser(AbstractUser):
+class CounterFieldsMixin:
+    """
+    Keep ``save()`` from overwriting counters maintained with F-expressions.
+
+    Counters listed in ``COUNTER_FIELDS`` are updated in place, so a regular
+    save of an existing row must not write back possibly stale in-memory values.
+    """
+
+    COUNTER_FIELDS = ()
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding and kwargs.get("update_fields") is None:
+            kwargs["update_fields"] = [
+                field.name
+                for field in self._meta.concrete_fields
+                if not field.primary_key
+                and not field.generated
+                and field.name not in self.COUNTER_FIELDS
+            ]
+        super().save(*args, **kwargs)
+
+
+class CustomUser(CounterFieldsMixin, AbstractUser):
     """Extends Django's AbstractUser to include a bio and profile image."""
 
     bio = models.TextField(blank=True)
     profile_image = CloudinaryField("profile_image", blank=True, null=True)
+    # Shelf counters, maintained by books.counters
+    book_count = models.PositiveIntegerField(default=0)
+    last_book_added_at = models.DateTimeField(blank=True, null=True)
 
+    COUNTER_FIELDS = ("book_count", "last_book_added_at")
 
-class Book(models.Model):
-    """Represents a book uploaded by a user, including metadata and genre tags."""
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # The shelves page lists users with books, most recent addition first
+            models.Index(
+                F("last_book_added_at").desc(),
+                F("id").desc(),
+                name="user_shelf_recency_idx",
+                condition=Q(book_count__gt=0),
+            ),
+        ]
 
-    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name="books")
+
+class Genre(models.Model):
+    """Represents a normalized genre that books can be tagged with."""
+
+    name = models.CharField(max_length=100)
+    slug = models.SlugField(max_length=120, unique=True)
+
+    class Meta:
+        ordering = ["name"]
+
+    def __str__(self):
+        return self.name
+
+
+class Volume(models.Model):
+    """Represents a canonical book edition, shared by every shelf entry of it."""
+
+    google_books_id = models.CharField(
+        max_length=40, unique=True, blank=True, null=True
+    )
+    isbn = models.CharField(max_length=20, blank=True)
     title = models.CharField(max_length=200)
     author = models.CharField(max_length=100)
     published = models.DateField(blank=True, null=True)
     cover = CloudinaryField("cover", blank=True, null=True)
     genres = models.CharField(max_length=300, blank=True)
     description = models.TextField(blank=True)
+    cover_pending = models.BooleanField(default=False)
+    genre_tags = models.ManyToManyField(Genre, related_name="volumes", blank=True)
+    # Set when shelf membership changes; books.recommendations rebuilds these
+    related_stale = models.BooleanField(default=True)
+    # Bumped with every stale mark, so a rebuild only clears the marks it read
+    related_version = models.PositiveIntegerField(default=0)
+    # Maintained by books.search; GIN-indexed on PostgreSQL
+    search_vector = SearchVectorField(null=True, editable=False)
+    created_on = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["title"]
+        indexes = [
+            # Imports resolve rows to known volumes by ISBN or by title/author
+            models.Index(fields=["isbn"], name="volume_isbn_idx"),
+            models.Index(
+                Lower("title"), Lower("author"), name="volume_title_author_idx"
+            ),
+            models.Index(
+                fields=["id"],
+                condition=Q(related_stale=True),
+                name="volume_related_stale_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.title} | by {self.author}"
+
+
+class Book(CounterFieldsMixin, models.Model):
+    """Represents a volume on a user's shelf."""
+
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name="books")
+    volume = models.ForeignKey(Volume, on_delete=models.PROTECT, related_name="books")
+    # Copied from the volume for the per-shelf uniqueness check and listings
+    title = models.CharField(max_length=200)
+    author = models.CharField(max_length=100)
+    added_on = models.DateTimeField(default=timezone.now, editable=False)
+    # Rating aggregates of the book's reviews, maintained by books.ratings
+    review_count = models.PositiveIntegerField(default=0)
+    rating_sum = models.PositiveIntegerField(default=0)
+    stars_1 = models.PositiveIntegerField(default=0)
+    stars_2 = models.PositiveIntegerField(default=0)
+    stars_3 = models.PositiveIntegerField(default=0)
+    stars_4 = models.PositiveIntegerField(default=0)
+    stars_5 = models.PositiveIntegerField(default=0)
+    rating_average = models.GeneratedField(
+        expression=Cast("rating_sum", models.FloatField()) / NullIf("review_count", 0),
+        output_field=models.FloatField(),
+        db_persist=True,
+    )
+
+    STAR_FIELDS = ("stars_1", "stars_2", "stars_3", "stars_4", "stars_5")
+    COUNTER_FIELDS = ("review_count", "rating_sum") + STAR_FIELDS
 
     class Meta:
         ordering = ["user"]
+        indexes = [
+            # Shelf pages list a user's books newest first
+            models.Index(F("user"), F("id").desc(), name="book_user_id_desc_idx"),
+            # The top-rated leaderboard (see TOP_RATED_MIN_REVIEWS)
+            models.Index(
+                F("rating_average").desc(),
+                F("review_count").desc(),
+                F("id").desc(),
+                name="book_top_rated_idx",
+                condition=Q(review_count__gte=3),
+            ),
+        ]
+        constraints = [
+            # One copy of a title/author pair per shelf, compared case-insensitively
+            models.UniqueConstraint(
+                F("user"),
+                Lower("title"),
+                Lower("author"),
+                name="unique_book_per_user",
+            ),
+        ]
 
     def __str__(self):
         return f"{self.title} | by {self.author} | {self.user.username}'s shelf"
 
+    @property
+    def rating_stars(self):
+        """Return the average rating rounded to whole stars (0 when unrated)."""
+        return round(self.rating_average or 0)
+
+    @property
+    def rating_histogram(self):
+        """Return (stars, count, percent) for 5 stars down to 1."""
+        histogram = []
+        for stars in range(5, 0, -1):
+            count = getattr(self, f"stars_{stars}")
+            percent = round(100 * count / self.review_count) if self.review_count else 0
+            histogram.append((stars, count, percent))
+        return histogram
+
 
 class Review(models.Model):
     """Represents a user's review of a book including user, rating, content, and posted date."""
@@ -38,12 +188,38 @@ class Review(models.Model):
     user = models.ForeignKey(
         CustomUser, on_delete=models.CASCADE, related_name="reviewers"
     )
-    rating = models.IntegerField()
+    rating = models.IntegerField(
+        validators=[MinValueValidator(1), MaxValueValidator(5)]
+    )
     content = models.TextField()
     posted_on = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         ordering = ["posted_on"]
+        indexes = [
+            # Book pages list a book's reviews newest first
+            models.Index(
+                F("book"),
+                F("posted_on").desc(),
+                F("id").desc(),
+                name="review_book_posted_idx",
+            ),
+        ]
+        constraints = [
+            # Each rating is counted in one of the book's stars_1..stars_5
+            models.CheckConstraint(
+                condition=Q(rating__gte=1, rating__lte=5), name="review_rating_range"
+            ),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Lets books.ratings move the rating of an edited review
+        loaded = dict(zip(field_names, values))
+        if "book_id" in loaded and "rating" in loaded:
+            instance.loaded_rating = (loaded["book_id"], loaded["rating"])
+        return instance
 
     def __str__(self):
         return f"{self.user.username} - {self.book.title} - {self.rating}"
@@ -64,6 +240,137 @@ class Comment(models.Model):
 
     class Meta:
         ordering = ["posted_on"]
+        indexes = [
+            # Review threads only ever show approved comments, oldest first
+            models.Index(
+                fields=["review", "posted_on", "id"],
+                condition=Q(approved=True),
+                name="comment_review_approved_idx",
+            ),
+        ]
 
     def __str__(self):
         return f"Comment: {self.content} by {self.user.username}"
+
+
+class Suggestion(models.Model):
+    """A title offered by search autocomplete, from a volume or a Google result."""
+
+    # Lowercased "title author", the text suggestions are matched against
+    normalized = models.CharField(max_length=300, unique=True)
+    title = models.CharField(max_length=200)
+    author = models.CharField(max_length=100)
+    volume = models.OneToOneField(
+        Volume, on_delete=models.SET_NULL, blank=True, null=True
+    )
+    # Shelf entries of the volume; more popular titles are suggested first
+    weight = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.title} | by {self.author}"
+
+
+class RelatedVolume(models.Model):
+    """A precomputed "readers also shelved" neighbor of a volume."""
+
+    volume = models.ForeignKey(
+        Volume, on_delete=models.CASCADE, related_name="related_volumes"
+    )
+    related = models.ForeignKey(Volume, on_delete=models.CASCADE, related_name="+")
+    score = models.FloatField()
+
+    class Meta:
+        indexes = [
+            # Book pages read a volume's neighbors best first
+            models.Index(
+                F("volume"), F("score").desc(), name="related_volume_score_idx"
+            ),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["volume", "related"], name="unique_related_volume"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.volume.title} -> {self.related.title} ({self.score:.3f})"
+
+
+class Job(models.Model):
+    """Represents a queued background task, processed by the run_jobs command."""
+
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    # Not run until released, e.g. by purge_orphaned_covers
+    HELD = "held"
+    STATUS_CHOICES = [
+        (PENDING, "Pending"),
+        (RUNNING, "Running"),
+        (DONE, "Done"),
+        (FAILED, "Failed"),
+        (HELD, "Held"),
+    ]
+
+    task = models.CharField(max_length=100)
+    key = models.CharField(max_length=255, unique=True)
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_at = models.DateTimeField(default=timezone.now)
+    locked_until = models.DateTimeField(blank=True, null=True)
+    last_error = models.TextField(blank=True)
+    created_on = models.DateTimeField(auto_now_add=True)
+    updated_on = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ["run_at"]
+        indexes = [models.Index(fields=["status", "run_at"])]
+
+    def __str__(self):
+        return f"{self.task} [{self.status}] {self.key}"
+
+
+def import_storage():
+    """Storage of uploaded import files, shared by the web and worker processes."""
+    return storages["imports"]
+
+
+class LibraryImport(models.Model):
+    """Represents an uploaded CSV or Goodreads export being added to a user's shelf."""
+
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    STATUS_CHOICES = [
+        (PENDING, "Pending"),
+        (RUNNING, "Running"),
+        (DONE, "Done"),
+        (FAILED, "Failed"),
+    ]
+
+    user = models.ForeignKey(
+        CustomUser, on_delete=models.CASCADE, related_name="library_imports"
+    )
+    filename = models.CharField(max_length=255, blank=True)
+    # Kept until the import is done, so a retried job can resume from it
+    upload = models.FileField(
+        upload_to="imports/%Y/%m/", storage=import_storage, blank=True
+    )
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    processed = models.PositiveIntegerField(default=0)
+    added = models.PositiveIntegerField(default=0)
+    duplicates = models.PositiveIntegerField(default=0)
+    not_found = models.PositiveIntegerField(default=0)
+    skipped = models.PositiveIntegerField(default=0)
+    created_on = models.DateTimeField(auto_now_add=True)
+    finished_on = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        ordering = ["-created_on"]
+
+    def __str__(self):
+        return f"Import {self.filename} [{self.status}] {self.user.username}"
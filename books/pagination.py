@@ -0,0 +1,115 @@
+"""
+Keyset (cursor) pagination with opaque, signed cursors.
+
+Unlike offset pagination, each page is fetched with a ``WHERE`` on the sort
+key of the last row already shown, so the cost of a page doesn't grow with
+its depth and no ``COUNT`` query is needed.
+"""
+
+import datetime
+import json
+from typing import Any, List, Optional, Sequence
+
+from django.core import signing
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q, QuerySet
+
+
+class CursorEncoder(DjangoJSONEncoder):
+    """DjangoJSONEncoder that keeps datetimes to the microsecond."""
+
+    def default(self, o):
+        # The parent rounds to milliseconds, which would make a cursor skip or
+        # repeat rows created within the same millisecond
+        if isinstance(o, datetime.datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+class CursorSerializer(signing.JSONSerializer):
+    """JSON serializer that also accepts dates, datetimes and decimals."""
+
+    def dumps(self, obj):
+        return json.dumps(obj, separators=(",", ":"), cls=CursorEncoder).encode(
+            "latin-1"
+        )
+
+
+class CursorPage:
+    """A page of results plus the cursor for the page that follows it."""
+
+    def __init__(self, object_list: List[Any], next_cursor: Optional[str]):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    @property
+    def has_next(self) -> bool:
+        """Whether there are more results after this page."""
+        return self.next_cursor is not None
+
+
+def encode_cursor(values: Sequence[Any], salt: str) -> str:
+    """Sign sort-key values into an opaque, URL-safe cursor."""
+    return signing.dumps(
+        list(values), salt=salt, serializer=CursorSerializer, compress=True
+    )
+
+
+def decode_cursor(cursor: Optional[str], salt: str) -> Optional[List[Any]]:
+    """Return the sort-key values of a cursor, or None if missing or tampered."""
+    if not cursor:
+        return None
+    try:
+        return signing.loads(cursor, salt=salt, serializer=CursorSerializer)
+    except signing.BadSignature:
+        return None
+
+
+def _after(fields: Sequence[str], values: Sequence[Any], descending: bool) -> Q:
+    """Q object for rows strictly after ``values`` in ``fields`` order."""
+    lookup = "lt" if descending else "gt"
+    condition = Q()
+    equal = {}
+    for field, value in zip(fields, values):
+        condition |= Q(**equal, **{f"{field}__{lookup}": value})
+        equal[field] = value
+    return condition
+
+
+def keyset_paginate(
+    queryset: QuerySet,
+    fields: Sequence[str],
+    cursor: Optional[str],
+    per_page: int,
+    salt: str,
+    descending: bool = True,
+) -> CursorPage:
+    """
+    Return the page of ``queryset`` that follows ``cursor``.
+
+    Args:
+        queryset: Rows to paginate; it is re-ordered by ``fields``
+        fields: Sort-key fields; the last one must be unique
+        cursor: Cursor from a previous page's ``next_cursor`` (None for the start)
+        per_page: Number of rows per page
+        salt: Signing salt, distinct per view so cursors can't be swapped
+        descending: Sort all ``fields`` descending (newest first) or ascending
+    """
+    prefix = "-" if descending else ""
+    queryset = queryset.order_by(*(f"{prefix}{field}" for field in fields))
+    values = decode_cursor(cursor, salt)
+    if values is not None and len(values) == len(fields):
+        queryset = queryset.filter(_after(fields, values, descending))
+
+    rows = list(queryset[: per_page + 1])
+    next_cursor = None
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        next_cursor = encode_cursor([getattr(rows[-1], f) for f in fields], salt)
+    return CursorPage(rows, next_cursor)
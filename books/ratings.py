@@ -0,0 +1,81 @@
+"""
+Denormalized per-book rating aggregates.
+
+``Book.review_count``, ``Book.rating_sum`` and the ``stars_1``..``stars_5``
+histogram let shelf cards and book pages show ratings without an AVG/COUNT
+over the reviews on every render. The database derives
+``Book.rating_average`` from them, indexed for the top-rated leaderboard.
+They are updated atomically with F-expressions as reviews are written and
+deleted, and can be rebuilt from the Review table with
+``manage.py recompute_ratings``.
+"""
+
+from typing import Iterable, Optional
+
+from django.db.models import Count, F, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import Book, Review
+
+
+def _stars(rating: int) -> str:
+    return f"stars_{rating}"
+
+
+def review_added(book_id: int, rating: int):
+    """Count a new review of ``rating`` stars on a book."""
+    Book.objects.filter(pk=book_id).update(
+        review_count=F("review_count") + 1,
+        rating_sum=F("rating_sum") + rating,
+        **{_stars(rating): F(_stars(rating)) + 1},
+    )
+
+
+def review_removed(book_id: int, rating: int):
+    """Remove a deleted review of ``rating`` stars from a book's aggregates."""
+    Book.objects.filter(pk=book_id).update(
+        review_count=Greatest(F("review_count") - 1, 0),
+        rating_sum=Greatest(F("rating_sum") - rating, 0),
+        **{_stars(rating): Greatest(F(_stars(rating)) - 1, 0)},
+    )
+
+
+def review_changed(book_id: int, old_rating: int, new_rating: int):
+    """Move an edited review from ``old_rating`` to ``new_rating`` stars."""
+    if old_rating == new_rating:
+        return
+    Book.objects.filter(pk=book_id).update(
+        rating_sum=Greatest(F("rating_sum") + new_rating - old_rating, 0),
+        **{
+            _stars(old_rating): Greatest(F(_stars(old_rating)) - 1, 0),
+            _stars(new_rating): F(_stars(new_rating)) + 1,
+        },
+    )
+
+
+def recompute_ratings(book_ids: Optional[Iterable[int]] = None) -> int:
+    """
+    Rebuild the rating aggregates from the Review table to repair any drift.
+
+    Args:
+        book_ids: Only recompute these books (all books when None)
+
+    Returns:
+        Number of books updated
+    """
+    books = Book.objects.all()
+    if book_ids is not None:
+        books = books.filter(pk__in=list(book_ids))
+    reviews = Review.objects.filter(book=OuterRef("pk")).order_by().values("book")
+
+    def aggregate(expression):
+        return Coalesce(Subquery(reviews.annotate(value=expression).values("value")), 0)
+
+    return books.update(
+        review_count=aggregate(Count("id")),
+        rating_sum=aggregate(Sum("rating")),
+        **{
+            _stars(rating): aggregate(Count("id", filter=Q(rating=rating)))
+            for rating in range(1, 6)
+        },
+    )
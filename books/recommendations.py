@@ -0,0 +1,215 @@
+"""
+Precomputed "readers also shelved" recommendations.
+
+Two volumes are related when the same readers shelve them: the score is the
+cosine similarity of their reader sets (co-shelving count divided by the
+geometric mean of their popularity), blended with the Jaccard overlap of
+their genre tags. The best ``TOP_K`` neighbors of every volume are stored in
+``RelatedVolume``, so a book page reads them with one indexed query.
+
+Adding or removing a shelf entry marks its volume ``related_stale``, and
+``rebuild_related`` (``manage.py build_recommendations``) only recomputes the
+stale volumes. The mark is cleared with the new neighbors, and only if the
+volume's ``related_version`` is the one the rebuild read. Similarity is symmetric, so neighbors of a changed volume
+drift slightly until they are recomputed themselves; a periodic ``--full``
+rebuild refreshes everything.
+"""
+
+import heapq
+import math
+from collections import Counter, defaultdict
+from itertools import islice
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery
+
+from .models import Book, CustomUser, RelatedVolume, Volume
+
+# Ids per IN (...) clause when loading popularity and genres of candidates
+CHUNK_SIZE = 2000
+# Candidates re-ranked by genre overlap, as a multiple of TOP_K
+SHORTLIST = 4
+
+
+def _chunks(ids: Iterable[int]):
+    iterator = iter(ids)
+    while chunk := list(islice(iterator, CHUNK_SIZE)):
+        yield chunk
+
+
+def mark_stale(volume_ids: Iterable[int]):
+    """Queue volumes whose readers changed for the next rebuild."""
+    Volume.objects.filter(pk__in=list(volume_ids)).update(
+        related_stale=True, related_version=F("related_version") + 1
+    )
+
+
+def _readers(volume_ids: List[int]) -> Dict[int, Set[int]]:
+    readers = defaultdict(set)
+    for volume_id, user_id in Book.objects.filter(volume__in=volume_ids).values_list(
+        "volume_id", "user_id"
+    ):
+        readers[volume_id].add(user_id)
+    return readers
+
+
+def _shelves(user_ids: Set[int]) -> Dict[int, List[int]]:
+    # Huge shelves relate everything to everything and dominate the cost,
+    # so readers above MAX_SHELF_SIZE don't vote
+    voters = CustomUser.objects.filter(
+        pk__in=user_ids, book_count__lte=settings.RECOMMENDATIONS["MAX_SHELF_SIZE"]
+    ).values_list("pk", flat=True)
+    shelves = defaultdict(list)
+    for user_id, volume_id in Book.objects.filter(user__in=voters).values_list(
+        "user_id", "volume_id"
+    ):
+        shelves[user_id].append(volume_id)
+    return shelves
+
+
+def _popularity(volume_ids: Set[int]) -> Dict[int, int]:
+    popularity = {}
+    for chunk in _chunks(volume_ids):
+        popularity.update(
+            Book.objects.filter(volume__in=chunk)
+            .values("volume")
+            .annotate(readers=Count("user", distinct=True))
+            .values_list("volume", "readers")
+        )
+    return popularity
+
+
+def _genres(volume_ids: Set[int]) -> Dict[int, Set[int]]:
+    genres = defaultdict(set)
+    through = Volume.genre_tags.through
+    for chunk in _chunks(volume_ids):
+        for volume_id, genre_id in through.objects.filter(
+            volume_id__in=chunk
+        ).values_list("volume_id", "genre_id"):
+            genres[volume_id].add(genre_id)
+    return genres
+
+
+def _jaccard(first: Set[int], second: Set[int]) -> float:
+    if not first or not second:
+        return 0.0
+    return len(first & second) / len(first | second)
+
+
+def _rebuild_batch(versions: Dict[int, int]) -> int:
+    """Recompute the neighbors of volumes read stale at the given versions."""
+    volume_ids = list(versions)
+    options = settings.RECOMMENDATIONS
+    genre_weight = options["GENRE_WEIGHT"]
+    readers = _readers(volume_ids)
+    shelves = _shelves(set().union(*readers.values()))
+
+    co_shelved = {}
+    for volume_id in volume_ids:
+        counts = Counter()
+        for user_id in readers.get(volume_id, ()):
+            counts.update(shelves.get(user_id, ()))
+        counts.pop(volume_id, None)
+        co_shelved[volume_id] = counts
+
+    candidates = set(volume_ids).union(*co_shelved.values())
+    popularity = _popularity(candidates)
+    weight = {volume_id: 1 / math.sqrt(n) for volume_id, n in popularity.items()}
+
+    def cosine(item):
+        related_id, count = item
+        return count * weight[related_id]
+
+    # Genre overlap only re-ranks a shortlist of the most co-shelved volumes,
+    # so it is computed for a few candidates instead of all of them
+    shortlists = {
+        volume_id: heapq.nlargest(SHORTLIST * options["TOP_K"], counts.items(), cosine)
+        for volume_id, counts in co_shelved.items()
+    }
+    genres = _genres(
+        set(volume_ids).union(
+            related_id
+            for shortlist in shortlists.values()
+            for related_id, _ in shortlist
+        )
+    )
+
+    rows = []
+    for volume_id, shortlist in shortlists.items():
+        scored = (
+            (
+                (1 - genre_weight) * weight[volume_id] * cosine(item)
+                + genre_weight * _jaccard(genres[volume_id], genres[item[0]]),
+                item[0],
+            )
+            for item in shortlist
+        )
+        rows += [
+            RelatedVolume(volume_id=volume_id, related_id=related_id, score=score)
+            for score, related_id in heapq.nlargest(options["TOP_K"], scored)
+        ]
+
+    # Volumes marked again since they were read stay stale for the next pass
+    by_version = defaultdict(list)
+    for volume_id, version in versions.items():
+        by_version[version].append(volume_id)
+    with transaction.atomic():
+        RelatedVolume.objects.filter(volume__in=volume_ids).delete()
+        RelatedVolume.objects.bulk_create(rows)
+        for version, ids in by_version.items():
+            Volume.objects.filter(pk__in=ids, related_version=version).update(
+                related_stale=False
+            )
+    return len(rows)
+
+
+def rebuild_related(
+    full: bool = False, progress: Optional[Callable[[int, int], None]] = None
+) -> int:
+    """
+    Recompute the neighbors of every stale volume, in batches.
+
+    Args:
+        full: Mark every volume stale first, rebuilding all recommendations
+        progress: Called with (volumes done, neighbor rows written) per batch
+
+    Returns:
+        Number of volumes recomputed
+    """
+    if full:
+        Volume.objects.update(related_stale=True)
+    done = written = 0
+    while True:
+        versions = dict(
+            Volume.objects.filter(related_stale=True)
+            .order_by("id")
+            .values_list("pk", "related_version")[
+                : settings.RECOMMENDATIONS["BATCH_SIZE"]
+            ]
+        )
+        if not versions:
+            return done
+        written += _rebuild_batch(versions)
+        done += len(versions)
+        if progress is not None:
+            progress(done, written)
+
+
+def related_books(book: Book, limit: int) -> List[RelatedVolume]:
+    """
+    Return the best neighbors of a book's volume, each with a ``book_id``.
+
+    ``book_id`` is the newest shelf entry of the neighbor, for linking to its
+    book page; neighbors no longer on any shelf are skipped.
+    """
+    newest_entry = Book.objects.filter(volume=OuterRef("related")).order_by("-id")
+    return [
+        neighbor
+        for neighbor in RelatedVolume.objects.filter(volume=book.volume_id)
+        .select_related("related")
+        .annotate(book_id=Subquery(newest_entry.values("id")[:1]))
+        .order_by("-score")[:limit]
+        if neighbor.book_id is not None
+    ]
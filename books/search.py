@@ -0,0 +1,221 @@
+"""
+Local full-text search over the volumes already on users' shelves.
+
+On PostgreSQL volumes are indexed in ``Volume.search_vector`` (a weighted
+``tsvector`` with a GIN index). On SQLite, used in development and tests,
+they are indexed in the ``books_volume_fts`` FTS5 virtual table. Both indexes
+are kept current by the ``post_save``/``post_delete`` signals on Volume.
+"""
+
+import re
+from typing import Dict, List, Optional
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db import connection
+from django.db.models import F
+from django.utils.html import escape
+
+from . import suggest
+from .models import Volume
+from .services import AsyncGoogleBooksService, GoogleBooksService
+
+FTS_TABLE = "books_volume_fts"
+
+BOOK_VECTOR = (
+    SearchVector("title", weight="A")
+    + SearchVector("author", weight="B")
+    + SearchVector("description", weight="C")
+)
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def _is_postgres() -> bool:
+    return connection.vendor == "postgresql"
+
+
+def index_volume(volume: Volume):
+    """Add or refresh a volume in the full-text index."""
+    if _is_postgres():
+        Volume.objects.filter(pk=volume.pk).update(search_vector=BOOK_VECTOR)
+    elif connection.vendor == "sqlite":
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT OR REPLACE INTO {FTS_TABLE}(rowid, title, author, description) "
+                "VALUES (%s, %s, %s, %s)",
+                [volume.pk, volume.title, volume.author, volume.description],
+            )
+
+
+def index_volumes(volume_ids: List[int]):
+    """Add or refresh many volumes in the full-text index, e.g. after bulk_create."""
+    if _is_postgres():
+        Volume.objects.filter(pk__in=volume_ids).update(search_vector=BOOK_VECTOR)
+    elif connection.vendor == "sqlite" and volume_ids:
+        placeholders = ", ".join(["%s"] * len(volume_ids))
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT OR REPLACE INTO {FTS_TABLE}(rowid, title, author, description) "
+                "SELECT id, title, author, description FROM books_volume "
+                f"WHERE id IN ({placeholders})",
+                list(volume_ids),
+            )
+
+
+def remove_volume(volume_id: int):
+    """Drop a deleted volume from the full-text index."""
+    if connection.vendor == "sqlite":
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [volume_id])
+
+
+def rebuild_index():
+    """Re-index every volume from scratch."""
+    if _is_postgres():
+        Volume.objects.update(search_vector=BOOK_VECTOR)
+    elif connection.vendor == "sqlite":
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE}")
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE}(rowid, title, author, description) "
+                "SELECT id, title, author, description FROM books_volume"
+            )
+
+
+def _tokens(*values: Optional[str]) -> List[str]:
+    return [token for value in values if value for token in TOKEN_RE.findall(value)]
+
+
+def _ranked_ids(tokens: List[str], limit: int) -> List[int]:
+    """Return volume IDs matching every token, best match first."""
+    if _is_postgres():
+        query = SearchQuery(" ".join(tokens), search_type="plain")
+        return list(
+            Volume.objects.filter(search_vector=query)
+            .annotate(rank=SearchRank(F("search_vector"), query))
+            .order_by("-rank", "-id")
+            .values_list("id", flat=True)[:limit]
+        )
+    if connection.vendor == "sqlite":
+        # Quote each token so user input can't inject FTS5 syntax, and let the
+        # last one match as a prefix of a longer word.
+        terms = [f'"{token}"' for token in tokens]
+        terms[-1] += "*"
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s "
+                f"ORDER BY bm25({FTS_TABLE}, 10.0, 5.0, 1.0) LIMIT %s",
+                [" AND ".join(terms), limit],
+            )
+            return [row[0] for row in cursor.fetchall()]
+    return []
+
+
+def highlight(text: str, tokens: List[str], length: int = 200) -> str:
+    """
+    Return an HTML-escaped excerpt of ``text`` with matched words in ``<mark>``.
+
+    The excerpt starts shortly before the first match, so long descriptions
+    show the relevant passage.
+    """
+    if not text:
+        return ""
+    pattern = re.compile(
+        r"\b(" + "|".join(re.escape(t) for t in tokens) + r")\w*", re.IGNORECASE
+    )
+    match = pattern.search(text)
+    start = max(match.start() - 40, 0) if match else 0
+    excerpt = text[start : start + length]
+    marked = pattern.sub(lambda m: "\x00" + m.group(0) + "\x01", excerpt)
+    marked = escape(marked).replace("\x00", "<mark>").replace("\x01", "</mark>")
+    return (
+        ("..." if start else "")
+        + marked
+        + ("..." if start + length < len(text) else "")
+    )
+
+
+def search_local(title: str, author: str = None, max_results: int = 10) -> List[Dict]:
+    """
+    Search the local catalog, returning results shaped like the Google API's.
+
+    Each result carries ``source: "local"``, the ``volume_id`` to shelve it
+    by and a ``highlight`` excerpt.
+    """
+    tokens = _tokens(title, author)
+    if not tokens:
+        return []
+    ids = _ranked_ids(tokens, max_results)
+    volumes = Volume.objects.in_bulk(ids)
+
+    results = []
+    for volume_id in ids:
+        volume = volumes.get(volume_id)
+        if volume is None:
+            continue
+        results.append(
+            {
+                "volume_id": volume.pk,
+                "google_books_id": volume.google_books_id,
+                "isbn": volume.isbn,
+                "title": volume.title,
+                "author": volume.author,
+                "published": volume.published.isoformat() if volume.published else None,
+                "description": volume.description,
+                "genres": volume.genres,
+                "cover_url": volume.cover.url if volume.cover else None,
+                "preview_link": "",
+                "info_link": "",
+                "subtitle": "",
+                "language": "en",
+                "source": "local",
+                "highlight": highlight(
+                    f"{volume.title} by {volume.author}. {volume.description}", tokens
+                ),
+            }
+        )
+    return results
+
+
+def _merge(local: List[Dict], remote: List[Dict], max_results: int) -> List[Dict]:
+    seen = {(book["title"].lower(), book["author"].lower()) for book in local}
+    known = {book["google_books_id"] for book in local if book["google_books_id"]}
+    merged = list(local)
+    for book in remote:
+        identity = (book["title"].lower(), book["author"].lower())
+        if identity not in seen and book.get("google_books_id") not in known:
+            seen.add(identity)
+            merged.append(book)
+    return merged[:max_results]
+
+
+def search_books(title: str, author: str = None, max_results: int = 10) -> List[Dict]:
+    """
+    Answer a search from the local index, calling Google only when needed.
+
+    Google Books is queried only when fewer than ``LOCAL_SEARCH_MIN_RESULTS``
+    local matches are found; its results are then appended after the local
+    ones, skipping books already listed.
+    """
+    local = search_local(title, author, max_results)
+    if len(local) >= settings.LOCAL_SEARCH_MIN_RESULTS:
+        return local
+    remote = GoogleBooksService.search_books(title, author, max_results=max_results)
+    suggest.add_results(remote)
+    return _merge(local, remote, max_results)
+
+
+async def asearch_books(
+    title: str, author: str = None, max_results: int = 10
+) -> List[Dict]:
+    """Async variant of search_books for the async search views."""
+    local = await sync_to_async(search_local)(title, author, max_results)
+    if len(local) >= settings.LOCAL_SEARCH_MIN_RESULTS:
+        return local
+    remote = await AsyncGoogleBooksService.search_books(
+        title, author, max_results=max_results
+    )
+    await sync_to_async(suggest.add_results)(remote)
+    return _merge(local, remote, max_results)
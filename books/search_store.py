@@ -0,0 +1,59 @@
+"""
+Short-lived, server-side store for book search results.
+
+A search saves its results under an opaque token, and the selection page
+posts back only ``(token, result_id)``. This keeps large result lists (with
+their descriptions) out of the session and out of request bodies.
+"""
+
+import secrets
+from typing import Dict, List, Optional
+
+from django.conf import settings
+from django.core.cache import caches
+
+
+def _cache():
+    return caches[settings.SEARCH_RESULTS_CACHE_ALIAS]
+
+
+def _key(token: str) -> str:
+    return f"search-results:{token}"
+
+
+def save_results(results: List[Dict], user_id: int) -> str:
+    """
+    Store a user's search results and give each one a ``result_id``.
+
+    Args:
+        results: Book dictionaries, as returned by the search functions
+        user_id: Owner of the results; only they can select from them
+
+    Returns:
+        Opaque token identifying the stored results
+    """
+    token = secrets.token_urlsafe(12)
+    results = results[: settings.SEARCH_RESULTS_MAX]
+    for index, book in enumerate(results):
+        book["result_id"] = str(index)
+    _cache().set(
+        _key(token),
+        {"user_id": user_id, "results": results},
+        settings.SEARCH_RESULTS_TTL,
+    )
+    return token
+
+
+def get_result(token: str, result_id: str, user_id: int) -> Optional[Dict]:
+    """
+    Return one stored result, or None if it expired or belongs to someone else.
+    """
+    if not token or not result_id:
+        return None
+    stored = _cache().get(_key(token))
+    if not stored or stored["user_id"] != user_id:
+        return None
+    for book in stored["results"]:
+        if book["result_id"] == result_id:
+            return book
+    return None
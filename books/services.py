@@ -2,18 +2,167 @@
 Google Books API service for fetching book information.
 """
 
+import asyncio
 import logging
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import List, Dict, Optional
+from typing import Any, Awaitable, Callable, Iterable, List, Dict, Optional
+import httpx
 import requests
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import DatabaseError
+from django.utils import timezone
+
+from .cache import ResultCache
+from .http import RETRY_STATUSES, build_session, http_options, http_timeout
+from .tasks import enqueue
+from .timing import timed
+from .upstream import (
+    CircuitBreaker,
+    QuotaLimiter,
+    SingleFlight,
+    UpstreamLimited,
+    breaker_options,
+    limits,
+    metrics,
+)
 
 logger = logging.getLogger(__name__)
 
 
 class GoogleBooksService:
-    """Service class for interacting with Google Books API."""
+    """
+    Service class for interacting with Google Books API.
+
+    Calls go through a circuit breaker. While the API is failing, the last
+    good result for a lookup is served instead of nothing, and a background
+    job fetches it again once the API recovers.
+    """
+
+    BASE_URL = getattr(
+        settings, "GOOGLE_BOOKS_BASE_URL", "https://www.googleapis.com/books/v1"
+    )
+
+    _result_cache = None
+    _stale_cache = None
+    _limiter = None
+    _breaker = None
+    _flight = SingleFlight()
+    _session = None
+    _session_lock = threading.Lock()
+
+    @classmethod
+    def session(cls) -> requests.Session:
+        """Return the shared connection-pooled session for this worker."""
+        if cls._session is None:
+            with cls._session_lock:
+                if cls._session is None:
+                    cls._session = build_session()
+        return cls._session
+
+    @classmethod
+    def result_cache(cls) -> ResultCache:
+        """Return the shared read-through cache for API results."""
+        if cls._result_cache is None:
+            cls._result_cache = ResultCache.from_settings(prefix="google_books.v2")
+        return cls._result_cache
+
+    @classmethod
+    def limiter(cls) -> QuotaLimiter:
+        """Return the QPS and daily budget limiter shared by sync and async calls."""
+        if cls._limiter is None:
+            cls._limiter = QuotaLimiter.from_settings()
+        return cls._limiter
+
+    @classmethod
+    def stale_cache(cls) -> ResultCache:
+        """Return the long-lived cache of the last good result of each lookup."""
+        if cls._stale_cache is None:
+            options = breaker_options()
+            cls._stale_cache = ResultCache(
+                alias=settings.GOOGLE_BOOKS_CACHE["ALIAS"],
+                prefix="google_books.stale",
+                timeout=options["STALE_TTL"],
+                max_entries=options["STALE_MAX_ENTRIES"],
+            )
+        return cls._stale_cache
+
+    @classmethod
+    def breaker(cls) -> CircuitBreaker:
+        """Return the circuit breaker shared by sync and async calls."""
+        if cls._breaker is None:
+            cls._breaker = CircuitBreaker.from_settings()
+        return cls._breaker
+
+    @classmethod
+    def _coalesced(cls, cache_key: str, fetch: Callable[[], Any]) -> Any:
+        """Run ``fetch`` once for concurrent identical lookups."""
+        cache = cls.result_cache() if limits()["CROSS_PROCESS"] else None
+        return cls._flight.run(cache_key, fetch, cache)
+
+    @classmethod
+    def _call(cls, path: str, params: Dict = None) -> Optional[Dict]:
+        """GET an API path within the limits and the breaker; None on a 404."""
+        with cls.breaker().guard():
+            cls.limiter().acquire()
+            response = cls.session().get(
+                f"{cls.BASE_URL}{path}", params=params, timeout=http_timeout()
+            )
+            if response.status_code == 404:
+                return None
+            response.raise_for_status()
+            return response.json()
+
+    @classmethod
+    def _store(cls, cache_key: str, value: Any):
+        """Cache a fresh result, keeping a long-lived copy of non-empty ones."""
+        # Empty results are cached briefly so repeated typos stay local
+        cls.result_cache().set(cache_key, value, negative=not value)
+        if value:
+            cls.stale_cache().set(f"{cache_key}:stale", value)
+
+    @classmethod
+    def _stale(cls, cache_key: str, default: Any, lookup: Dict) -> Any:
+        """
+        Return the last good result for a failed lookup, or ``default``.
 
-    BASE_URL = "https://www.googleapis.com/books/v1"
+        A stale result is refreshed by a ``refresh_google_result`` job, queued
+        at most once an hour per lookup and retried until the API answers.
+        """
+        hit, value = cls.stale_cache().get(f"{cache_key}:stale")
+        if not hit:
+            return default
+        metrics.record("stale")
+        try:
+            enqueue(
+                "refresh_google_result",
+                {"cache_key": cache_key, **lookup},
+                key=f"refresh:{cache_key}:{timezone.now():%Y%m%d%H}",
+                delay=breaker_options()["OPEN_SECONDS"],
+            )
+        except DatabaseError as e:
+            logger.error("Could not queue a refresh of %s: %s", cache_key, e)
+        return value
+
+    @classmethod
+    def refresh(cls, cache_key: str, params: Dict = None, google_books_id: str = None):
+        """
+        Fetch a lookup again and cache it, raising while the API still fails.
+
+        Args:
+            cache_key: Result cache key of the lookup
+            params: Volumes query parameters, for searches
+            google_books_id: Volume ID, for single volume lookups
+        """
+        if params is not None:
+            value = cls._parse_search_results(cls._call("/volumes", params) or {})
+        else:
+            data = cls._call(f"/volumes/{google_books_id}")
+            value = cls._format_book_data(data) if data is not None else None
+        cls._store(cache_key, value)
 
     @classmethod
     def search_books(
@@ -30,43 +179,55 @@ class GoogleBooksService:
         Returns:
             List of book dictionaries with standardized fields
         """
-        try:
-            # Construct search query
-            query = f'intitle:"{title}"'
-            if author:
-                query += f'+inauthor:"{author}"'
-
-            params = {
-                "q": query,
-                "maxResults": min(max_results, 40),  # API limit is 40
-                "printType": "books",
-            }
+        max_results = min(max_results, 40)  # API limit is 40
+        cache_key = cls.result_cache().make_key("search", title, author, max_results)
+        return cls._fetch_volumes(
+            cls._search_params(title, author, max_results), cache_key
+        )
 
-            response = requests.get(
-                f"{cls.BASE_URL}/volumes", params=params, timeout=10
-            )
-            response.raise_for_status()
+    @classmethod
+    def find_by_isbn(cls, isbn: str) -> Optional[Dict]:
+        """
+        Look up a single book by its ISBN-10 or ISBN-13.
 
-            data = response.json()
-            books = []
+        Returns:
+            Book dictionary with standardized fields or None if not found
+        """
+        cache_key = cls.result_cache().make_key("isbn", isbn)
+        books = cls._fetch_volumes(
+            {"q": f"isbn:{isbn}", "maxResults": 1, "printType": "books"}, cache_key
+        )
+        return books[0] if books else None
 
-            if "items" in data:
-                for item in data["items"]:
-                    book_data = cls._format_book_data(item)
-                    if book_data:  # Only add if we got valid data
-                        books.append(book_data)
+    @classmethod
+    def _fetch_volumes(cls, params: Dict, cache_key: str) -> List[Dict]:
+        """Run a volumes query through the result cache, returning [] on errors."""
+        cache = cls.result_cache()
+        hit, cached_books = cache.get(cache_key)
+        if hit:
+            return cached_books
 
-            return books
+        return cls._coalesced(
+            cache_key, lambda: cls._request_volumes(params, cache_key)
+        )
 
+    @classmethod
+    def _request_volumes(cls, params: Dict, cache_key: str) -> List[Dict]:
+        """Call the volumes endpoint and cache the result, or serve it stale."""
+        try:
+            books = cls._parse_search_results(cls._call("/volumes", params) or {})
+        except UpstreamLimited as e:
+            logger.warning("Google Books API call skipped: %s", e)
         except requests.exceptions.Timeout:
             logger.error("Google Books API request timed out")
-            return []
         except requests.exceptions.RequestException as e:
             logger.error("Error calling Google Books API: %s", e)
-            return []
         except (ValueError, KeyError, TypeError) as e:
             logger.error("Data formatting error in search_books: %s", e)
-            return []
+        else:
+            cls._store(cache_key, books)
+            return books
+        return cls._stale(cache_key, [], {"params": params})
 
     @classmethod
     def get_book_by_id(cls, google_books_id: str) -> Optional[Dict]:
@@ -79,20 +240,81 @@ class GoogleBooksService:
         Returns:
             Book dictionary with standardized fields or None if not found
         """
-        try:
-            response = requests.get(
-                f"{cls.BASE_URL}/volumes/{google_books_id}", timeout=10
-            )
-            response.raise_for_status()
-            data = response.json()
-            return cls._format_book_data(data)
+        cache = cls.result_cache()
+        cache_key = cache.make_key("volume", google_books_id)
+        hit, cached_book = cache.get(cache_key)
+        if hit:
+            return cached_book
+
+        return cls._coalesced(
+            cache_key, lambda: cls._request_volume(google_books_id, cache_key)
+        )
 
+    @classmethod
+    def _request_volume(cls, google_books_id: str, cache_key: str) -> Optional[Dict]:
+        """Fetch one volume and cache the result, or serve it stale."""
+        try:
+            data = cls._call(f"/volumes/{google_books_id}")
+            book = cls._format_book_data(data) if data is not None else None
+        except UpstreamLimited as e:
+            logger.warning("Google Books API call skipped: %s", e)
         except requests.exceptions.RequestException as e:
             logger.error("Error fetching book by ID %s: %s", google_books_id, e)
-            return None
         except (ValueError, KeyError, TypeError) as e:
             logger.error("Data formatting error in get_book_by_id: %s", e)
-            return None
+        else:
+            cls._store(cache_key, book)
+            return book
+        return cls._stale(cache_key, None, {"google_books_id": google_books_id})
+
+    @classmethod
+    def get_books_by_ids(
+        cls, google_books_ids: Iterable[str]
+    ) -> Dict[str, Optional[Dict]]:
+        """
+        Get many books concurrently over the shared connection pool.
+
+        Args:
+            google_books_ids: Google Books volume IDs (duplicates are fetched once)
+
+        Returns:
+            Dictionary mapping each ID to its book dictionary, or None if not found
+        """
+        unique_ids = list(dict.fromkeys(google_books_ids))
+        if not unique_ids:
+            return {}
+
+        workers = min(len(unique_ids), http_options()["POOL_MAXSIZE"])
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            books = executor.map(cls.get_book_by_id, unique_ids)
+            return dict(zip(unique_ids, books))
+
+    @classmethod
+    def _search_params(cls, title: str, author: str, max_results: int) -> Dict:
+        """Build the volumes query parameters for a title/author search."""
+        # Construct search query
+        query = f'intitle:"{title}"'
+        if author:
+            query += f'+inauthor:"{author}"'
+
+        return {
+            "q": query,
+            "maxResults": max_results,
+            "printType": "books",
+        }
+
+    @classmethod
+    def _parse_search_results(cls, data: Dict) -> List[Dict]:
+        """Format every valid item of a volumes search response."""
+        books = []
+
+        if "items" in data:
+            for item in data["items"]:
+                book_data = cls._format_book_data(item)
+                if book_data:  # Only add if we got valid data
+                    books.append(book_data)
+
+        return books
 
     @classmethod
     def _format_book_data(cls, item: Dict) -> Optional[Dict]:
@@ -149,18 +371,19 @@ class GoogleBooksService:
             # Extract description
             description = volume_info.get("description", "")
 
+            # Extract the ISBN, preferring ISBN-13
+            isbns = {
+                identifier.get("type"): identifier.get("identifier")
+                for identifier in volume_info.get("industryIdentifiers", [])
+            }
+            isbn = isbns.get("ISBN_13") or isbns.get("ISBN_10") or ""
+
             # Extract other useful info (commented out for simplified version)
             # page_count = volume_info.get('pageCount')
             # publisher = volume_info.get('publisher', '')
-            # isbn_list = volume_info.get('industryIdentifiers', [])
-            # isbn = None
-            # for identifier in isbn_list:
-            #     if identifier.get('type') in ['ISBN_13', 'ISBN_10']:
-            #         isbn = identifier.get('identifier')
-            #         break
 
             return {
-                # 'google_books_id': item.get('id'),
+                "google_books_id": item.get("id"),
                 "title": title,
                 "author": author,
                 "published": parsed_date.isoformat() if parsed_date else None,
@@ -169,7 +392,7 @@ class GoogleBooksService:
                 "cover_url": cover_url,
                 # 'publisher': publisher,
                 # 'page_count': page_count,
-                # 'isbn': isbn,
+                "isbn": isbn,
                 "preview_link": volume_info.get("previewLink", ""),
                 "info_link": volume_info.get("infoLink", ""),
                 "subtitle": volume_info.get("subtitle", ""),
@@ -179,3 +402,200 @@ class GoogleBooksService:
         except (ValueError, KeyError, TypeError) as e:
             logger.error("Error formatting book data: %s", e)
             return None
+
+
+class AsyncGoogleBooksService:
+    """
+    Non-blocking counterpart of GoogleBooksService for async views.
+
+    Shares the result caches, limits, circuit breaker and response formatting
+    of the sync service, but sends requests through an httpx.AsyncClient so a single ASGI worker can
+    keep many searches in flight at once.
+    """
+
+    _client = None
+    _client_loop = None
+    _calls = {}
+    _calls_loop = None
+
+    @classmethod
+    def client(cls) -> httpx.AsyncClient:
+        """Return the pooled async client bound to the running event loop."""
+        loop = asyncio.get_running_loop()
+        if cls._client is None or cls._client_loop is not loop:
+            options = http_options()
+            connect_timeout, read_timeout = http_timeout()
+            cls._client = httpx.AsyncClient(
+                base_url=GoogleBooksService.BASE_URL,
+                timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+                limits=httpx.Limits(
+                    max_connections=options["POOL_MAXSIZE"],
+                    max_keepalive_connections=options["POOL_MAXSIZE"],
+                ),
+                transport=httpx.AsyncHTTPTransport(retries=options["RETRIES"]),
+            )
+            cls._client_loop = loop
+        return cls._client
+
+    @classmethod
+    async def _coalesced(cls, cache_key: str, fetch: Callable[[], Awaitable]) -> Any:
+        """Await one ``fetch()`` for concurrent identical lookups on this loop."""
+        loop = asyncio.get_running_loop()
+        if cls._calls_loop is not loop:
+            cls._calls = {}
+            cls._calls_loop = loop
+        task = cls._calls.get(cache_key)
+        if task is None:
+            task = cls._calls[cache_key] = asyncio.ensure_future(fetch())
+            task.add_done_callback(lambda _: cls._calls.pop(cache_key, None))
+        else:
+            metrics.record("coalesced")
+        # Shielded, so one caller going away doesn't cancel the others' call
+        return await asyncio.shield(task)
+
+    @classmethod
+    async def _get(cls, url: str, **kwargs) -> httpx.Response:
+        """GET with jittered backoff on 429/5xx, mirroring the sync retry policy."""
+        wait = await GoogleBooksService.limiter().areserve()
+        if wait:
+            await asyncio.sleep(wait)
+        options = http_options()
+        attempt = 0
+        while True:
+            with timed("google"):
+                response = await cls.client().get(url, **kwargs)
+            if (
+                response.status_code not in RETRY_STATUSES
+                or attempt >= options["RETRIES"]
+            ):
+                return response
+            delay = options["BACKOFF_FACTOR"] * (2**attempt) + random.uniform(
+                0, options["BACKOFF_JITTER"]
+            )
+            retry_after = response.headers.get("Retry-After", "")
+            if retry_after.isdigit():
+                # A longer wait fails the call, as in the sync session
+                if int(retry_after) > options["MAX_RETRY_AFTER"]:
+                    return response
+                delay = max(delay, int(retry_after))
+            attempt += 1
+            await asyncio.sleep(delay)
+
+    @classmethod
+    async def search_books(
+        cls, title: str, author: str = None, max_results: int = 10
+    ) -> List[Dict]:
+        """
+        Search for books using title and optionally author.
+
+        Args:
+            title: Book title to search for
+            author: Optional author name
+            max_results: Maximum number of results to return (1-40)
+
+        Returns:
+            List of book dictionaries with standardized fields
+        """
+        max_results = min(max_results, 40)  # API limit is 40
+        cache = GoogleBooksService.result_cache()
+        cache_key = cache.make_key("search", title, author, max_results)
+        hit, cached_books = await sync_to_async(cache.get)(cache_key)
+        if hit:
+            return cached_books
+
+        params = GoogleBooksService._search_params(title, author, max_results)
+        return await cls._coalesced(
+            cache_key, lambda: cls._request_volumes(params, cache_key)
+        )
+
+    @classmethod
+    async def _call(cls, path: str, params: Dict = None) -> Optional[Dict]:
+        """GET an API path within the limits and the breaker; None on a 404."""
+        with GoogleBooksService.breaker().guard():
+            response = await cls._get(path, params=params)
+            if response.status_code == 404:
+                return None
+            response.raise_for_status()
+            return response.json()
+
+    @classmethod
+    async def _request_volumes(cls, params: Dict, cache_key: str) -> List[Dict]:
+        """Call the volumes endpoint and cache the result, or serve it stale."""
+        try:
+            data = await cls._call("/volumes", params)
+            books = GoogleBooksService._parse_search_results(data or {})
+        except UpstreamLimited as e:
+            logger.warning("Google Books API call skipped: %s", e)
+        except httpx.TimeoutException:
+            logger.error("Google Books API request timed out")
+        except httpx.HTTPError as e:
+            logger.error("Error calling Google Books API: %s", e)
+        except (ValueError, KeyError, TypeError) as e:
+            logger.error("Data formatting error in search_books: %s", e)
+        else:
+            await sync_to_async(GoogleBooksService._store)(cache_key, books)
+            return books
+        return await sync_to_async(GoogleBooksService._stale)(
+            cache_key, [], {"params": params}
+        )
+
+    @classmethod
+    async def get_book_by_id(cls, google_books_id: str) -> Optional[Dict]:
+        """
+        Get detailed book information by Google Books ID.
+
+        Args:
+            google_books_id: The Google Books volume ID
+
+        Returns:
+            Book dictionary with standardized fields or None if not found
+        """
+        cache = GoogleBooksService.result_cache()
+        cache_key = cache.make_key("volume", google_books_id)
+        hit, cached_book = await sync_to_async(cache.get)(cache_key)
+        if hit:
+            return cached_book
+
+        return await cls._coalesced(
+            cache_key, lambda: cls._request_volume(google_books_id, cache_key)
+        )
+
+    @classmethod
+    async def _request_volume(
+        cls, google_books_id: str, cache_key: str
+    ) -> Optional[Dict]:
+        """Fetch one volume and cache the result, or serve it stale."""
+        try:
+            data = await cls._call(f"/volumes/{google_books_id}")
+            book = (
+                GoogleBooksService._format_book_data(data) if data is not None else None
+            )
+        except UpstreamLimited as e:
+            logger.warning("Google Books API call skipped: %s", e)
+        except httpx.HTTPError as e:
+            logger.error("Error fetching book by ID %s: %s", google_books_id, e)
+        except (ValueError, KeyError, TypeError) as e:
+            logger.error("Data formatting error in get_book_by_id: %s", e)
+        else:
+            await sync_to_async(GoogleBooksService._store)(cache_key, book)
+            return book
+        return await sync_to_async(GoogleBooksService._stale)(
+            cache_key, None, {"google_books_id": google_books_id}
+        )
+
+    @classmethod
+    async def get_books_by_ids(
+        cls, google_books_ids: Iterable[str]
+    ) -> Dict[str, Optional[Dict]]:
+        """
+        Get many books concurrently over the shared async client.
+
+        Args:
+            google_books_ids: Google Books volume IDs (duplicates are fetched once)
+
+        Returns:
+            Dictionary mapping each ID to its book dictionary, or None if not found
+        """
+        unique_ids = list(dict.fromkeys(google_books_ids))
+        books = await asyncio.gather(*(cls.get_book_by_id(i) for i in unique_ids))
+        return dict(zip(unique_ids, books))
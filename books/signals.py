@@ -0,0 +1,103 @@
+"""Signal handlers for the books app."""
+
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import (
+    counters,
+    dbpool,
+    fragments,
+    ratings,
+    recommendations,
+    search,
+    suggest,
+    timing,
+)
+from .models import Book, CustomUser, Review, Volume
+
+
+@receiver(post_save, sender=Volume)
+def index_saved_volume(sender, instance, created, **kwargs):
+    """Keep the search indexes and the cached cards of its shelf entries current."""
+    search.index_volume(instance)
+    if created:
+        suggest.add_volumes([instance])
+    else:
+        fragments.bump_volume(instance.pk)
+
+
+@receiver(post_delete, sender=Volume)
+def unindex_deleted_volume(sender, instance, **kwargs):
+    """Remove a deleted volume from the full-text index."""
+    search.remove_volume(instance.pk)
+
+
+@receiver(post_save, sender=Book)
+def count_saved_book(sender, instance, created, **kwargs):
+    """Keep the owner's shelf counters and cached cards up to date."""
+    if created:
+        counters.book_added(instance.user_id, instance.added_on)
+        recommendations.mark_stale([instance.volume_id])
+        suggest.book_shelved(instance.volume_id)
+    fragments.bump("book", instance.pk)
+    fragments.bump("user", instance.user_id)
+
+
+@receiver(post_delete, sender=Book)
+def uncount_deleted_book(sender, instance, origin=None, **kwargs):
+    """Remove a deleted book from its owner's shelf counters and recommendations."""
+    # Books cascading from a deleted account have no counters left to update
+    if not isinstance(origin, CustomUser):
+        counters.book_removed(instance.user_id)
+        fragments.bump("user", instance.user_id)
+    fragments.bump("book", instance.pk)
+    recommendations.mark_stale([instance.volume_id])
+
+
+@receiver(post_save, sender=Review)
+def rate_saved_review(sender, instance, created, **kwargs):
+    """Keep the reviewed book's rating aggregates and cached card up to date."""
+    current = (instance.book_id, instance.rating)
+    previous = getattr(instance, "loaded_rating", None)
+    if created:
+        ratings.review_added(instance.book_id, instance.rating)
+    elif previous is None:
+        # Saved without having been loaded, so the old rating is unknown
+        ratings.recompute_ratings([instance.book_id])
+    elif previous[0] != instance.book_id:
+        ratings.review_removed(*previous)
+        ratings.review_added(*current)
+        fragments.bump("book", previous[0])
+    else:
+        ratings.review_changed(instance.book_id, previous[1], instance.rating)
+    instance.loaded_rating = current
+    fragments.bump("book", instance.book_id)
+
+
+@receiver(post_delete, sender=Review)
+def unrate_deleted_review(sender, instance, origin=None, **kwargs):
+    """Remove a deleted review from its book's rating aggregates."""
+    # Reviews cascading from a deleted book have no aggregates left to update
+    if not isinstance(origin, Book):
+        ratings.review_removed(instance.book_id, instance.rating)
+        fragments.bump("book", instance.book_id)
+
+
+@receiver(post_save, sender=CustomUser)
+@receiver(post_delete, sender=CustomUser)
+def invalidate_user_fragments(sender, instance, **kwargs):
+    """Re-render the user's shelf card after profile changes (e.g. a new image)."""
+    fragments.bump("user", instance.pk)
+
+
+@receiver(connection_created)
+def count_connection(sender, connection, **kwargs):
+    """Count database connects for the pool statistics."""
+    dbpool.connection_opened()
+
+
+@receiver(connection_created)
+def time_connection_queries(sender, connection, **kwargs):
+    """Time the connection's queries for ``ServerTimingMiddleware``."""
+    timing.instrument_connection(connection)
@@ -0,0 +1,161 @@
+"""
+Title autocomplete for the search form.
+
+Suggestions come from the ``Suggestion`` table: the title and author of every
+volume (weighted by its shelf entries) plus titles seen in Google results.
+On PostgreSQL they are matched with a ``varchar_pattern_ops`` prefix index,
+then ``pg_trgm`` word similarity, which also forgives typos. On other
+databases (development and tests) each process keeps a sorted array of the
+start of every word, searched by bisection and reloaded every
+``SUGGEST["MEMORY_TTL"]`` seconds.
+"""
+
+import bisect
+import heapq
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+
+from django.conf import settings
+from django.contrib.postgres.lookups import TrigramWordSimilar
+from django.contrib.postgres.search import TrigramWordSimilarity
+from django.db import connection
+from django.db.models import F
+
+from .models import Suggestion, Volume
+
+# Entries of the in-memory index scanned per query, bounding short prefixes
+MAX_SCAN = 5000
+
+
+def normalize(text: str) -> str:
+    """Lowercase ``text`` and collapse its whitespace, as suggestions are stored."""
+    return " ".join(text.lower().split())[:300]
+
+
+def _suggestion(title: str, author: str, volume_id: Optional[int] = None):
+    return Suggestion(
+        normalized=normalize(f"{title} {author}"),
+        title=title[:200],
+        author=author[:100],
+        volume_id=volume_id,
+    )
+
+
+def add_volumes(volumes: Iterable[Volume]):
+    """Offer new volumes as suggestions, linking any already seen on Google."""
+    # An upsert may not touch the same row twice, so editions of one title
+    # (same normalized text) are offered once
+    suggestions = {}
+    for volume in volumes:
+        suggestion = _suggestion(volume.title, volume.author, volume.pk)
+        suggestions.setdefault(suggestion.normalized, suggestion)
+    Suggestion.objects.bulk_create(
+        suggestions.values(),
+        update_conflicts=True,
+        unique_fields=["normalized"],
+        update_fields=["volume"],
+    )
+
+
+def add_results(results: Iterable[Dict]):
+    """Remember titles returned by Google Books, so they can be suggested."""
+    Suggestion.objects.bulk_create(
+        (
+            _suggestion(book["title"], book["author"])
+            for book in results
+            if book.get("title")
+        ),
+        ignore_conflicts=True,
+    )
+
+
+def book_shelved(volume_id: int, count: int = 1):
+    """Make a volume's title rank higher after it is shelved."""
+    Suggestion.objects.filter(volume=volume_id).update(weight=F("weight") + count)
+
+
+def _serialize(title: str, author: str) -> Dict:
+    return {"title": title, "author": author}
+
+
+def _suggest_postgres(query: str, limit: int) -> List[Dict]:
+    fields = ("id", "title", "author")
+    rows = list(
+        Suggestion.objects.filter(normalized__startswith=query)
+        .order_by("-weight", "title")
+        .values_list(*fields)[:limit]
+    )
+    if len(rows) < limit and len(query) >= 3:
+        # Words inside the title or author, allowing for misspellings
+        seen = [row[0] for row in rows]
+        rows += (
+            Suggestion.objects.filter(TrigramWordSimilar(F("normalized"), query))
+            .exclude(pk__in=seen)
+            .annotate(similarity=TrigramWordSimilarity(query, "normalized"))
+            .order_by("-similarity", "-weight")
+            .values_list(*fields)[: limit - len(rows)]
+        )
+    return [_serialize(title, author) for _, title, author in rows]
+
+
+class MemoryIndex:
+    """Sorted array of the start of every word of every suggestion."""
+
+    _current = None
+    _lock = threading.Lock()
+
+    def __init__(self):
+        suggestions = Suggestion.objects.values_list(
+            "normalized", "title", "author", "weight"
+        )
+        keyed = []
+        for normalized, title, author, weight in suggestions.iterator():
+            entry = (weight, title, author)
+            start = 0
+            for word in normalized.split(" "):
+                keyed.append((normalized[start:], entry))
+                start += len(word) + 1
+        keyed.sort(key=lambda item: item[0])
+        self.keys = [key for key, _ in keyed]
+        self.entries = [entry for _, entry in keyed]
+        self.loaded_at = time.monotonic()
+
+    def search(self, query: str, limit: int) -> List[Dict]:
+        """Return the heaviest suggestions with a word starting with ``query``."""
+        start = bisect.bisect_left(self.keys, query)
+        end = min(start + MAX_SCAN, len(self.keys))
+        end = bisect.bisect_left(self.keys, query + "\uffff", start, end)
+        matches = {entry[1:]: entry for entry in self.entries[start:end]}
+        best = heapq.nsmallest(
+            limit, matches.values(), key=lambda entry: (-entry[0], entry[1])
+        )
+        return [_serialize(title, author) for _, title, author in best]
+
+    @classmethod
+    def current(cls) -> "MemoryIndex":
+        """Return this process's index, reloading it once it is too old."""
+        index = cls._current
+        if index is None or (
+            time.monotonic() - index.loaded_at > settings.SUGGEST["MEMORY_TTL"]
+        ):
+            with cls._lock:
+                if cls._current is index:
+                    cls._current = cls()
+                index = cls._current
+        return index
+
+    @classmethod
+    def invalidate(cls):
+        """Drop this process's index, e.g. after a bulk change in tests."""
+        cls._current = None
+
+
+def suggest(query: str, limit: int = 10) -> List[Dict]:
+    """Return up to ``limit`` titles completing ``query``, most popular first."""
+    query = normalize(query)
+    if len(query) < settings.SUGGEST["MIN_LENGTH"]:
+        return []
+    if connection.vendor == "postgresql":
+        return _suggest_postgres(query, limit)
+    return MemoryIndex.current().search(query, limit)
@@ -0,0 +1,286 @@
+"""
+Database-backed background job queue and the tasks that run on it.
+
+Jobs are stored in the ``Job`` table and executed by ``manage.py run_jobs``,
+so slow work (such as Cloudinary uploads) can leave the request cycle without
+an external broker.
+"""
+
+import logging
+import random
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import cloudinary.uploader
+from django.db import IntegrityError, close_old_connections, transaction
+from django.db.models import Count, F, Q
+from django.utils import timezone
+
+from . import fragments
+from .models import Book, Job, LibraryImport, Volume
+
+logger = logging.getLogger(__name__)
+
+TASKS: Dict[str, Dict] = {}
+
+
+def task(
+    name: str,
+    max_attempts: int = 5,
+    backoff: float = 30,
+    visibility_timeout: int = 300,
+    concurrency: Optional[int] = None,
+):
+    """
+    Register a function as a queueable task.
+
+    Args:
+        name: Task name stored on each job
+        max_attempts: Attempts before a job is marked failed
+        backoff: Base delay in seconds, doubled after every failed attempt
+        visibility_timeout: Seconds a claimed job stays hidden from other
+            workers; a job whose worker died becomes claimable again after it
+        concurrency: Maximum number of jobs of this task running at once
+            across all workers (None for no limit)
+    """
+
+    def decorator(func: Callable) -> Callable:
+        TASKS[name] = {
+            "func": func,
+            "max_attempts": max_attempts,
+            "backoff": backoff,
+            "visibility_timeout": visibility_timeout,
+            "concurrency": concurrency,
+        }
+        return func
+
+    return decorator
+
+
+def enqueue(name: str, payload: Dict, key: str = None, delay: float = 0) -> Job:
+    """
+    Queue a task, returning the existing job if ``key`` was already queued.
+
+    Args:
+        name: Registered task name
+        payload: JSON-serializable keyword arguments for the task
+        key: Idempotency key; defaults to the task name plus the payload
+        delay: Seconds to wait before the job becomes runnable
+    """
+    if name not in TASKS:
+        raise ValueError(f"Unknown task: {name}")
+    if key is None:
+        key = f"{name}:" + ":".join(f"{k}={payload[k]}" for k in sorted(payload))
+    try:
+        with transaction.atomic():
+            return Job.objects.create(
+                task=name,
+                key=key[:255],
+                payload=payload,
+                max_attempts=TASKS[name]["max_attempts"],
+                run_at=timezone.now() + timedelta(seconds=delay),
+            )
+    except IntegrityError:
+        return Job.objects.get(key=key[:255])
+
+
+def enqueue_many(name: str, jobs: Iterable[Tuple[Dict, str]]):
+    """
+    Queue many jobs of one task in a single query, skipping keys already queued.
+
+    Args:
+        name: Registered task name
+        jobs: ``(payload, key)`` pairs
+    """
+    if name not in TASKS:
+        raise ValueError(f"Unknown task: {name}")
+    now = timezone.now()
+    Job.objects.bulk_create(
+        [
+            Job(
+                task=name,
+                key=key[:255],
+                payload=payload,
+                max_attempts=TASKS[name]["max_attempts"],
+                run_at=now,
+            )
+            for payload, key in jobs
+        ],
+        ignore_conflicts=True,
+    )
+
+
+def _claimable(now):
+    """Jobs that are due, or were claimed by a worker whose lock expired."""
+    return Q(status=Job.PENDING, run_at__lte=now) | Q(
+        status=Job.RUNNING, locked_until__lt=now
+    )
+
+
+def claim_jobs(limit: int) -> List[Job]:
+    """
+    Claim up to ``limit`` runnable jobs for this worker.
+
+    Each job is claimed with a conditional UPDATE, so two workers racing for
+    the same row cannot both win it, on any database backend.
+    """
+    now = timezone.now()
+    running = {
+        row["task"]: row["count"]
+        for row in Job.objects.filter(status=Job.RUNNING, locked_until__gte=now)
+        .values("task")
+        .annotate(count=Count("id"))
+    }
+    claimed = []
+    candidates = Job.objects.filter(_claimable(now)).order_by("run_at")[: limit * 4]
+    for job in candidates:
+        options = TASKS.get(job.task)
+        if options is None:
+            continue
+        if options["concurrency"] is not None:
+            if running.get(job.task, 0) >= options["concurrency"]:
+                continue
+        locked_until = now + timedelta(seconds=options["visibility_timeout"])
+        won = Job.objects.filter(_claimable(now), pk=job.pk).update(
+            status=Job.RUNNING,
+            locked_until=locked_until,
+            attempts=F("attempts") + 1,
+            updated_on=now,
+        )
+        if won:
+            job.refresh_from_db()
+            claimed.append(job)
+            running[job.task] = running.get(job.task, 0) + 1
+            if len(claimed) >= limit:
+                break
+    return claimed
+
+
+def run_job(job: Job):
+    """Execute a claimed job and record its outcome, scheduling a retry on failure."""
+    options = TASKS[job.task]
+    try:
+        options["func"](**job.payload)
+    except Exception as e:  # pylint: disable=broad-except
+        logger.warning("Job %s failed (attempt %s): %s", job.key, job.attempts, e)
+        if job.attempts >= job.max_attempts:
+            status, run_at = Job.FAILED, job.run_at
+        else:
+            delay = options["backoff"] * (2 ** (job.attempts - 1))
+            delay += random.uniform(0, delay / 2)
+            status, run_at = Job.PENDING, timezone.now() + timedelta(seconds=delay)
+        Job.objects.filter(pk=job.pk).update(
+            status=status,
+            run_at=run_at,
+            locked_until=None,
+            last_error=str(e)[:2000],
+            updated_on=timezone.now(),
+        )
+    else:
+        Job.objects.filter(pk=job.pk).update(
+            status=Job.DONE, locked_until=None, last_error="", updated_on=timezone.now()
+        )
+    finally:
+        close_old_connections()
+
+
+def process_jobs(batch_size: int = 10, concurrency: int = 4) -> int:
+    """
+    Claim one batch of jobs and run them on a thread pool.
+
+    Returns:
+        Number of jobs processed
+    """
+    jobs = claim_jobs(batch_size)
+    if not jobs:
+        return 0
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(run_job, jobs))
+    return len(jobs)
+
+
+def prune_jobs(older_than: timedelta, batch_size: int = 1000) -> int:
+    """
+    Delete jobs that finished successfully more than ``older_than`` ago.
+
+    Failed jobs are kept for inspection. Rows are deleted in batches so no
+    single statement locks much of the table. A pruned job's key can be
+    queued again.
+
+    Returns:
+        Number of jobs deleted
+    """
+    cutoff = timezone.now() - older_than
+    done = Job.objects.filter(status=Job.DONE, updated_on__lt=cutoff)
+    deleted = 0
+    while ids := list(done.values_list("pk", flat=True)[:batch_size]):
+        deleted += Job.objects.filter(pk__in=ids).delete()[0]
+    return deleted
+
+
+@task("import_volume_cover", backoff=30, concurrency=4)
+def import_volume_cover(volume_id: int, cover_url: str):
+    """Upload a remote cover image to Cloudinary and attach it to the volume."""
+    volume = Volume.objects.filter(pk=volume_id).first()
+    if volume is None:
+        return
+    try:
+        upload_result = cloudinary.uploader.upload(
+            cover_url, folder="book_covers", public_id=f"volume_{volume_id}"
+        )
+    except cloudinary.exceptions.Error:
+        job = Job.objects.filter(
+            task="import_volume_cover", key=f"cover:volume:{volume_id}"
+        )
+        # Stop showing the placeholder once the final attempt has failed
+        if job.filter(attempts__gte=F("max_attempts")).exists():
+            Volume.objects.filter(pk=volume_id).update(cover_pending=False)
+            fragments.bump_volume(volume_id)
+        raise
+    Volume.objects.filter(pk=volume_id).update(
+        cover=upload_result["public_id"], cover_pending=False
+    )
+    # update() skips the signals that invalidate the cached cards
+    fragments.bump_volume(volume_id)
+
+
+@task("import_book_cover", backoff=30, concurrency=4)
+def import_book_cover(book_id: int, cover_url: str):
+    """Import a cover queued before covers moved to volumes."""
+    volume_id = Book.objects.filter(pk=book_id).values_list("volume_id", flat=True)
+    if volume_id:
+        import_volume_cover(volume_id[0], cover_url)
+
+
+@task("destroy_cloudinary_image", backoff=60)
+def destroy_cloudinary_image(public_id: str):
+    """Delete an image that is no longer referenced from Cloudinary."""
+    cloudinary.uploader.destroy(public_id)
+
+
+@task("import_library", max_attempts=3, backoff=60, visibility_timeout=3600)
+def import_library(import_id: int):
+    """Add the books of an uploaded CSV or Goodreads export to a shelf."""
+    from .imports import run_library_import  # imports queues jobs itself
+
+    library_import = LibraryImport.objects.filter(pk=import_id).first()
+    if library_import is None:
+        return
+    try:
+        run_library_import(library_import)
+    except Exception:
+        job = Job.objects.filter(task="import_library", key=f"import:{import_id}")
+        if job.filter(attempts__gte=F("max_attempts")).exists():
+            LibraryImport.objects.filter(pk=import_id).update(
+                status=LibraryImport.FAILED, finished_on=timezone.now()
+            )
+        raise
+
+
+@task("refresh_google_result", max_attempts=10, backoff=30)
+def refresh_google_result(cache_key: str, **lookup):
+    """Fetch a Google Books result again after it was served stale."""
+    from .services import GoogleBooksService  # services queues this task
+
+    GoogleBooksService.refresh(cache_key, **lookup)
@@ -1,3 +1,1290 @@
-from django.test import TestCase
+import io
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.core.files.storage import FileSystemStorage
+from django.core.management import call_command
+from django.db import connection
+from django.db.models.functions import Lower
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import include, path, reverse
+from django.utils import timezone
+
+from . import (
+    benchmarks,
+    fragments,
+    genres,
+    imports,
+    recommendations,
+    search,
+    search_store,
+    suggest,
+    tasks,
+    timing,
+    upstream,
+    views,
+    warmup,
+)
+from .cache import ResultCache
+from .counters import recompute_shelf_counters
+from .http import build_session
+from .models import (
+    Book,
+    Comment,
+    CustomUser,
+    Genre,
+    Job,
+    LibraryImport,
+    Review,
+    Volume,
+)
+from .services import AsyncGoogleBooksService, GoogleBooksService
+
+
+class ShelvesQueryCountTests(TestCase):
+    """Check the shelves page costs the same queries however many shelves exist."""
+
+    def add_readers(self, start, count, books):
+        volumes = Volume.objects.bulk_create(
+            Volume(title=f"Title {start}-{j}", author="Author") for j in range(books)
+        )
+        for i in range(start, start + count):
+            user = CustomUser.objects.create_user(f"reader{i}")
+            Book.objects.bulk_create(
+                Book(user=user, volume=volume, title=volume.title, author=volume.author)
+                for volume in volumes
+            )
+        recompute_shelf_counters()
+
+    def test_query_count_does_not_grow_with_users_or_books(self):
+        self.add_readers(0, 2, books=1)
+        with CaptureQueriesContext(connection) as small:
+            self.client.get(reverse("shelves"))
+
+        self.add_readers(2, 10, books=8)
+        with self.assertNumQueries(len(small)):
+            response = self.client.get(reverse("shelves"))
+        self.assertEqual(
+            len(response.context["books_by_user"]), settings.SHELVES_USERS_PER_PAGE
+        )
+
+
+class ResultCacheTests(TestCase):
+    """Check the result cache expires, evicts least recently used, and counts."""
+
+    def setUp(self):
+        caches["default"].clear()
+
+    def test_entries_expire_and_empty_results_expire_sooner(self):
+        cache = ResultCache(timeout=0.3, negative_timeout=0.05)
+        cache.set("found", ["Dune"])
+        cache.set("empty", [], negative=True)
+        self.assertEqual(cache.get("empty"), (True, []))
+
+        time.sleep(0.1)
+        self.assertEqual(cache.get("empty"), (False, None))
+        self.assertEqual(cache.get("found"), (True, ["Dune"]))
+        time.sleep(0.25)
+        self.assertEqual(cache.get("found"), (False, None))
+
+    def test_least_recently_used_entries_are_evicted(self):
+        cache = ResultCache(max_entries=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+
+        self.assertEqual(cache.get("b"), (False, None))
+        self.assertEqual(cache.get("a"), (True, 1))
+        self.assertEqual(
+            cache.stats(), {"hits": 2, "misses": 1, "evictions": 1, "entries": 2}
+        )
+
+    def test_keys_ignore_case_and_whitespace(self):
+        cache = ResultCache(prefix="search")
+        self.assertEqual(
+            cache.make_key("search", "  The  Hobbit", None),
+            cache.make_key("search", "the hobbit", None),
+        )
+        self.assertTrue(cache.make_key("x").startswith("search:"))
+
+
+def start_scripted_upstream(respond):
+    """
+    Serve GET requests with ``respond(path)``, which returns a
+    ``(status, body, delay)`` tuple, optionally followed by a dict of extra
+    headers. The paths requested are recorded on the server's ``paths`` list.
+    """
+
+    class ScriptedHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):  # pylint: disable=invalid-name
+            self.server.paths.append(self.path)
+            status, body, delay, *headers = respond(self.path)
+            time.sleep(delay)
+            body = json.dumps(body).encode()
+            self.send_response(status)
+            for name, value in (headers[0] if headers else {}).items():
+                self.send_header(name, value)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), ScriptedHandler)
+    server.daemon_threads = True
+    server.paths = []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+@override_settings(
+    GOOGLE_BOOKS_HTTP={**settings.GOOGLE_BOOKS_HTTP, "BACKOFF_FACTOR": 0.01}
+)
+class GoogleBooksHttpTests(TestCase):
+    """Check upstream calls retry 429/5xx, time out, and keep results in order."""
+
+    def serve(self, respond):
+        server = start_scripted_upstream(respond)
+        self.addCleanup(server.shutdown)
+        base_url = GoogleBooksService.BASE_URL
+        GoogleBooksService.BASE_URL = f"http://127.0.0.1:{server.server_port}"
+        self.addCleanup(setattr, GoogleBooksService, "BASE_URL", base_url)
+        return server
+
+    def setUp(self):
+        # The session and breaker are built from the settings on first use
+        GoogleBooksService._session = None
+        GoogleBooksService._breaker = None
+        AsyncGoogleBooksService._client = None
+        GoogleBooksService.result_cache().clear()
+        GoogleBooksService.stale_cache().clear()
+
+    def tearDown(self):
+        GoogleBooksService._session = None
+        GoogleBooksService._breaker = None
+        AsyncGoogleBooksService._client = None
+
+    def test_429_and_5xx_responses_are_retried(self):
+        statuses = [429, 503, 200]
+        server = self.serve(lambda path: (statuses.pop(0), {"id": "x"}, 0))
+        response = build_session().get(f"http://127.0.0.1:{server.server_port}/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(server.paths), 3)
+
+    def test_short_retry_after_is_honoured(self):
+        statuses = [429, 200]
+        server = self.serve(
+            lambda path: (statuses.pop(0), {"id": "x"}, 0, {"Retry-After": "1"})
+        )
+        started = time.monotonic()
+        response = build_session().get(f"http://127.0.0.1:{server.server_port}/")
+        self.assertEqual(response.status_code, 200)
+        self.assertGreaterEqual(time.monotonic() - started, 1)
+
+    def test_retry_after_over_the_cap_fails_without_waiting(self):
+        server = self.serve(lambda path: (429, {}, 0, {"Retry-After": "3600"}))
+        started = time.monotonic()
+        with override_settings(
+            GOOGLE_BOOKS_HTTP={**settings.GOOGLE_BOOKS_HTTP, "MAX_RETRY_AFTER": 5}
+        ):
+            response = build_session().get(f"http://127.0.0.1:{server.server_port}/")
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(len(server.paths), 1)
+        self.assertLess(time.monotonic() - started, 1)
+
+    async def test_async_retry_after_over_the_cap_fails_without_waiting(self):
+        statuses = [503, 429, 200]
+        server = self.serve(
+            lambda path: (statuses.pop(0), {}, 0, {"Retry-After": "3600"})
+        )
+        started = time.monotonic()
+        with override_settings(
+            GOOGLE_BOOKS_HTTP={**settings.GOOGLE_BOOKS_HTTP, "MAX_RETRY_AFTER": 5}
+        ):
+            response = await AsyncGoogleBooksService._get("/volumes/x")
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(len(server.paths), 1)
+        self.assertLess(time.monotonic() - started, 1)
+
+    def test_retries_stop_after_the_configured_attempts(self):
+        server = self.serve(lambda path: (500, {}, 0))
+        with override_settings(
+            GOOGLE_BOOKS_HTTP={**settings.GOOGLE_BOOKS_HTTP, "RETRIES": 2}
+        ):
+            with self.assertLogs("books.services", "ERROR"):
+                self.assertIsNone(GoogleBooksService.get_book_by_id("broken"))
+        self.assertEqual(len(server.paths), 3)
+
+    def test_slow_responses_time_out(self):
+        self.serve(lambda path: (200, {"items": []}, 0.5))
+        with override_settings(
+            GOOGLE_BOOKS_HTTP={
+                **settings.GOOGLE_BOOKS_HTTP,
+                "READ_TIMEOUT": 0.1,
+                "RETRIES": 0,
+            }
+        ):
+            started = time.monotonic()
+            with self.assertLogs("books.services", "ERROR"):
+                self.assertEqual(GoogleBooksService.search_books("Slow"), [])
+        self.assertLess(time.monotonic() - started, 0.4)
+
+    def test_books_by_ids_keep_the_input_order(self):
+        delays = {"a": 0.2, "b": 0.1, "c": 0}
+
+        def respond(path):
+            volume_id = path.rsplit("/", 1)[-1]
+            body = {"id": volume_id, "volumeInfo": {"title": volume_id.upper()}}
+            return 200, body, delays[volume_id]
+
+        server = self.serve(respond)
+        books = GoogleBooksService.get_books_by_ids(["a", "b", "c", "a"])
+        self.assertEqual(list(books), ["a", "b", "c"])
+        self.assertEqual([book["title"] for book in books.values()], ["A", "B", "C"])
+        self.assertEqual(len(server.paths), 3)
+
+
+class LocalSearchTests(TestCase):
+    """Check searches are answered locally first and merged with Google's."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.dune = Volume.objects.create(
+            google_books_id="G-dune", title="Dune", author="Frank Herbert"
+        )
+        Volume.objects.create(title="Dune Messiah", author="Frank Herbert")
+
+    def remote(self, title, author=""):
+        return {"google_books_id": f"G-{title}", "title": title, "author": author}
+
+    @override_settings(LOCAL_SEARCH_MIN_RESULTS=2)
+    def test_enough_local_matches_skip_google(self):
+        with mock.patch.object(search.GoogleBooksService, "search_books") as google:
+            results = search.search_books("dune", "herbert")
+        google.assert_not_called()
+        self.assertEqual(
+            [(book["title"], book["source"]) for book in results],
+            [("Dune", "local"), ("Dune Messiah", "local")],
+        )
+
+    @override_settings(LOCAL_SEARCH_MIN_RESULTS=5)
+    def test_google_results_follow_local_ones_without_duplicates(self):
+        remote = [
+            self.remote("DUNE", "frank herbert"),
+            {**self.remote("Dune (Deluxe)"), "google_books_id": "G-dune"},
+            self.remote("Children of Dune", "Frank Herbert"),
+        ]
+        with mock.patch.object(
+            search.GoogleBooksService, "search_books", return_value=remote
+        ):
+            results = search.search_books("dune")
+        self.assertEqual(
+            [book["title"] for book in results],
+            ["Dune", "Dune Messiah", "Children of Dune"],
+        )
+
+    def test_fts_syntax_in_queries_is_matched_literally(self):
+        self.assertEqual(
+            [book["title"] for book in search.search_local("dune-messiah")],
+            ["Dune Messiah"],
+        )
+        for query in ('dune" OR "x', "title:dune NEAR(", "dune*) NOT"):
+            self.assertEqual(search.search_local(query), [])
+
+
+class FragmentVersionTests(TestCase):
+    """Check saving books and users invalidates their cached shelf fragments."""
+
+    def setUp(self):
+        caches[settings.FRAGMENT_CACHE_ALIAS].clear()
+        self.user = CustomUser.objects.create_user("reader")
+        volume = Volume.objects.create(title="Dune", author="Frank Herbert")
+        self.book = Book.objects.create(
+            user=self.user, volume=volume, title=volume.title, author=volume.author
+        )
+
+    def test_saving_a_book_or_user_bumps_its_versions(self):
+        user_version = fragments.version("user", self.user.pk)
+        book_version = fragments.version("book", self.book.pk)
+        self.book.save()
+        self.assertNotEqual(fragments.version("book", self.book.pk), book_version)
+        self.assertNotEqual(fragments.version("user", self.user.pk), user_version)
+
+        user_version = fragments.version("user", self.user.pk)
+        self.user.save()
+        self.assertNotEqual(fragments.version("user", self.user.pk), user_version)
+
+    def test_cached_shelf_card_shows_the_saved_user(self):
+        self.assertContains(self.client.get(reverse("shelves")), "reader")
+        self.user.username = "renamed"
+        self.user.save()
+        response = self.client.get(reverse("shelves"))
+        self.assertContains(response, "renamed")
+        self.assertNotContains(response, "reader")
+
+
+class JobQueueTests(TestCase):
+    """Check jobs are claimed once, retried with backoff and pruned when done."""
+
+    def setUp(self):
+        self.calls = []
+
+        def record(**payload):
+            self.calls.append(payload)
+            if payload.get("fail"):
+                raise ValueError("upstream down")
+
+        for name, options in (
+            ("test_job", {}),
+            ("test_serial_job", {"concurrency": 1}),
+        ):
+            tasks.task(name, max_attempts=2, backoff=60, **options)(record)
+            self.addCleanup(tasks.TASKS.pop, name)
+
+    def test_claimed_job_is_not_claimed_again_until_its_lock_expires(self):
+        job = tasks.enqueue("test_job", {"n": 1})
+        self.assertEqual([j.pk for j in tasks.claim_jobs(5)], [job.pk])
+        self.assertEqual(tasks.claim_jobs(5), [])
+
+        # The worker died: once the visibility timeout passes it is reclaimed
+        Job.objects.filter(pk=job.pk).update(
+            locked_until=timezone.now() - timedelta(seconds=1)
+        )
+        (reclaimed,) = tasks.claim_jobs(5)
+        self.assertEqual((reclaimed.pk, reclaimed.attempts), (job.pk, 2))
+
+    def test_racing_workers_cannot_both_claim_a_job(self):
+        job = tasks.enqueue("test_job", {"n": 1})
+        rival = {}
+
+        class RacingTasks(dict):
+            def get(self, name, default=None):
+                # Another worker claims the job after this one has selected it
+                if "claimed" not in rival:
+                    rival["claimed"] = None
+                    rival["claimed"] = tasks.claim_jobs(5)
+                return super().get(name, default)
+
+        with mock.patch.object(tasks, "TASKS", RacingTasks(tasks.TASKS)):
+            self.assertEqual(tasks.claim_jobs(5), [])
+        self.assertEqual([j.pk for j in rival["claimed"]], [job.pk])
+
+    def test_failed_job_backs_off_then_fails_at_max_attempts(self):
+        job = tasks.enqueue("test_job", {"fail": True})
+        with self.assertLogs("books.tasks", "WARNING"):
+            tasks.run_job(tasks.claim_jobs(1)[0])
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.PENDING, 1))
+        self.assertGreater(job.run_at, timezone.now() + timedelta(seconds=59))
+        self.assertEqual(tasks.claim_jobs(1), [])
+
+        Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+        with self.assertLogs("books.tasks", "WARNING"):
+            tasks.run_job(tasks.claim_jobs(1)[0])
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.last_error), (Job.FAILED, "upstream down"))
+        self.assertEqual(len(self.calls), 2)
+
+    def test_enqueue_returns_the_existing_job_for_a_key(self):
+        first = tasks.enqueue("test_job", {"n": 1}, key="same")
+        second = tasks.enqueue("test_job", {"n": 2}, key="same")
+        self.assertEqual(second.pk, first.pk)
+        self.assertEqual(second.payload, {"n": 1})
+        with self.assertRaises(ValueError):
+            tasks.enqueue("no_such_task", {})
+
+    def test_concurrency_limit_holds_back_jobs_of_a_busy_task(self):
+        for n in range(3):
+            tasks.enqueue("test_serial_job", {"n": n})
+        tasks.enqueue("test_job", {"n": 0})
+        claimed = tasks.claim_jobs(10)
+        self.assertEqual(
+            sorted(job.task for job in claimed), ["test_job", "test_serial_job"]
+        )
+        self.assertEqual(tasks.claim_jobs(10), [])
+
+    def test_prune_deletes_only_old_finished_jobs(self):
+        old = timezone.now() - timedelta(days=8)
+        for key, status, updated_on in (
+            ("old-done", Job.DONE, old),
+            ("new-done", Job.DONE, timezone.now()),
+            ("old-failed", Job.FAILED, old),
+        ):
+            job = tasks.enqueue("test_job", {}, key=key)
+            Job.objects.filter(pk=job.pk).update(status=status, updated_on=updated_on)
+
+        self.assertEqual(tasks.prune_jobs(timedelta(days=7), batch_size=1), 1)
+        self.assertEqual(
+            set(Job.objects.values_list("key", flat=True)), {"new-done", "old-failed"}
+        )
+
+
+class GenreTests(TestCase):
+    """Check genre names are normalized and the genre pages count and page books."""
+
+    def shelve(self, user, title, genre_names):
+        volume = Volume.objects.create(title=title, author="Author")
+        genres.set_volume_genres(volume, genre_names)
+        return Book.objects.create(
+            user=user, volume=volume, title=title, author="Author"
+        )
+
+    def test_case_and_spacing_variants_share_one_genre(self):
+        self.assertEqual(
+            genres.parse_genres(" Science  Fiction, science fiction,, Fantasy "),
+            ["Science Fiction", "Fantasy"],
+        )
+        user = CustomUser.objects.create_user("reader", password="pass")
+        self.shelve(user, "Dune", "Science Fiction, Fantasy")
+        self.shelve(user, "Hyperion", "science  fiction")
+        self.shelve(user, "Foundation", "SCIENCE FICTION ")
+
+        self.assertEqual(
+            list(Genre.objects.values_list("slug", flat=True)),
+            ["fantasy", "science-fiction"],
+        )
+        self.assertEqual(
+            Genre.objects.get(slug="science-fiction").volumes.count(), 3
+        )
+
+    def test_genre_list_counts_books_in_a_fixed_number_of_queries(self):
+        user = CustomUser.objects.create_user("reader", password="pass")
+        self.shelve(user, "Dune", "Science Fiction, Fantasy")
+        self.shelve(user, "Emma", "Romance")
+        with CaptureQueriesContext(connection) as few:
+            self.client.get(reverse("genres"))
+
+        for i in range(5):
+            self.shelve(user, f"Novel {i}", "Science Fiction, Romance")
+        Genre.objects.create(name="Unused", slug="unused")
+        with self.assertNumQueries(len(few)):
+            response = self.client.get(reverse("genres"))
+
+        self.assertEqual(
+            [(g.slug, g.book_count) for g in response.context["genres"]],
+            [("romance", 6), ("science-fiction", 6), ("fantasy", 1)],
+        )
+
+    def test_genre_detail_paginates_and_404s_unknown_slugs(self):
+        user = CustomUser.objects.create_user("reader", password="pass")
+        for i in range(13):
+            self.shelve(user, f"Novel {i}", "Mystery")
+
+        response = self.client.get(reverse("genre_detail", args=["mystery"]))
+        self.assertEqual(len(response.context["books"]), 12)
+        self.assertTrue(response.context["is_paginated"])
+        response = self.client.get(
+            reverse("genre_detail", args=["mystery"]), {"page": 2}
+        )
+        self.assertEqual(
+            [book.title for book in response.context["books"]], ["Novel 0"]
+        )
+
+        response = self.client.get(reverse("genre_detail", args=["no-such-genre"]))
+        self.assertEqual(response.status_code, 404)
+
+
+class ShelfIndexTests(TestCase):
+    """Check the shelf hot-path queries are planned on the shelf indexes."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user("reader", password="pass")
+        other = CustomUser.objects.create_user("other", password="pass")
+        volumes = Volume.objects.bulk_create(
+            Volume(title=f"Title {i}", author="Author") for i in range(200)
+        )
+        Book.objects.bulk_create(
+            Book(user=user, volume=volume, title=volume.title, author=volume.author)
+            for user in (cls.user, other)
+            for volume in volumes
+        )
+
+    def explain(self, queryset):
+        with connection.cursor() as cursor:
+            if connection.vendor == "postgresql":
+                # Tiny test tables would otherwise always be sequentially scanned
+                cursor.execute("SET LOCAL enable_seqscan = off")
+            else:
+                cursor.execute("ANALYZE")
+        return queryset.explain()
+
+    def test_shelf_listing_uses_user_id_desc_index(self):
+        plan = self.explain(Book.objects.filter(user=self.user).order_by("-id")[:3])
+        self.assertIn("book_user_id_desc_idx", plan)
+        self.assertNotIn("TEMP B-TREE", plan.upper())
+
+    def test_duplicate_lookup_uses_unique_index(self):
+        queryset = Book.objects.alias(
+            lower_title=Lower("title"), lower_author=Lower("author")
+        ).filter(user=self.user, lower_title="title 1", lower_author="author")
+        self.assertIn("unique_book_per_user", self.explain(queryset))
+
+    def test_duplicate_add_is_rejected_by_constraint(self):
+        self.client.force_login(self.user)
+        token = search_store.save_results(
+            [{"title": "TITLE 1", "author": "author"}], self.user.pk
+        )
+        response = self.client.post(
+            reverse("add_book_from_api"), {"token": token, "result_id": "0"}
+        )
+        self.assertRedirects(response, reverse("search_books"))
+        self.assertEqual(
+            Book.objects.filter(user=self.user, title__iexact="title 1").count(), 1
+        )
+
+
+class ShelfPaginationTests(TestCase):
+    """Check cursor pagination walks the shelves without gaps or repeats."""
+
+    @classmethod
+    def setUpTestData(cls):
+        volumes = Volume.objects.bulk_create(
+            Volume(title=f"Title {j}", author="Author") for j in range(7)
+        )
+        for i in range(7):
+            user = CustomUser.objects.create_user(f"reader{i}", password="pass")
+            Book.objects.bulk_create(
+                Book(user=user, volume=volume, title=volume.title, author=volume.author)
+                for volume in volumes[: i + 1]
+            )
+        # bulk_create bypasses the signals that maintain the shelf counters
+        recompute_shelf_counters()
+
+    def test_json_pages_cover_every_user_once(self):
+        usernames, cursor = [], ""
+        while True:
+            data = self.client.get(
+                reverse("shelves"), {"cursor": cursor, "format": "json"}
+            ).json()
+            usernames += [result["username"] for result in data["results"]]
+            cursor = data["next_cursor"]
+            if not cursor:
+                break
+        self.assertEqual(usernames, [f"reader{i}" for i in reversed(range(7))])
+
+    def test_tampered_cursor_starts_from_the_beginning(self):
+        response = self.client.get(reverse("shelves"), {"cursor": "not-a-cursor"})
+        self.assertEqual(
+            response.context["books_by_user"][0]["user"].username, "reader6"
+        )
+
+
+class SearchStoreTests(TestCase):
+    """Check search results are only selectable by their owner, by token."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user("reader", password="pass")
+        cls.other = CustomUser.objects.create_user("other", password="pass")
+
+    def test_selection_adds_the_stored_result(self):
+        token = search_store.save_results(
+            [{"title": "Dune", "author": "Frank Herbert"}], self.user.pk
+        )
+        self.client.force_login(self.user)
+        self.client.post(
+            reverse("add_book_from_api"), {"token": token, "result_id": "0"}
+        )
+        self.assertTrue(Book.objects.filter(user=self.user, title="Dune").exists())
+
+    def test_other_users_and_unknown_tokens_get_nothing(self):
+        token = search_store.save_results(
+            [{"title": "Dune", "author": "Frank Herbert"}], self.user.pk
+        )
+        self.assertIsNone(search_store.get_result(token, "0", self.other.pk))
+        self.assertIsNone(search_store.get_result("expired", "0", self.user.pk))
+
+
+class AsyncSearchUrls:
+    """The URLconf with the async search views, as ASYNC_SEARCH_VIEWS routes it."""
+
+    urlpatterns = [
+        path("search-books/", views.search_books_async, name="search_books"),
+        path(
+            "search-books-ajax/",
+            views.search_books_ajax_async,
+            name="search_books_ajax",
+        ),
+        path("", include("config.urls")),
+    ]
+
+
+@override_settings(ROOT_URLCONF=AsyncSearchUrls)
+class AsyncSearchViewTests(TestCase):
+    """Check the async search views store results for the requesting user."""
+
+    def setUp(self):
+        self.stub = benchmarks.start_stub_upstream(0)
+        self.base_url = GoogleBooksService.BASE_URL
+        GoogleBooksService.BASE_URL = f"http://127.0.0.1:{self.stub.server_port}"
+        AsyncGoogleBooksService._client = None
+        GoogleBooksService.result_cache().clear()
+        self.user = CustomUser.objects.create_user("reader", password="pass")
+
+    def tearDown(self):
+        self.stub.shutdown()
+        GoogleBooksService.BASE_URL = self.base_url
+        AsyncGoogleBooksService._client = None
+
+    async def test_search_pages_save_results_for_the_user(self):
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.post(
+            reverse("search_books"), {"title": "Stub Book"}
+        )
+        self.assertEqual(response.status_code, 200)
+        token = response.context["token"]
+
+        response = await self.async_client.post(
+            reverse("search_books_ajax"),
+            {"title": "Stub Book"},
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["count"], 1)
+
+        for token in (token, response.json()["token"]):
+            result = await sync_to_async(search_store.get_result)(
+                token, "0", self.user.pk
+            )
+            self.assertEqual(result["title"], "Stub Book")
+
+
+class VolumeTests(TestCase):
+    """Check shelving an already-known edition reuses its volume."""
+
+    def test_second_reader_shares_the_volume_without_a_cover_import(self):
+        result = {
+            "google_books_id": "zyTCAlFPjgYC",
+            "title": "The Google Story",
+            "author": "David A. Vise",
+            "cover_url": "https://books.google.com/cover.jpg",
+        }
+        for username in ("first", "second"):
+            user = CustomUser.objects.create_user(username, password="pass")
+            token = search_store.save_results([dict(result)], user.pk)
+            self.client.force_login(user)
+            self.client.post(
+                reverse("add_book_from_api"), {"token": token, "result_id": "0"}
+            )
+
+        self.assertEqual(Volume.objects.count(), 1)
+        self.assertEqual(Book.objects.filter(volume__isnull=False).count(), 2)
+        self.assertEqual(Job.objects.filter(task="import_volume_cover").count(), 1)
+
+    def test_new_edition_already_on_the_shelf_still_gets_its_cover(self):
+        user = CustomUser.objects.create_user("reader", password="pass")
+        volume = Volume.objects.create(title="Dune", author="Frank Herbert")
+        Book.objects.create(
+            user=user, volume=volume, title="Dune", author="Frank Herbert"
+        )
+        token = search_store.save_results(
+            [
+                {
+                    "google_books_id": "new-edition",
+                    "title": "Dune",
+                    "author": "Frank Herbert",
+                    "cover_url": "https://books.google.com/cover.jpg",
+                }
+            ],
+            user.pk,
+        )
+        # The existing volume already has that title, so a new one is created
+        Volume.objects.filter(pk=volume.pk).update(google_books_id="old-edition")
+        self.client.force_login(user)
+        self.client.post(
+            reverse("add_book_from_api"), {"token": token, "result_id": "0"}
+        )
+
+        self.assertEqual(Book.objects.filter(user=user).count(), 1)
+        new_volume = Volume.objects.get(google_books_id="new-edition")
+        self.assertTrue(new_volume.cover_pending)
+        self.assertEqual(
+            Job.objects.get(task="import_volume_cover").payload["volume_id"],
+            new_volume.pk,
+        )
+
+    def test_google_result_adopts_a_backfilled_volume(self):
+        backfilled = Volume.objects.create(title="Dune", author="Frank Herbert")
+        user = CustomUser.objects.create_user("reader", password="pass")
+        token = search_store.save_results(
+            [
+                {
+                    "google_books_id": "B1cNAQAAMAAJ",
+                    "title": "DUNE",
+                    "author": "frank herbert",
+                }
+            ],
+            user.pk,
+        )
+        self.client.force_login(user)
+        self.client.post(
+            reverse("add_book_from_api"), {"token": token, "result_id": "0"}
+        )
+
+        self.assertEqual(Volume.objects.get().pk, backfilled.pk)
+        backfilled.refresh_from_db()
+        self.assertEqual(backfilled.google_books_id, "B1cNAQAAMAAJ")
+
+    def test_orphaned_covers_are_deleted_only_once_released(self):
+        Volume.objects.create(title="Dune", author="Frank Herbert", cover="kept")
+        for public_id in ("orphan", "kept"):
+            Job.objects.create(
+                task="destroy_cloudinary_image",
+                key=f"destroy:orphaned-cover:{public_id}",
+                payload={"public_id": public_id, "cover": public_id, "book_ids": [1]},
+                status=Job.HELD,
+            )
+        self.assertEqual(tasks.claim_jobs(10), [])
+
+        call_command("purge_orphaned_covers", stdout=io.StringIO())
+        job = Job.objects.get()
+        self.assertEqual(
+            (job.status, job.payload), (Job.PENDING, {"public_id": "orphan"})
+        )
+
+
+class ImportTests(TestCase):
+    """Check CSV/Goodreads rows are parsed and shelved without duplicates."""
+
+    GOODREADS_CSV = (
+        "Book Id,Title,Author,Author l-f,ISBN,ISBN13\n"
+        '1,"Dune (Dune Chronicles, #1)",Frank Herbert,"Herbert, Frank",'
+        '"=""0441172717""","=""9780441172719"""\n'
+        '2,Emma,Jane Austen,"Austen, Jane",="",=""\n'
+        '3,emma,jane austen,"Austen, Jane",="",=""\n'
+    )
+
+    def test_goodreads_rows_are_cleaned(self):
+        rows = list(imports.read_rows(io.StringIO(self.GOODREADS_CSV)))
+        self.assertEqual(
+            rows[0],
+            {"title": "Dune", "author": "Frank Herbert", "isbn": "9780441172719"},
+        )
+        self.assertEqual(rows[1]["isbn"], "")
+
+    def test_known_volumes_are_shelved_once(self):
+        user = CustomUser.objects.create_user("reader", password="pass")
+        Volume.objects.create(
+            title="Dune", author="Frank Herbert", isbn="9780441172719"
+        )
+        Volume.objects.create(title="Emma", author="Jane Austen")
+
+        rows = imports.read_rows(io.StringIO(self.GOODREADS_CSV))
+        totals = imports.import_rows(user, rows)
+
+        self.assertEqual((totals.added, totals.duplicates), (2, 1))
+        user.refresh_from_db()
+        self.assertEqual(user.book_count, 2)
+
+    def test_isbn_matches_before_title_and_the_shelf_is_deduplicated(self):
+        user = CustomUser.objects.create_user("reader", password="pass")
+        by_isbn = Volume.objects.create(
+            title="Dune Messiah", author="Frank Herbert", isbn="9780441172719"
+        )
+        Volume.objects.create(title="Dune", author="Frank Herbert")
+        emma = Volume.objects.create(title="Emma", author="Jane Austen")
+        Book.objects.create(user=user, volume=emma, title="Emma", author="Jane Austen")
+
+        rows = imports.read_rows(io.StringIO(self.GOODREADS_CSV))
+        totals = imports.import_rows(user, rows)
+
+        self.assertEqual((totals.added, totals.duplicates), (1, 2))
+        self.assertEqual(
+            set(Book.objects.filter(user=user).values_list("volume", flat=True)),
+            {by_isbn.pk, emma.pk},
+        )
+
+    def test_rows_shelved_meanwhile_are_skipped_not_added(self):
+        user = CustomUser.objects.create_user("reader", password="pass")
+        Volume.objects.create(
+            title="Dune", author="Frank Herbert", isbn="9780441172719"
+        )
+        emma = Volume.objects.create(title="Emma", author="Jane Austen")
+        find_local = imports._find_local
+
+        def shelve_emma_meanwhile(rows):
+            Book.objects.create(
+                user=user, volume=emma, title="Emma", author="Jane Austen"
+            )
+            return find_local(rows)
+
+        rows = imports.read_rows(io.StringIO(self.GOODREADS_CSV))
+        with mock.patch.object(imports, "_find_local", shelve_emma_meanwhile):
+            totals = imports.import_rows(user, rows)
+
+        self.assertEqual((totals.added, totals.duplicates, totals.skipped), (1, 1, 1))
+        self.assertEqual(Book.objects.filter(user=user).count(), 2)
+
+    def test_retried_import_resumes_after_processed_rows(self):
+        user = CustomUser.objects.create_user("reader", password="pass")
+        Volume.objects.create(
+            title="Dune", author="Frank Herbert", isbn="9780441172719"
+        )
+        Volume.objects.create(title="Emma", author="Jane Austen")
+        location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, location)
+        # The field resolves its storage once, when the model is defined
+        field = LibraryImport._meta.get_field("upload")
+        with mock.patch.object(field, "storage", FileSystemStorage(location)):
+            self.client.force_login(user)
+            upload = io.BytesIO(self.GOODREADS_CSV.encode("utf-8-sig"))
+            upload.name = "goodreads.csv"
+            self.client.post(reverse("import_books"), {"file": upload})
+            library_import = LibraryImport.objects.get(user=user)
+            # The first attempt got through the first row before failing
+            LibraryImport.objects.filter(pk=library_import.pk).update(
+                processed=1, not_found=1
+            )
+            library_import.refresh_from_db()
+            imports.run_library_import(library_import)
+
+            library_import.refresh_from_db()
+            self.assertEqual(library_import.status, LibraryImport.DONE)
+            self.assertEqual(
+                (
+                    library_import.processed,
+                    library_import.added,
+                    library_import.duplicates,
+                    library_import.not_found,
+                    library_import.skipped,
+                ),
+                (3, 1, 1, 1, 0),
+            )
+            self.assertEqual(Book.objects.get(user=user).title, "Emma")
+            self.assertFalse(library_import.upload)
+            self.assertEqual(os.listdir(location), ["imports"])
+
+
+class ExportTests(TestCase):
+    """Check shelf exports stream every row to the owner only."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user("reader", password="pass")
+        volume = Volume.objects.create(title="Dune", author="Frank Herbert")
+        Book.objects.create(
+            user=cls.user, volume=volume, title=volume.title, author=volume.author
+        )
+
+    def export(self, fmt):
+        url = reverse("export_shelf", args=[self.user.username, self.user.id])
+        return self.client.get(url, {"format": fmt})
+
+    def test_owner_gets_csv_and_jsonl(self):
+        self.client.force_login(self.user)
+        csv_lines = b"".join(self.export("csv").streaming_content).splitlines()
+        self.assertEqual(csv_lines[1].split(b",")[:2], [b"Dune", b"Frank Herbert"])
+        jsonl_lines = b"".join(self.export("jsonl").streaming_content).splitlines()
+        self.assertEqual(len(jsonl_lines), 1)
+
+    def test_other_users_are_refused(self):
+        other = CustomUser.objects.create_user("other", password="pass")
+        self.client.force_login(other)
+        self.assertEqual(self.export("csv").status_code, 403)
+
+
+class ServerTimingTests(TestCase):
+    """Check the timing middleware reports queries and flags budget overruns."""
+
+    @override_settings(
+        REQUEST_TIMING={"ENABLED": True, "QUERY_BUDGET": 0, "LATENCY_BUDGET_MS": 1000}
+    )
+    def test_queries_are_reported_and_flagged(self):
+        with self.assertLogs("books.middleware", "WARNING"):
+            response = self.client.get(reverse("genres"))
+        self.assertIn("db;dur=", response["Server-Timing"])
+        self.assertIn('budget;desc="Over budget"', response["Server-Timing"])
+
+    @override_settings(
+        REQUEST_TIMING={"ENABLED": True, "QUERY_BUDGET": 0, "LATENCY_BUDGET_MS": 1000}
+    )
+    async def test_queries_of_sync_views_are_counted_under_asgi(self):
+        with self.assertLogs("books.middleware", "WARNING") as logs:
+            response = await self.async_client.get(reverse("genres"))
+        self.assertIn("db;dur=", response["Server-Timing"])
+        self.assertGreater(logs.records[0].timing["queries"], 0)
+        self.assertIsNone(timing.current())
+
+    async def test_queries_on_worker_threads_are_counted(self):
+        # Under ASGI a sync view runs in a worker thread with its own connection
+        with timing.collect() as timings:
+            await sync_to_async(Volume.objects.count, thread_sensitive=False)()
+        self.assertEqual(timings.counts["db"], 1)
+
+
+class BenchmarkTests(TestCase):
+    """Check the synthetic dataset and the regression comparison."""
+
+    def test_seed_bench_builds_skewed_shelves(self):
+        call_command(
+            "seed_bench",
+            users=10,
+            books=200,
+            volumes=200,
+            reviews=20,
+            comments=20,
+            stdout=io.StringIO(),
+        )
+        sizes = sorted(
+            CustomUser.objects.filter(username__startswith="bench_").values_list(
+                "book_count", flat=True
+            )
+        )
+        self.assertEqual(sum(sizes), Book.objects.count())
+        self.assertGreater(sizes[-1], 4 * sizes[len(sizes) // 2])
+
+    def test_compare_flags_slower_or_chattier_scenarios(self):
+        baseline = {"scenarios": {"shelf": {"p95_ms": 10.0, "queries": 3}}}
+        results = {"scenarios": {"shelf": {"p95_ms": 12.0, "queries": 4}}}
+        self.assertEqual(len(benchmarks.compare(results, baseline, 0.25)), 1)
+        results["scenarios"]["shelf"]["p95_ms"] = 20.0
+        self.assertEqual(len(benchmarks.compare(results, baseline, 0.25)), 2)
+
+
+class ReviewThreadTests(TestCase):
+    """Check a book's reviews and comment threads load in constant queries."""
+
+    @classmethod
+    def setUpTestData(cls):
+        user = CustomUser.objects.create_user("reader", password="pass")
+        volume = Volume.objects.create(title="Dune", author="Frank Herbert")
+        cls.book = Book.objects.create(
+            user=user, volume=volume, title="Dune", author="Frank Herbert"
+        )
+        for i in range(12):
+            review = Review.objects.create(
+                book=cls.book, user=user, rating=5, content=f"Review {i}"
+            )
+            Comment.objects.bulk_create(
+                Comment(
+                    review=review, user=user, content=f"Comment {j}", approved=j > 0
+                )
+                for j in range(6)
+            )
+
+    @override_settings(REVIEWS_PAGE_SIZE=10, REVIEW_COMMENTS_PREVIEW=3)
+    def test_review_page_and_more_comments(self):
+        url = reverse("book_detail", args=[self.book.pk])
+        # The book, a page of reviews with their users, and one comment prefetch
+        with self.assertNumQueries(3):
+            data = self.client.get(url, {"format": "json"}).json()
+        self.assertEqual(len(data["results"]), 10)
+        review = data["results"][0]
+        self.assertEqual(review["content"], "Review 11")
+        self.assertEqual(
+            [c["content"] for c in review["comments"]],
+            ["Comment 1", "Comment 2", "Comment 3"],
+        )
+
+        more = self.client.get(
+            reverse("review_comments", args=[self.book.pk, review["id"]]),
+            {"cursor": review["comments_cursor"]},
+        ).json()
+        self.assertEqual(
+            [c["content"] for c in more["results"]], ["Comment 4", "Comment 5"]
+        )
+        self.assertIsNone(more["next_cursor"])
+
+
+class RatingTests(TestCase):
+    """Check rating aggregates follow review writes and feed the leaderboard."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user("reader", password="pass")
+        cls.books = []
+        for title in ("Dune", "Emma"):
+            volume = Volume.objects.create(title=title, author="Author")
+            cls.books.append(
+                Book.objects.create(
+                    user=cls.user, volume=volume, title=title, author="Author"
+                )
+            )
+
+    def review(self, book, rating):
+        return Review.objects.create(
+            book=book, user=self.user, rating=rating, content="Review"
+        )
+
+    def test_aggregates_follow_create_edit_and_delete(self):
+        dune, emma = self.books
+        first = self.review(dune, 5)
+        self.review(dune, 3)
+        first.rating = 4
+        first.save()
+        self.review(emma, 2).delete()
+
+        dune.refresh_from_db()
+        self.assertEqual((dune.review_count, dune.rating_sum), (2, 7))
+        self.assertEqual((dune.stars_3, dune.stars_4, dune.stars_5), (1, 1, 0))
+        self.assertEqual(dune.rating_average, 3.5)
+        emma.refresh_from_db()
+        self.assertEqual((emma.review_count, emma.stars_2), (0, 0))
+
+        Book.objects.update(review_count=0, rating_sum=0, stars_3=0)
+        call_command("recompute_ratings", stdout=io.StringIO())
+        dune.refresh_from_db()
+        self.assertEqual((dune.review_count, dune.rating_sum, dune.stars_3), (2, 7, 1))
+
+    @override_settings(TOP_RATED_MIN_REVIEWS=3)
+    def test_leaderboard_ranks_books_with_enough_reviews(self):
+        dune, emma = self.books
+        for rating in (4, 4, 5):
+            self.review(dune, rating)
+        for rating in (5, 5, 5):
+            self.review(emma, rating)
+        # A single five-star review is not enough to rank
+        unranked = Book.objects.create(
+            user=self.user, volume=dune.volume, title="Dune 2", author="Author"
+        )
+        self.review(unranked, 5)
+
+        response = self.client.get(reverse("top_rated"))
+        self.assertEqual(
+            [book.title for book in response.context["books"]], ["Emma", "Dune"]
+        )
+
+
+class RecommendationTests(TestCase):
+    """Check co-shelved volumes become each other's recommendations."""
+
+    def test_rebuild_relates_co_shelved_volumes_incrementally(self):
+        dune, emma, hobbit = (
+            Volume.objects.create(title=title, author="Author")
+            for title in ("Dune", "Emma", "The Hobbit")
+        )
+        for username, volumes in (("a", (dune, hobbit)), ("b", (dune, hobbit, emma))):
+            user = CustomUser.objects.create_user(username, password="pass")
+            for volume in volumes:
+                Book.objects.create(
+                    user=user, volume=volume, title=volume.title, author="Author"
+                )
+
+        self.assertEqual(recommendations.rebuild_related(), 3)
+        book = Book.objects.filter(volume=dune).first()
+        related = recommendations.related_books(book, 4)
+        self.assertEqual([n.related.title for n in related], ["The Hobbit", "Emma"])
+
+        # Only the volume whose readers changed is recomputed, and neighbors
+        # left on no shelf are skipped until then
+        Book.objects.filter(volume=emma).delete()
+        related = recommendations.related_books(book, 4)
+        self.assertEqual([n.related.title for n in related], ["The Hobbit"])
+        self.assertEqual(recommendations.rebuild_related(), 1)
+
+    def shelve_together(self, *titles):
+        volumes = [Volume.objects.create(title=t, author="Author") for t in titles]
+        user = CustomUser.objects.create_user("reader", password="pass")
+        for volume in volumes:
+            Book.objects.create(
+                user=user, volume=volume, title=volume.title, author="Author"
+            )
+        return volumes
+
+    def test_failed_rebuild_keeps_volumes_stale(self):
+        self.shelve_together("Dune", "Emma")
+        with mock.patch.object(
+            recommendations, "_popularity", side_effect=RuntimeError("boom")
+        ):
+            with self.assertRaises(RuntimeError):
+                recommendations.rebuild_related()
+        self.assertEqual(Volume.objects.filter(related_stale=True).count(), 2)
+        self.assertEqual(recommendations.rebuild_related(), 2)
+
+    def test_volumes_marked_during_a_rebuild_are_recomputed(self):
+        dune, _ = self.shelve_together("Dune", "Emma")
+        genres = recommendations._genres
+        marked = []
+
+        def mark_dune_once(volume_ids):
+            if not marked:
+                marked.append(dune.pk)
+                recommendations.mark_stale(marked)
+            return genres(volume_ids)
+
+        with mock.patch.object(recommendations, "_genres", mark_dune_once):
+            self.assertEqual(recommendations.rebuild_related(), 3)
+        self.assertFalse(Volume.objects.filter(related_stale=True).exists())
+
+
+class SuggestTests(TestCase):
+    """Check autocomplete offers local and previously seen Google titles."""
+
+    def setUp(self):
+        suggest.MemoryIndex.invalidate()
+
+    def test_word_prefixes_match_popular_titles_first(self):
+        user = CustomUser.objects.create_user("reader", password="pass")
+        volume = Volume.objects.create(title="The Hobbit", author="J.R.R. Tolkien")
+        Book.objects.create(
+            user=user, volume=volume, title=volume.title, author=volume.author
+        )
+        suggest.add_results([{"title": "Hobbit Tales", "author": "Anon"}])
+
+        response = self.client.get(reverse("suggest_titles"), {"q": "HOB"})
+        self.assertEqual(
+            [s["title"] for s in response.json()["suggestions"]],
+            ["The Hobbit", "Hobbit Tales"],
+        )
+        self.assertIn("max-age=", response["Cache-Control"])
+        self.assertEqual(suggest.suggest("tolk")[0]["author"], "J.R.R. Tolkien")
+        self.assertEqual(suggest.suggest("h"), [])
+
+
+class UpstreamLimitTests(TestCase):
+    """Check identical Google calls are coalesced and the quota is enforced."""
+
+    def test_concurrent_identical_searches_share_one_call(self):
+        stub = benchmarks.start_stub_upstream(0.3)
+        base_url = GoogleBooksService.BASE_URL
+        GoogleBooksService.BASE_URL = f"http://127.0.0.1:{stub.server_port}"
+        GoogleBooksService.result_cache().clear()
+        upstream.metrics.reset()
+        barrier = threading.Barrier(5)
+        results = []
+
+        def search():
+            barrier.wait()
+            results.append(GoogleBooksService.search_books("Trending Title"))
+
+        threads = [threading.Thread(target=search) for _ in range(5)]
+        try:
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            stub.shutdown()
+            GoogleBooksService.BASE_URL = base_url
+
+        self.assertEqual([len(books) for books in results], [1] * 5)
+        stats = upstream.metrics.stats()
+        self.assertEqual((stats["passed"], stats["coalesced"]), (1, 4))
+
+    def test_qps_and_daily_budget_are_limited(self):
+        caches["default"].clear()
+        limiter = upstream.QuotaLimiter(qps=1, burst=1, max_wait=0)
+        limiter.reserve()
+        with self.assertRaises(upstream.UpstreamLimited):
+            limiter.reserve()
+
+        limiter = upstream.QuotaLimiter(qps=0, daily_budget=2)
+        limiter.reserve()
+        limiter.reserve()
+        with self.assertRaises(upstream.UpstreamLimited):
+            limiter.reserve()
+
+    @override_settings(
+        CACHES={
+            **settings.CACHES,
+            "budget": {
+                "BACKEND": "django.core.cache.backends.db.DatabaseCache",
+                "LOCATION": "test_budget_cache",
+            },
+        }
+    )
+    async def test_daily_budget_is_counted_off_the_event_loop(self):
+        await sync_to_async(call_command)("createcachetable", "test_budget_cache")
+        limiter = upstream.QuotaLimiter(qps=0, daily_budget=1, alias="budget")
+        # A sync database call here would raise SynchronousOnlyOperation
+        await limiter.areserve()
+        with self.assertRaises(upstream.UpstreamLimited):
+            await limiter.areserve()
+
+
+class CircuitBreakerTests(TestCase):
+    """Check the breaker fails fast and stale results are served, then refreshed."""
+
+    def tearDown(self):
+        GoogleBooksService._breaker = None
+
+    def test_breaker_opens_then_probes_once(self):
+        breaker = upstream.CircuitBreaker(min_calls=2, open_seconds=0.05)
+        breaker.record(failed=True)
+        breaker.record(failed=True)
+        with self.assertRaises(upstream.CircuitOpen):
+            breaker.allow()
+
+        time.sleep(0.06)
+        breaker.allow()  # the half-open probe
+        with self.assertRaises(upstream.CircuitOpen):
+            breaker.allow()
+        breaker.record(failed=False)
+        self.assertEqual(breaker.state, breaker.CLOSED)
+
+    def test_open_breaker_serves_stale_results_and_queues_a_refresh(self):
+        stub = benchmarks.start_stub_upstream(0)
+        base_url = GoogleBooksService.BASE_URL
+        GoogleBooksService.BASE_URL = f"http://127.0.0.1:{stub.server_port}"
+        try:
+            fresh = GoogleBooksService.search_books("Outage Title")
+            GoogleBooksService.result_cache().clear()
+            GoogleBooksService._breaker = upstream.CircuitBreaker(min_calls=1)
+            GoogleBooksService.breaker().record(failed=True)
+
+            self.assertEqual(GoogleBooksService.search_books("Outage Title"), fresh)
+            job = Job.objects.get(task="refresh_google_result")
+
+            GoogleBooksService._breaker = None
+            tasks.refresh_google_result(**job.payload)
+        finally:
+            stub.shutdown()
+            GoogleBooksService.BASE_URL = base_url
+        hit, books = GoogleBooksService.result_cache().get(job.payload["cache_key"])
+        self.assertTrue(hit)
+        self.assertEqual(books, fresh)
+
+
+class WarmupTests(TestCase):
+    """Check the probes bypass host checks and readiness waits for warmup."""
+
+    def tearDown(self):
+        warmup._state["preloaded"] = False
+
+    def test_healthz_answers_any_host(self):
+        response = self.client.get("/healthz", HTTP_HOST="10.0.0.5:8000")
+        self.assertEqual(response.json(), {"status": "ok"})
+
+    def test_readyz_fails_until_preloaded(self):
+        with override_settings(WARMUP={**settings.WARMUP, "ENABLED": True}):
+            self.assertEqual(self.client.get("/readyz").status_code, 503)
+            self.assertIn("templates", warmup.preload())
+            response = self.client.get("/readyz")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.json()["checks"], {"preloaded": True, "database": True}
+        )
+
+
+class DbPoolStatsTests(TestCase):
+    """Check connection pool statistics are shown to staff only."""
+
+    def test_staff_get_connection_statistics(self):
+        url = reverse("db_pool_stats")
+        self.client.force_login(CustomUser.objects.create_user("reader", password="p"))
+        self.assertEqual(self.client.get(url).status_code, 302)
+
+        self.client.force_login(
+            CustomUser.objects.create_user("admin", password="p", is_staff=True)
+        )
+        stats = self.client.get(url).json()
+        self.assertEqual(stats["vendor"], connection.vendor)
+        self.assertTrue(stats["health_checks"])
+        self.assertIn(stats["mode"], ("pool", "persistent", "per_request"))
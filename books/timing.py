@@ -0,0 +1,104 @@
+"""
+Per-request timing of database queries, upstream HTTP calls and templates.
+
+``ServerTimingMiddleware`` collects a ``RequestTimings`` for each request in a
+context variable. Code that calls out to a slow dependency wraps the call in
+``timed(name)``. Outside a timed request, ``timed`` does nothing, so it is
+safe to use from background jobs too.
+
+Every database connection times its queries through ``time_query``, installed
+when it connects. Connections are per thread, and under ASGI a sync view runs
+in a worker thread, so wrapping only the middleware's own connections would
+miss its queries; the context variable follows the request into that thread.
+"""
+
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+from django.template.base import Template
+
+_current: ContextVar[Optional["RequestTimings"]] = ContextVar(
+    "request_timings", default=None
+)
+
+
+class RequestTimings:
+    """Accumulated durations (in seconds) and call counts for one request."""
+
+    def __init__(self):
+        self.durations = defaultdict(float)
+        self.counts = defaultdict(int)
+        # Nesting depth of template renders, so includes aren't counted twice
+        self.template_depth = 0
+
+    def add(self, name: str, seconds: float):
+        """Record one call of ``name`` that took ``seconds``."""
+        self.durations[name] += seconds
+        self.counts[name] += 1
+
+
+@contextmanager
+def collect():
+    """Collect the timings of the enclosed request in a ``RequestTimings``."""
+    timings = RequestTimings()
+    token = _current.set(timings)
+    try:
+        yield timings
+    finally:
+        _current.reset(token)
+
+
+def current() -> Optional[RequestTimings]:
+    """Return the timings of the request being handled, if any."""
+    return _current.get()
+
+
+@contextmanager
+def timed(name: str):
+    """Add the duration of the enclosed block to the current request's ``name``."""
+    timings = _current.get()
+    if timings is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(name, time.perf_counter() - started)
+
+
+def time_query(execute, sql, params, many, context):
+    """``connection.execute_wrapper`` hook timing every query as "db"."""
+    with timed("db"):
+        return execute(sql, params, many, context)
+
+
+def instrument_connection(connection):
+    """Time the queries of ``connection`` (idempotent, so safe on reconnects)."""
+    if time_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(time_query)
+
+
+def instrument_templates():
+    """Time top-level template renders as "template" (installed once)."""
+    if getattr(Template.render, "timed", False):
+        return
+    render = Template.render
+
+    def timed_render(self, context):
+        timings = _current.get()
+        if timings is None or timings.template_depth:
+            return render(self, context)
+        timings.template_depth += 1
+        started = time.perf_counter()
+        try:
+            return render(self, context)
+        finally:
+            timings.template_depth -= 1
+            timings.add("template", time.perf_counter() - started)
+
+    timed_render.timed = True
+    Template.render = timed_render
@@ -0,0 +1,453 @@
+"""
+Coalescing, rate limiting and circuit breaking of upstream Google Books calls.
+
+``SingleFlight`` makes concurrent identical lookups share one upstream call.
+Within a process this always happens. Across processes it happens through a
+lock in the result cache's backend when ``GOOGLE_BOOKS_LIMITS["CROSS_PROCESS"]``
+is set, which needs a backend shared by the workers (e.g. DatabaseCache).
+
+``QuotaLimiter`` is a token bucket shared by the threads and event loops of a
+process, allowing ``QPS`` calls per second in bursts of up to ``BURST``. The
+daily budget is counted in the shared cache, so every worker draws on the
+same quota.
+
+``CircuitBreaker`` tracks the failure rate of recent calls, counting slow
+calls as failures. Once the rate is too high it opens, and for
+``OPEN_SECONDS`` calls fail fast instead of waiting out the timeout. Then
+one probe call is let through (half-open): if it succeeds the breaker
+closes, otherwise it opens again.
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Dict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils import timezone
+
+
+class UpstreamLimited(Exception):
+    """Raised when a call would exceed the upstream QPS or daily budget."""
+
+
+class CircuitOpen(UpstreamLimited):
+    """Raised when the circuit breaker fails a call fast."""
+
+
+def limits() -> Dict:
+    """Return the ``GOOGLE_BOOKS_LIMITS`` setting merged with defaults."""
+    options = {
+        "QPS": 10.0,
+        "BURST": 20,
+        "MAX_WAIT": 2.0,
+        "DAILY_BUDGET": 0,
+        "CROSS_PROCESS": False,
+        "LOCK_TIMEOUT": 15,
+        "POLL_INTERVAL": 0.05,
+    }
+    options.update(getattr(settings, "GOOGLE_BOOKS_LIMITS", {}))
+    return options
+
+
+def breaker_options() -> Dict:
+    """Return the ``GOOGLE_BOOKS_BREAKER`` setting merged with defaults."""
+    options = {
+        "WINDOW": 20,
+        "MIN_CALLS": 5,
+        "FAILURE_RATE": 0.5,
+        "SLOW_CALL": 5.0,
+        "OPEN_SECONDS": 30,
+        "STALE_TTL": 7 * 24 * 3600,
+        "STALE_MAX_ENTRIES": 20000,
+    }
+    options.update(getattr(settings, "GOOGLE_BOOKS_BREAKER", {}))
+    return options
+
+
+class Metrics:
+    """Counts of upstream calls by outcome, and of stale results served."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {
+            "passed": 0,
+            "coalesced": 0,
+            "limited": 0,
+            "short_circuited": 0,
+            "stale": 0,
+        }
+
+    def record(self, name: str):
+        """Count one call under ``name``."""
+        with self._lock:
+            self._counters[name] += 1
+
+    def stats(self) -> Dict[str, int]:
+        """Return the counters."""
+        with self._lock:
+            return dict(self._counters)
+
+    def reset(self):
+        """Zero the counters, e.g. between benchmark runs."""
+        with self._lock:
+            self._counters = dict.fromkeys(self._counters, 0)
+
+
+metrics = Metrics()
+
+
+class QuotaLimiter:
+    """
+    Token bucket for the upstream QPS plus a shared daily call budget.
+
+    ``reserve`` takes a token and returns how long the caller must wait before
+    calling. The wait is capped at ``max_wait`` and the daily budget at
+    ``daily_budget``. Past either limit it raises ``UpstreamLimited``, so a
+    burst of searches degrades to empty results instead of a growing queue.
+    A ``qps`` or ``daily_budget`` of 0 disables that limit.
+    """
+
+    def __init__(
+        self,
+        qps: float = 10.0,
+        burst: int = 20,
+        max_wait: float = 2.0,
+        daily_budget: int = 0,
+        alias: str = "default",
+    ):
+        self.qps = qps
+        self.capacity = max(burst, 1)
+        self.max_wait = max_wait
+        self.daily_budget = daily_budget
+        self.alias = alias
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls) -> "QuotaLimiter":
+        """Build a limiter from ``GOOGLE_BOOKS_LIMITS``, counting in the result cache."""
+        options = limits()
+        return cls(
+            qps=options["QPS"],
+            burst=options["BURST"],
+            max_wait=options["MAX_WAIT"],
+            daily_budget=options["DAILY_BUDGET"],
+            alias=getattr(settings, "GOOGLE_BOOKS_CACHE", {}).get("ALIAS", "default"),
+        )
+
+    def _take_token(self) -> float:
+        if not self.qps:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(
+                self.capacity, self._tokens + (now - self._updated) * self.qps
+            )
+            self._updated = now
+            # A negative balance is a queue of callers already waiting
+            wait = max(0.0, (1 - self._tokens) / self.qps)
+            if wait > self.max_wait:
+                raise UpstreamLimited(f"over {self.qps:g} calls per second")
+            self._tokens -= 1
+            return wait
+
+    def _refund_token(self):
+        if self.qps:
+            with self._lock:
+                self._tokens += 1
+
+    def _budget_key(self) -> str:
+        return f"google_books.budget:{timezone.now().date().isoformat()}"
+
+    def _check_budget(self, spent: int):
+        if spent > self.daily_budget:
+            raise UpstreamLimited(f"daily budget of {self.daily_budget} calls spent")
+
+    def _spend_budget(self):
+        if not self.daily_budget:
+            return
+        backend = caches[self.alias]
+        key = self._budget_key()
+        # add() creates the day's counter once; incr() is atomic on shared
+        # backends such as Redis and close enough on the database cache
+        backend.add(key, 0, 2 * 24 * 3600)
+        try:
+            spent = backend.incr(key)
+        except ValueError:
+            backend.add(key, 1, 2 * 24 * 3600)
+            spent = 1
+        self._check_budget(spent)
+
+    async def _aspend_budget(self):
+        if not self.daily_budget:
+            return
+        backend = caches[self.alias]
+        key = self._budget_key()
+        await backend.aadd(key, 0, 2 * 24 * 3600)
+        try:
+            spent = await backend.aincr(key)
+        except ValueError:
+            await backend.aadd(key, 1, 2 * 24 * 3600)
+            spent = 1
+        self._check_budget(spent)
+
+    def reserve(self) -> float:
+        """
+        Reserve one upstream call.
+
+        Returns:
+            Seconds to wait before making the call
+
+        Raises:
+            UpstreamLimited: The QPS queue or the daily budget is full
+        """
+        try:
+            wait = self._take_token()
+        except UpstreamLimited:
+            metrics.record("limited")
+            raise
+        try:
+            self._spend_budget()
+        except UpstreamLimited:
+            self._refund_token()
+            metrics.record("limited")
+            raise
+        metrics.record("passed")
+        return wait
+
+    async def areserve(self) -> float:
+        """
+        Reserve one upstream call from an event loop.
+
+        Like ``reserve``, but the daily budget is counted with the cache's
+        async methods, so a blocking backend (e.g. the database cache) runs
+        in a thread instead of on the loop.
+        """
+        try:
+            wait = self._take_token()
+        except UpstreamLimited:
+            metrics.record("limited")
+            raise
+        try:
+            await self._aspend_budget()
+        except UpstreamLimited:
+            self._refund_token()
+            metrics.record("limited")
+            raise
+        metrics.record("passed")
+        return wait
+
+    def acquire(self):
+        """Reserve one upstream call, sleeping until it may be made."""
+        wait = self.reserve()
+        if wait:
+            time.sleep(wait)
+
+
+def _is_fault(error: Exception) -> bool:
+    """Whether an error is the upstream's fault (not e.g. a rejected query)."""
+    response = getattr(error, "response", None)
+    status = getattr(response, "status_code", None)
+    return status is None or status >= 500 or status == 429
+
+
+class CircuitBreaker:
+    """
+    Closed/open/half-open breaker over a sliding window of call outcomes.
+
+    Args:
+        window: Recent calls the failure rate is computed over
+        min_calls: Calls needed in the window before the breaker may open
+        failure_rate: Fraction of failed (or slow) calls that opens it
+        slow_call: Seconds after which a successful call counts as failed
+        open_seconds: How long it stays open before letting a probe through
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        window: int = 20,
+        min_calls: int = 5,
+        failure_rate: float = 0.5,
+        slow_call: float = 5.0,
+        open_seconds: float = 30,
+    ):
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.slow_call = slow_call
+        self.open_seconds = open_seconds
+        self.state = self.CLOSED
+        self._outcomes = deque(maxlen=window)
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls) -> "CircuitBreaker":
+        """Build a breaker from ``GOOGLE_BOOKS_BREAKER``."""
+        options = breaker_options()
+        return cls(
+            window=options["WINDOW"],
+            min_calls=options["MIN_CALLS"],
+            failure_rate=options["FAILURE_RATE"],
+            slow_call=options["SLOW_CALL"],
+            open_seconds=options["OPEN_SECONDS"],
+        )
+
+    def allow(self):
+        """
+        Admit one call, or raise ``CircuitOpen``.
+
+        Once ``open_seconds`` have passed, the first caller becomes the
+        half-open probe; the others keep failing fast until it finishes.
+        """
+        with self._lock:
+            if self.state == self.OPEN:
+                if time.monotonic() - self._opened_at >= self.open_seconds:
+                    self.state = self.HALF_OPEN
+                    self._probing = False
+            if self.state == self.OPEN or (
+                self.state == self.HALF_OPEN and self._probing
+            ):
+                metrics.record("short_circuited")
+                raise CircuitOpen("Google Books API circuit is open")
+            if self.state == self.HALF_OPEN:
+                self._probing = True
+
+    def record(self, failed: bool):
+        """Record the outcome of an admitted call."""
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self._probing = False
+                if failed:
+                    self._open()
+                else:
+                    self.state = self.CLOSED
+                    self._outcomes.clear()
+                return
+            self._outcomes.append(failed)
+            if (
+                len(self._outcomes) >= self.min_calls
+                and sum(self._outcomes) / len(self._outcomes) >= self.failure_rate
+            ):
+                self._open()
+
+    def _open(self):
+        self.state = self.OPEN
+        self._opened_at = time.monotonic()
+        self._outcomes.clear()
+
+    def _cancel(self):
+        # An admitted call that never reached the upstream frees the probe slot
+        with self._lock:
+            self._probing = False
+
+    @contextmanager
+    def guard(self):
+        """Admit the enclosed call and record whether it failed or was slow."""
+        self.allow()
+        started = time.monotonic()
+        try:
+            yield
+        except UpstreamLimited:
+            self._cancel()
+            raise
+        except Exception as e:
+            self.record(_is_fault(e))
+            raise
+        else:
+            self.record(time.monotonic() - started > self.slow_call)
+
+    def stats(self) -> Dict:
+        """Return the state and failure rate of the current window."""
+        with self._lock:
+            outcomes = list(self._outcomes)
+        return {
+            "state": self.state,
+            "failure_rate": sum(outcomes) / len(outcomes) if outcomes else 0.0,
+        }
+
+
+class _Call:
+    """An upstream call in flight, awaited by identical concurrent lookups."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Runs at most one call per key at a time, sharing its outcome."""
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def run(self, key: str, fetch: Callable[[], Any], cache=None) -> Any:
+        """
+        Return ``fetch()``, or the outcome of an identical call in flight.
+
+        Args:
+            key: Result cache key identifying the lookup
+            fetch: Makes the upstream call and stores its result in ``cache``
+            cache: ``ResultCache`` to coordinate through with other processes,
+                or None to coalesce within this process only
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        if not leader:
+            metrics.record("coalesced")
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            if cache is None:
+                call.result = fetch()
+            else:
+                call.result = self._run_locked(key, fetch, cache)
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+    @staticmethod
+    def _run_locked(key: str, fetch: Callable[[], Any], cache) -> Any:
+        options = limits()
+        backend = cache.backend
+        lock_key = f"{key}:lock"
+        if backend.add(lock_key, os.getpid(), options["LOCK_TIMEOUT"]):
+            try:
+                return fetch()
+            finally:
+                backend.delete(lock_key)
+
+        # Another process is fetching: wait for its result to be cached. If it
+        # fails (nothing cached) or takes too long, fetch it ourselves.
+        deadline = time.monotonic() + options["LOCK_TIMEOUT"]
+        while time.monotonic() < deadline:
+            time.sleep(options["POLL_INTERVAL"])
+            hit, value = cache.get(key)
+            if hit:
+                metrics.record("coalesced")
+                return value
+            if backend.get(lock_key) is None:
+                break
+        return fetch()
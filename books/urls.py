@@ -1,18 +1,37 @@
 """"URL configuration for the books app."""
+from django.conf import settings
 from django.urls import path
 from . import views
 
+# Serve the non-blocking search views when running under ASGI
+if settings.ASYNC_SEARCH_VIEWS:
+    search_view = views.search_books_async
+    search_ajax_view = views.search_books_ajax_async
+else:
+    search_view = views.search_books
+    search_ajax_view = views.search_books_ajax
+
 urlpatterns = [
     path('', views.home, name='home'),
     path('shelves/', views.display_shelves, name='shelves'),
     path('shelves/user/<str:username>-<int:user_id>/', views.user_shelf, name='user_shelf'),
+    path('shelves/user/<str:username>-<int:user_id>/export', views.export_shelf, name='export_shelf'),
     path('shelves/book/<int:pk>/', views.book_detail, name='book_detail'),
     path('shelves/book/<int:pk>/delete/', views.delete_book, name='delete_book'),
+    path('shelves/book/<int:pk>/reviews/<int:review_id>/comments/',
+         views.review_comments, name='review_comments'),
+    path('genres/', views.genre_list, name='genres'),
+    path('top-rated/', views.top_rated, name='top_rated'),
+    path('genres/<slug:slug>/', views.genre_detail, name='genre_detail'),
     # Book addition URLs - API search is now primary method
-    path('add-book/', views.search_books, name='add_book'),  # Redirect add-book to API search
-    path('search-books/', views.search_books, name='search_books'),
-    path('search-books-ajax/', views.search_books_ajax, name='search_books_ajax'),
+    path('add-book/', search_view, name='add_book'),  # Redirect add-book to API search
+    path('search-books/', search_view, name='search_books'),
+    path('search-books-ajax/', search_ajax_view, name='search_books_ajax'),
+    path('search-books/suggest', views.suggest_titles, name='suggest_titles'),
+    path('ops/db-pool', views.db_pool_stats, name='db_pool_stats'),
     path('add-book-from-api/', views.add_book_from_api, name='add_book_from_api'),
+    path('import-books/', views.import_books, name='import_books'),
+    path('import-books/<int:pk>/', views.import_status, name='import_status'),
     # path('add-book-manual/', views.add_book, name='add_book_manual'),  # Commented out manual add
     path('my-account/', views.my_account, name='my_account'),
     path('my-account/edit-profile/', views.edit_profile, name='edit_profile'),
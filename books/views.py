@@ -1,22 +1,38 @@
 """Views for the books app."""
 
 import json
-from datetime import datetime
+from asgiref.sync import sync_to_async
+from django.conf import settings
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib import messages
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required
-from django.http import JsonResponse
+from django.core.exceptions import PermissionDenied
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponseBadRequest, JsonResponse, StreamingHttpResponse
+from django.utils.cache import patch_cache_control
+from django.views.decorators.cache import never_cache
 from django.views.decorators.http import require_http_methods
 from django.core.paginator import Paginator
-from django.db.models import Count, Max
-import cloudinary.uploader
-from .models import Book, CustomUser
-
-# , Review, Comment
-from .forms import UserProfileForm, BookSearchForm
+from django.template.loader import render_to_string
+from django.urls import reverse
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Prefetch
+from .models import Book, Comment, CustomUser, Genre, LibraryImport, Review
+from .forms import UserProfileForm, BookSearchForm, LibraryImportForm
+from . import dbpool
+from . import exports
+from . import fragments
+from . import recommendations
+from .pagination import encode_cursor, keyset_paginate
 
 # , BookForm, ReviewForm, CommentForm, BookSelectionForm
-from .services import GoogleBooksService
+from . import search
+from . import search_store
+from . import suggest
+from .tasks import enqueue
+from .timing import timed
+from .volumes import get_or_create_volume
 
 
 # Create your views here.
@@ -26,85 +42,331 @@ def home(request):
 
 
 def display_shelves(request):
-    """View to display all book shelves grouped by user with pagination."""
-
-    # Get all users who have books, ordered by username for consistency
-    users_with_books = (
-        CustomUser.objects.filter(books__isnull=False)
-        .annotate(
-            book_count=Count("books"),
-            last_book_added=Max("books__id"),  # Assuming newer books have higher IDs
+    """View to display all book shelves grouped by user with cursor pagination."""
+    books_per_user = settings.SHELVES_BOOKS_PER_USER
+
+    # Get all users who have books from their denormalized shelf counters, and
+    # fetch the latest books for every user on the page together with one
+    # ROW_NUMBER()-partitioned prefetch instead of two queries per user.
+    users_with_books = CustomUser.objects.filter(book_count__gt=0).prefetch_related(
+        Prefetch(
+            "books",
+            queryset=Book.objects.select_related("volume").order_by("-id")[
+                :books_per_user
+            ],
+            to_attr="latest_books",
         )
-        .distinct()
-        .order_by("-last_book_added")
-    )  # Most recent first
+    )
 
-    # Set up pagination - show 3 users per page
-    paginator = Paginator(users_with_books, 3)
-    page_number = request.GET.get("page")
-    page_obj = paginator.get_page(page_number)
+    # Most recent first, continuing after the cursor of the previous page
+    cursor = request.GET.get("cursor")
+    page = keyset_paginate(
+        users_with_books,
+        ("last_book_added_at", "id"),
+        cursor,
+        settings.SHELVES_USERS_PER_PAGE,
+        salt="books.shelves",
+    )
 
     # Group books by user for the current page
     books_by_user = []
-    for user in page_obj:
-        user_books = Book.objects.filter(user=user).order_by("-id")[
-            :3
-        ]  # Show latest 3 books
-        all_books_count = Book.objects.filter(user=user).count()
+    shelf_versions = fragments.versions("user", [user.id for user in page])
+    for user in page:
         books_by_user.append(
             {
                 "user": user,
-                "books": user_books,
-                "total_books": all_books_count,
-                "has_more": all_books_count
-                > 3,  # Indicate if there are more than 3 books
+                "books": user.latest_books,
+                "total_books": user.book_count,
+                # Indicate if there are more books than shown on the card
+                "has_more": user.book_count > books_per_user,
+                "more_count": max(user.book_count - books_per_user, 0),
+                # Cached card is invalidated when this version is bumped
+                "version": shelf_versions[user.id],
+            }
+        )
+
+    if request.GET.get("format") == "json":
+        return JsonResponse(
+            {
+                "results": [
+                    {
+                        "id": group["user"].id,
+                        "username": group["user"].username,
+                        "url": reverse(
+                            "user_shelf",
+                            args=[group["user"].username, group["user"].id],
+                        ),
+                        "total_books": group["total_books"],
+                        "books": [_book_summary(book) for book in group["books"]],
+                    }
+                    for group in books_by_user
+                ],
+                "html": "".join(
+                    render_to_string(
+                        "books/partials/shelf_user.html", {"user_group": group}, request
+                    )
+                    for group in books_by_user
+                ),
+                "next_cursor": page.next_cursor,
             }
         )
 
     return render(
         request,
         "books/shelves.html",
-        {
-            "books_by_user": books_by_user,
-            "page_obj": page_obj,
-            "is_paginated": page_obj.has_other_pages(),
-            "paginator": paginator,
-        },
+        {"books_by_user": books_by_user, "page": page, "cursor": cursor},
     )
 
 
 def user_shelf(request, username, user_id):
-    """View to display all books for a specific user."""
+    """View to display all books for a specific user, newest first."""
     user = get_object_or_404(CustomUser, id=user_id)
-    books = Book.objects.filter(user=user).order_by("-id")  # Show newest first
+    page = keyset_paginate(
+        Book.objects.filter(user=user).select_related("volume"),
+        ("id",),
+        request.GET.get("cursor"),
+        settings.USER_SHELF_PAGE_SIZE,
+        salt=f"books.user_shelf.{user.id}",
+    )
+    book_versions = fragments.versions("book", [book.id for book in page])
+    for book in page:
+        book.fragment_version = book_versions[book.id]
+
+    if request.GET.get("format") == "json":
+        return JsonResponse(
+            {
+                "results": [_book_summary(book) for book in page],
+                "html": "".join(
+                    render_to_string(
+                        "books/partials/shelf_book.html", {"book": book}, request
+                    )
+                    for book in page
+                ),
+                "next_cursor": page.next_cursor,
+            }
+        )
+
     return render(
-        request, "books/user_shelf.html", {"shelf_user": user, "books": books}
+        request,
+        "books/user_shelf.html",
+        {
+            "shelf_user": user,
+            "books": page.object_list,
+            "page": page,
+            "book_count": user.book_count,
+        },
+    )
+
+
+@login_required
+def export_shelf(request, username, user_id):
+    """Stream a user's shelf as CSV or JSON Lines, to the owner or staff."""
+    user = get_object_or_404(CustomUser, id=user_id)
+    if request.user != user and not request.user.is_staff:
+        raise PermissionDenied
+    fmt = request.GET.get("format", "csv")
+    if fmt not in exports.FORMATS:
+        return HttpResponseBadRequest("Unknown export format.")
+
+    blocks = exports.export_lines(Book.objects.filter(user=user), fmt)
+    if isinstance(request, ASGIRequest):
+        blocks = exports.aiterate(blocks)
+    response = StreamingHttpResponse(blocks, content_type=exports.FORMATS[fmt])
+    response["Content-Disposition"] = (
+        f'attachment; filename="{user.username}-shelf.{fmt}"'
     )
+    return response
+
+
+def _book_summary(book):
+    """Serialize the fields of a book shown on shelf cards."""
+    return {
+        "id": book.id,
+        "title": book.title,
+        "author": book.author,
+        "url": reverse("book_detail", args=[book.id]),
+        "cover_url": book.volume.cover.url if book.volume.cover else None,
+    }
+
+
+def _comment_summary(comment):
+    """Serialize a comment shown in a review thread."""
+    return {
+        "id": comment.id,
+        "user": comment.user.username,
+        "content": comment.content,
+        "posted_on": comment.posted_on.isoformat(),
+    }
+
+
+def _review_summary(review):
+    """Serialize a review and its first comments."""
+    return {
+        "id": review.id,
+        "user": review.user.username,
+        "rating": review.rating,
+        "content": review.content,
+        "posted_on": review.posted_on.isoformat(),
+        "comments": [_comment_summary(comment) for comment in review.comment_preview],
+        "comments_cursor": review.comments_cursor,
+    }
+
+
+def _approved_comments():
+    return Comment.objects.filter(approved=True).select_related("user")
 
 
 def book_detail(request, pk):
-    """View to display a single book's details."""
-    book = get_object_or_404(Book, pk=pk)
+    """View to display a single book's details and a page of its reviews."""
+    book = get_object_or_404(Book.objects.select_related("user", "volume"), pk=pk)
+
+    # Newest reviews first, each with its reviewer and only its first few
+    # approved comments: one ROW_NUMBER()-partitioned prefetch for the whole
+    # page, so the query count doesn't grow with reviews or comments.
+    preview = settings.REVIEW_COMMENTS_PREVIEW
+    reviews = book.reviews.select_related("user").prefetch_related(
+        Prefetch(
+            "comments",
+            queryset=_approved_comments().order_by("posted_on", "id")[: preview + 1],
+            to_attr="comment_preview",
+        )
+    )
+    page = keyset_paginate(
+        reviews,
+        ("posted_on", "id"),
+        request.GET.get("cursor"),
+        settings.REVIEWS_PAGE_SIZE,
+        salt=f"books.reviews.{book.id}",
+    )
+    for review in page:
+        # The extra prefetched comment only tells whether the thread goes on
+        review.comments_cursor = None
+        if len(review.comment_preview) > preview:
+            review.comment_preview = review.comment_preview[:preview]
+            last = review.comment_preview[-1]
+            review.comments_cursor = encode_cursor(
+                [last.posted_on, last.id], salt=f"books.comments.{review.id}"
+            )
+
+    if request.GET.get("format") == "json":
+        return JsonResponse(
+            {
+                "results": [_review_summary(review) for review in page],
+                "html": "".join(
+                    render_to_string(
+                        "books/partials/review.html",
+                        {"book": book, "review": review},
+                        request,
+                    )
+                    for review in page
+                ),
+                "next_cursor": page.next_cursor,
+            }
+        )
 
     # Get related books by same user
-    user_books = Book.objects.filter(user=book.user).exclude(pk=pk)[:4]
-    # reviews = book.reviews.all()
-    # comments = book.comments.all()
+    user_books = (
+        Book.objects.filter(user=book.user).exclude(pk=pk).select_related("volume")
+    )[:4]
+    # Other books shelved by readers of this one, precomputed
+    related_books = recommendations.related_books(book, 4)
     return render(
         request,
         "books/book_detail.html",
         {
             "book": book,
             "user_books": user_books,
+            "related_books": related_books,
+            "shelf_version": fragments.version("user", book.user_id),
+            "reviews": page.object_list,
+            "reviews_page": page,
             # commented out for future use
-            # 'reviews': reviews,
-            # 'comments': comments,
             # 'review_form': ReviewForm(),
             # 'comment_form': CommentForm(),
         },
     )
 
 
+def review_comments(request, pk, review_id):
+    """Return the next page of a review's approved comments as JSON."""
+    review = get_object_or_404(Review, pk=review_id, book_id=pk)
+    page = keyset_paginate(
+        _approved_comments().filter(review=review),
+        ("posted_on", "id"),
+        request.GET.get("cursor"),
+        settings.REVIEW_COMMENTS_PAGE_SIZE,
+        salt=f"books.comments.{review.id}",
+        descending=False,
+    )
+    return JsonResponse(
+        {
+            "results": [_comment_summary(comment) for comment in page],
+            "html": "".join(
+                render_to_string(
+                    "books/partials/comment.html", {"comment": comment}, request
+                )
+                for comment in page
+            ),
+            "next_cursor": page.next_cursor,
+        }
+    )
+
+
+def top_rated(request):
+    """View to list the highest-rated books with enough reviews to rank."""
+    page = keyset_paginate(
+        Book.objects.filter(
+            review_count__gte=settings.TOP_RATED_MIN_REVIEWS
+        ).select_related("user", "volume"),
+        ("rating_average", "review_count", "id"),
+        request.GET.get("cursor"),
+        settings.TOP_RATED_PAGE_SIZE,
+        salt="books.top_rated",
+    )
+    return render(
+        request,
+        "books/top_rated.html",
+        {
+            "books": page.object_list,
+            "page": page,
+            "min_reviews": settings.TOP_RATED_MIN_REVIEWS,
+        },
+    )
+
+
+def genre_list(request):
+    """View to browse all genres with the number of books tagged with each."""
+    genres = (
+        Genre.objects.annotate(book_count=Count("volumes__books"))
+        .filter(book_count__gt=0)
+        .order_by("-book_count", "name")
+    )
+    return render(request, "books/genres.html", {"genres": genres})
+
+
+def genre_detail(request, slug):
+    """View to display all books tagged with a genre."""
+    genre = get_object_or_404(Genre, slug=slug)
+    books = (
+        Book.objects.filter(volume__genre_tags=genre)
+        .select_related("user", "volume")
+        .order_by("-id")
+    )
+
+    paginator = Paginator(books, 12)
+    page_obj = paginator.get_page(request.GET.get("page"))
+    return render(
+        request,
+        "books/genre_detail.html",
+        {
+            "genre": genre,
+            "books": page_obj,
+            "page_obj": page_obj,
+            "is_paginated": page_obj.has_other_pages(),
+        },
+    )
+
+
 def delete_book(request, pk):
     """Delete a book from the user's shelf."""
     book = get_object_or_404(Book, pk=pk)
@@ -135,22 +397,19 @@ def search_books(request):
             title = search_form.cleaned_data["title"]
             author = search_form.cleaned_data.get("author", "")
 
-            # Search Google Books API
-            api_results = GoogleBooksService.search_books(title, author)
+            # Search the local catalog, then Google Books API if needed
+            api_results = search.search_books(title, author)
 
             if api_results:
-                # Store results in session for later use
-                request.session["book_search_results"] = api_results
-
-                # Convert each book dict to JSON string for the template
-                for book in api_results:
-                    book["json_data"] = json.dumps(book)
+                # Keep the results server-side; the selection posts a token
+                token = search_store.save_results(api_results, request.user.pk)
 
                 return render(
                     request,
                     "books/book_selection.html",
                     {
                         "api_results": api_results,
+                        "token": token,
                         "search_title": title,
                         "search_author": author,
                     },
@@ -179,11 +438,115 @@ def search_books_ajax(request):
         if not title:
             return JsonResponse({"error": "Title is required"}, status=400)
 
-        # Search Google Books API
-        api_results = GoogleBooksService.search_books(title, author, max_results=10)
+        # Search the local catalog, then Google Books API if needed
+        api_results = search.search_books(title, author, max_results=10)
+        token = search_store.save_results(api_results, request.user.pk)
 
         return JsonResponse(
-            {"success": True, "results": api_results, "count": len(api_results)}
+            {
+                "success": True,
+                "results": api_results,
+                "count": len(api_results),
+                "token": token,
+            }
+        )
+
+    except json.JSONDecodeError:
+        return JsonResponse({"error": "Invalid JSON data"}, status=400)
+    except (TypeError, ValueError) as e:
+        return JsonResponse({"error": str(e)}, status=500)
+
+
+@require_http_methods(["GET"])
+def suggest_titles(request):
+    """Return title completions for the search form, for every keystroke."""
+    query = request.GET.get("q", "")
+    response = JsonResponse(
+        {
+            "query": query,
+            "suggestions": suggest.suggest(query, settings.SUGGEST["LIMIT"]),
+        }
+    )
+    # The same for every user, so browsers and shared caches may keep it
+    patch_cache_control(response, public=True, max_age=settings.SUGGEST["MAX_AGE"])
+    return response
+
+
+@staff_member_required
+@never_cache
+@require_http_methods(["GET"])
+def db_pool_stats(request):
+    """Database connection pool statistics of the worker serving the request."""
+    return JsonResponse(dbpool.stats())
+
+
+@login_required
+async def search_books_async(request):
+    """Async variant of search_books that does not block a worker under ASGI."""
+    if request.method == "POST":
+        search_form = BookSearchForm(request.POST)
+        if search_form.is_valid():
+            title = search_form.cleaned_data["title"]
+            author = search_form.cleaned_data.get("author", "")
+
+            # Search locally, then Google Books API without holding a thread
+            api_results = await search.asearch_books(title, author)
+
+            if api_results:
+                # Keep the results server-side; the selection posts a token.
+                # request.user would load the user synchronously: use auser()
+                user = await request.auser()
+                token = await sync_to_async(search_store.save_results)(
+                    api_results, user.pk
+                )
+
+                return await sync_to_async(render)(
+                    request,
+                    "books/book_selection.html",
+                    {
+                        "api_results": api_results,
+                        "token": token,
+                        "search_title": title,
+                        "search_author": author,
+                    },
+                )
+            messages.add_message(
+                request,
+                messages.ERROR,
+                "No books found with that title and author. Please try different search terms.",
+            )
+    else:
+        search_form = BookSearchForm()
+
+    return await sync_to_async(render)(
+        request, "books/search_books.html", {"form": search_form}
+    )
+
+
+@login_required
+@require_http_methods(["POST"])
+async def search_books_ajax_async(request):
+    """Async variant of the AJAX search endpoint for ASGI deployments."""
+    try:
+        data = json.loads(request.body)
+        title = data.get("title", "").strip()
+        author = data.get("author", "").strip()
+
+        if not title:
+            return JsonResponse({"error": "Title is required"}, status=400)
+
+        # Search locally, then Google Books API without holding a thread
+        api_results = await search.asearch_books(title, author, max_results=10)
+        user = await request.auser()
+        token = await sync_to_async(search_store.save_results)(api_results, user.pk)
+
+        return JsonResponse(
+            {
+                "success": True,
+                "results": api_results,
+                "count": len(api_results),
+                "token": token,
+            }
         )
 
     except json.JSONDecodeError:
@@ -196,85 +559,55 @@ def search_books_ajax(request):
 def add_book_from_api(request):
     """View to add a book from Google Books API selection."""
     if request.method == "POST":
-        selected_book_data = request.POST.get("selected_book")
+        token = request.POST.get("token")
+        result_id = request.POST.get("result_id")
 
-        if not selected_book_data:
+        if not token or not result_id:
             messages.add_message(
                 request, messages.ERROR, "No book was selected. Please try again."
             )
             return redirect("search_books")
 
-        try:
-            # Parse the selected book data
-            book_data = json.loads(selected_book_data)
-
-            # Check if book already exists for this user
-            existing_book = Book.objects.filter(
-                user=request.user,
-                title__iexact=book_data.get("title", ""),
-                author__iexact=book_data.get("author", ""),
-            ).first()
+        book_data = search_store.get_result(token, result_id, request.user.pk)
+        if book_data is None:
+            messages.add_message(
+                request,
+                messages.ERROR,
+                "Your search results have expired. Please search again.",
+            )
+            return redirect("search_books")
 
-            if existing_book:
-                messages.warning(
-                    request, f"'{book_data.get('title')}' is already in your shelf!"
+        try:
+            # Reuse the shared volume if this edition is already known, so
+            # its details and cover aren't stored (or uploaded) again
+            volume, created = get_or_create_volume(book_data)
+
+            # Queue the cover import so the request doesn't wait on Cloudinary.
+            # Done before the shelf insert, which may fail as a duplicate, so
+            # a new volume is never left waiting for a cover nobody imports
+            # (the job key makes this a no-op for a volume already queued).
+            cover_url = book_data.get("cover_url")
+            if (created or volume.cover_pending) and cover_url:
+                enqueue(
+                    "import_volume_cover",
+                    {"volume_id": volume.pk, "cover_url": cover_url},
+                    key=f"cover:volume:{volume.pk}",
                 )
-                return redirect("search_books")
 
-            # Create the book instance
             book = Book(
                 user=request.user,
-                title=book_data.get("title", ""),
-                author=book_data.get("author", ""),
-                description=book_data.get("description", ""),
-                genres=book_data.get("genres", ""),
-                # Commented out for simplified version
-                # google_books_id=book_data.get('google_books_id', ''),
-                # isbn=book_data.get('isbn', ''),
-                # publisher=book_data.get('publisher', ''),
-                # page_count=book_data.get('page_count'),
-                # rating=book_data.get('rating')
+                volume=volume,
+                title=volume.title,
+                author=volume.author,
             )
-
-            # Handle published date
-            if book_data.get("published"):
-                try:
-                    # Parse ISO format date string from API
-                    book.published = datetime.strptime(
-                        book_data["published"], "%Y-%m-%d"
-                    ).date()
-                except (ValueError, TypeError):
-                    # Handle different date formats or invalid dates
-                    try:
-                        # Try parsing just year
-                        year = int(book_data["published"][:4])
-                        book.published = datetime(year, 1, 1).date()
-                    except (ValueError, TypeError):
-                        pass
-
-            # Handle cover image download if URL provided
-            cover_url = book_data.get("cover_url")
-            if cover_url:
-                try:
-                    # Upload the cover image to Cloudinary
-                    upload_result = cloudinary.uploader.upload(
-                        cover_url,
-                        folder="book_covers",
-                        # Simplified naming
-                        public_id=f"book_api_{request.user.id}_{str(book.title)[:20]}",
-                        # Original with google_books_id
-                        # public_id=f"book_{book.google_books_id or 'manual'}_{request.user.id}"
-                    )
-                    book.cover = upload_result["public_id"]
-                except cloudinary.exceptions.Error:
-                    # If cover upload fails, continue without cover
-                    messages.add_message(
-                        request,
-                        messages.WARNING,
-                        "Book added successfully, but cover image could not be downloaded.",
-                    )
-
-            book.save()
+            try:
+                # The unique_book_per_user constraint rejects duplicates, even
+                # from concurrent double-submits
+                with transaction.atomic():
+                    book.save()
+            except IntegrityError:
+                messages.warning(request, f"'{volume.title}' is already in your shelf!")
+                return redirect("search_books")
 
             messages.add_message(
                 request,
@@ -283,11 +616,7 @@ def add_book_from_api(request):
             )
             return redirect("book_detail", pk=book.pk)
 
-        except json.JSONDecodeError:
-            messages.add_message(
-                request, messages.ERROR, "Invalid book data. Please try again."
-            )
-        except (TypeError, ValueError, cloudinary.exceptions.Error) as e:
+        except (TypeError, ValueError) as e:
             messages.add_message(
                 request, messages.ERROR, f"Error adding book: {str(e)}"
             )
@@ -295,6 +624,54 @@ def add_book_from_api(request):
     return redirect("search_books")
 
 
+@login_required
+def import_books(request):
+    """View to upload a CSV or Goodreads export and follow its imports."""
+    if request.method == "POST":
+        form = LibraryImportForm(request.POST, request.FILES)
+        if form.is_valid():
+            library_import = LibraryImport.objects.create(
+                user=request.user,
+                filename=form.cleaned_data["filename"][:255],
+                upload=form.cleaned_data["file"],
+            )
+            enqueue(
+                "import_library",
+                {"import_id": library_import.pk},
+                key=f"import:{library_import.pk}",
+            )
+            messages.add_message(
+                request,
+                messages.SUCCESS,
+                "Your import has started. Books will appear on your shelf as it runs.",
+            )
+            return redirect("import_books")
+    else:
+        form = LibraryImportForm()
+
+    imports = request.user.library_imports.all()[:10]
+    return render(
+        request, "books/import_books.html", {"form": form, "imports": imports}
+    )
+
+
+@login_required
+def import_status(request, pk):
+    """JSON endpoint reporting the progress of one of the user's imports."""
+    library_import = get_object_or_404(LibraryImport, pk=pk, user=request.user)
+    return JsonResponse(
+        {
+            "id": library_import.pk,
+            "status": library_import.status,
+            "processed": library_import.processed,
+            "added": library_import.added,
+            "duplicates": library_import.duplicates,
+            "not_found": library_import.not_found,
+            "skipped": library_import.skipped,
+        }
+    )
+
+
 @login_required
 def my_account(request):
     """View to display and edit user's account information"""
@@ -308,7 +685,9 @@ def edit_profile(request):
         # Handle profile update
         form = UserProfileForm(request.POST, request.FILES, instance=request.user)
         if form.is_valid():
-            form.save()
+            # Saving uploads a new profile image to Cloudinary
+            with timed("cloudinary"):
+                form.save()
             messages.add_message(
                 request, messages.SUCCESS, "Your profile has been updated successfully!"
             )
@@ -325,21 +704,20 @@ def remove_profile_image(request):
     user = request.user
     if request.method == "POST":
         if user.profile_image:
-            try:
-                # Extract the public_id from the Cloudinary URL
-                public_id = user.profile_image.public_id
-                # Delete from Cloudinary
-                cloudinary.uploader.destroy(public_id)
-                # Clear the field and save the user
-                user.profile_image = None
-                user.save()
-                messages.add_message(
-                    request, messages.SUCCESS, "Profile picture removed successfully!"
-                )
-            except cloudinary.exceptions.Error as e:
-                messages.add_message(
-                    request, messages.ERROR, f"Error removing image: {str(e)}"
-                )
+            # Extract the public_id from the Cloudinary URL
+            public_id = user.profile_image.public_id
+            # Clear the field and save the user
+            user.profile_image = None
+            user.save()
+            # Delete from Cloudinary in the background
+            enqueue(
+                "destroy_cloudinary_image",
+                {"public_id": public_id},
+                key=f"destroy:{public_id}",
+            )
+            messages.add_message(
+                request, messages.SUCCESS, "Profile picture removed successfully!"
+            )
         else:
             messages.add_message(
                 request, messages.ERROR, "No profile picture to remove."
@@ -354,13 +732,14 @@ def delete_account(request):
         user = request.user
         username = user.username
         try:
-            # Delete user's profile image from Cloudinary if it exists
+            # Queue deletion of the user's profile image from Cloudinary
             if user.profile_image:
-                try:
-                    public_id = user.profile_image.public_id
-                    cloudinary.uploader.destroy(public_id)
-                except cloudinary.exceptions.Error:
-                    pass
+                public_id = user.profile_image.public_id
+                enqueue(
+                    "destroy_cloudinary_image",
+                    {"public_id": public_id},
+                    key=f"destroy:{public_id}",
+                )
 
             # Note: Django will cascade delete related objects (books, reviews, comments)
             # due to foreign key relationships with on_delete=CASCADE
@@ -375,7 +754,7 @@ def delete_account(request):
             # Redirect to home page since user no longer exists
             return redirect("home")
 
-        except (user.DoesNotExist, cloudinary.exceptions.Error):
+        except user.DoesNotExist:
             messages.error(
                 request,
                 "An error occurred while deleting your account. Please try again.",
@@ -0,0 +1,108 @@
+"""
+Resolving search results to canonical Volume rows.
+
+Each edition is stored once, however many users shelve it, so shelving a
+book that is already known reuses its description, genres and cover instead
+of copying them and uploading the cover again.
+"""
+
+from datetime import date, datetime
+from typing import Dict, Optional, Tuple
+
+from django.db import IntegrityError, transaction
+from django.db.models.functions import Lower
+
+from .genres import set_volume_genres
+from .models import Volume
+
+
+def parse_published(value: Optional[str]) -> Optional[date]:
+    """Parse a published date from the API, which may be a full date or a year."""
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").date()
+    except (ValueError, TypeError):
+        try:
+            return date(int(value[:4]), 1, 1)
+        except (ValueError, TypeError):
+            return None
+
+
+def _claim_unlinked(google_books_id: str, title: str, author: str) -> Optional[Volume]:
+    """
+    Link a volume without a Google ID to ``google_books_id`` by title and author.
+
+    Volumes backfilled from shelf entries have no Google ID; the first Google
+    result of the same title and author adopts the oldest of them.
+    """
+    volume = (
+        Volume.objects.alias(lower_title=Lower("title"), lower_author=Lower("author"))
+        .filter(
+            google_books_id__isnull=True,
+            lower_title=title.lower(),
+            lower_author=author.lower(),
+        )
+        .order_by("id")
+        .first()
+    )
+    if volume is None:
+        return None
+    try:
+        with transaction.atomic():
+            claimed = Volume.objects.filter(
+                pk=volume.pk, google_books_id__isnull=True
+            ).update(google_books_id=google_books_id)
+    except IntegrityError:
+        # Another request created the volume for this Google ID meanwhile
+        return None
+    if not claimed:
+        return None
+    volume.google_books_id = google_books_id
+    return volume
+
+
+def get_or_create_volume(book_data: Dict) -> Tuple[Volume, bool]:
+    """
+    Return the volume for a search result, creating it if it is new.
+
+    Local results carry the ``volume_id`` they came from; Google results are
+    matched on ``google_books_id``, then on the title and author of a volume
+    that has no Google ID yet. A new volume is created with
+    ``cover_pending`` set if it has a cover to import.
+
+    Returns:
+        The volume and whether it was created
+    """
+    volume_id = book_data.get("volume_id")
+    if volume_id:
+        volume = Volume.objects.filter(pk=volume_id).first()
+        if volume is not None:
+            return volume, False
+
+    defaults = {
+        "title": book_data.get("title", "")[:200],
+        "author": book_data.get("author", "")[:100],
+        "isbn": (book_data.get("isbn") or "")[:20],
+        "description": book_data.get("description", ""),
+        "genres": book_data.get("genres", "")[:300],
+        "published": parse_published(book_data.get("published")),
+        "cover_pending": bool(book_data.get("cover_url")),
+    }
+    google_books_id = book_data.get("google_books_id")
+    if google_books_id:
+        if not Volume.objects.filter(google_books_id=google_books_id).exists():
+            volume = _claim_unlinked(
+                google_books_id, defaults["title"], defaults["author"]
+            )
+            if volume is not None:
+                return volume, False
+        # get_or_create copes with two users adding a new volume at once
+        volume, created = Volume.objects.get_or_create(
+            google_books_id=google_books_id, defaults=defaults
+        )
+    else:
+        volume, created = Volume.objects.create(**defaults), True
+    if created:
+        set_volume_genres(volume, volume.genres)
+    return volume, created
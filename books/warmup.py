@@ -0,0 +1,181 @@
+"""
+Warmup of server processes, and the state behind the readiness probe.
+
+``preload`` compiles the app's templates and the form widget templates into
+the cached loaders and builds the URL resolver. The gunicorn profile
+(``config/gunicorn.py``) runs it once in the master, after the app is
+preloaded and before workers fork, so every worker starts with them. ``connect`` opens the database connection and primes
+the Google Books and Cloudinary HTTP pools. Sockets must not be shared across
+a fork, so each worker runs it for itself.
+"""
+
+import logging
+import os
+import time
+from contextlib import contextmanager
+from typing import Dict
+from urllib.parse import urlsplit
+
+import cloudinary
+import cloudinary.uploader
+import requests
+from django import forms
+from django.conf import settings
+from django.db import DatabaseError, connection
+from django.template import TemplateDoesNotExist, TemplateSyntaxError, engines
+from django.template.utils import get_app_template_dirs
+from django.urls import reverse
+from urllib3.exceptions import HTTPError
+
+from .services import GoogleBooksService
+
+logger = logging.getLogger(__name__)
+
+_state = {"preloaded": False, "timings": {}}
+
+
+@contextmanager
+def _timed(name: str):
+    """Record how long the enclosed warmup step took, in milliseconds."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        _state["timings"][name] = round((time.perf_counter() - started) * 1000, 1)
+
+
+def _template_names():
+    engine = engines["django"].engine
+    dirs = list(engine.dirs) + list(get_app_template_dirs("templates"))
+    names = set()
+    for root in map(str, dirs):
+        for path, _, files in os.walk(root):
+            for file in files:
+                name = os.path.relpath(os.path.join(path, file), root)
+                name = name.replace(os.sep, "/")
+                # Top-level layouts (base.html) plus the configured directories
+                if "/" not in name or name.startswith(
+                    tuple(f"{d}/" for d in settings.WARMUP["TEMPLATE_DIRS"])
+                ):
+                    names.add(name)
+    return sorted(names)
+
+
+class _WarmupForm(forms.Form):
+    """One field of each common widget, rendered to compile their templates."""
+
+    text = forms.CharField()
+    email = forms.EmailField()
+    password = forms.CharField(widget=forms.PasswordInput)
+    remember = forms.BooleanField()
+    choice = forms.ChoiceField(choices=[("a", "a")])
+    body = forms.CharField(widget=forms.Textarea)
+    image = forms.ImageField()
+
+
+def preload() -> Dict[str, float]:
+    """
+    Compile templates, form widgets and URL patterns in this process.
+
+    Returns:
+        Milliseconds per warmup step so far
+    """
+    with _timed("templates"):
+        engine = engines["django"]
+        compiled = 0
+        for name in _template_names():
+            try:
+                engine.get_template(name)
+                compiled += 1
+            except (TemplateDoesNotExist, TemplateSyntaxError) as e:
+                logger.warning("Template %s not preloaded: %s", name, e)
+    with _timed("forms"):
+        # Forms render through the form renderer's own template engine
+        _WarmupForm().render()
+    with _timed("urls"):
+        # Reversing builds the resolver's lookup tables, not just the imports
+        reverse("home")
+    _state["preloaded"] = True
+    logger.info("Preloaded %s templates: %s", compiled, _state["timings"])
+    return dict(_state["timings"])
+
+
+def _root(url: str) -> str:
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}/"
+
+
+def _prime(pool):
+    """Leave an open keep-alive connection in a urllib3 connection pool."""
+    pool.urlopen(
+        "HEAD",
+        "/",
+        retries=False,
+        timeout=settings.WARMUP["HTTP_TIMEOUT"],
+        release_conn=True,
+    )
+
+
+def _google_pool():
+    url = _root(GoogleBooksService.BASE_URL)
+    adapter = GoogleBooksService.session().get_adapter(url)
+    # The pool requests itself picks, keyed by the TLS settings it sends with
+    return adapter.get_connection_with_tls_context(
+        requests.Request("HEAD", url).prepare(), verify=True
+    )
+
+
+def _cloudinary_pool():
+    url = _root(cloudinary.config().upload_prefix or "https://api.cloudinary.com")
+    # The uploader's module-level pool manager is the one uploads reuse
+    pool_manager = cloudinary.uploader._http  # pylint: disable=protected-access
+    return pool_manager.connection_from_url(url)
+
+
+def connect_database():
+    """Open this thread's database connection."""
+    with _timed("database"):
+        try:
+            connection.ensure_connection()
+        except DatabaseError as e:
+            logger.warning("Database not reachable during warmup: %s", e)
+
+
+def connect(database: bool = True) -> Dict[str, float]:
+    """
+    Open the connections of this worker process.
+
+    Args:
+        database: Also open this thread's database connection; threaded
+            workers open one per request thread with ``connect_database``
+
+    Returns:
+        Milliseconds per warmup step so far
+    """
+    if database:
+        connect_database()
+    # HEAD / on the API hosts costs no quota; failures only cost the timeout
+    for name, pool in (("google", _google_pool), ("cloudinary", _cloudinary_pool)):
+        with _timed(name):
+            try:
+                _prime(pool())
+            except HTTPError as e:
+                logger.warning("Could not prime the %s pool: %s", name, e)
+    return dict(_state["timings"])
+
+
+def readiness() -> Dict[str, bool]:
+    """Return the checks behind ``/readyz``: warmup done and database reachable."""
+    checks = {"preloaded": _state["preloaded"] or not settings.WARMUP["ENABLED"]}
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1")
+        checks["database"] = True
+    except DatabaseError:
+        checks["database"] = False
+    return checks
+
+
+def timings() -> Dict[str, float]:
+    """Return the milliseconds each warmup step took in this process."""
+    return dict(_state["timings"])
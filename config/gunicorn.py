@@ -0,0 +1,79 @@
+"""
+Gunicorn serving profile.
+
+    gunicorn -c config/gunicorn.py config.wsgi
+    SERVER_MODE=asgi gunicorn -c config/gunicorn.py config.asgi
+
+The WSGI mode runs threaded sync workers, so a worker waiting on Google Books
+keeps serving on its other threads. The ASGI mode runs uvicorn workers with
+the async search views. Either way the app is imported once in the master
+(``preload_app``) and its templates and URLs are compiled there before the
+workers fork. Each worker then opens its own database and HTTP connections.
+
+Worker counts default from the CPU count; WEB_CONCURRENCY and
+GUNICORN_THREADS override them.
+"""
+
+import multiprocessing
+import os
+import threading
+
+SERVER_MODE = os.environ.get("SERVER_MODE", "wsgi")
+CORES = multiprocessing.cpu_count()
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+os.environ.setdefault("SERVER_WARMUP", "True")
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+preload_app = True
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", "30"))
+graceful_timeout = 30
+keepalive = 5
+# Recycle workers now and then, staggered, to cap slow memory growth
+max_requests = 1000
+max_requests_jitter = 100
+accesslog = "-"
+
+if SERVER_MODE == "asgi":
+    os.environ.setdefault("ASYNC_SEARCH_VIEWS", "True")
+    # Django advises against persistent connections under ASGI; pool instead
+    os.environ.setdefault("DATABASE_CONN_MAX_AGE", "0")
+    worker_class = "uvicorn.workers.UvicornWorker"
+    # One event loop per core keeps many searches in flight per worker
+    workers = int(os.environ.get("WEB_CONCURRENCY", CORES))
+else:
+    worker_class = "gthread"
+    workers = int(os.environ.get("WEB_CONCURRENCY", CORES * 2 + 1))
+    threads = int(os.environ.get("GUNICORN_THREADS", "4"))
+
+
+def when_ready(server):
+    """Compile templates and URLs in the master, once, before workers fork."""
+    from books import warmup  # pylint: disable=import-outside-toplevel
+
+    server.log.info("Preloaded in ms: %s", warmup.preload())
+
+
+def post_fork(server, worker):  # pylint: disable=unused-argument
+    """Drop connections inherited from the master; a worker opens its own."""
+    from django.db import connections  # pylint: disable=import-outside-toplevel
+
+    connections.close_all()
+
+
+def post_worker_init(worker):
+    """Open the worker's connections before it accepts requests."""
+    from books import warmup  # pylint: disable=import-outside-toplevel
+
+    pool = getattr(worker, "tpool", None)
+    if pool is not None:
+        # Database connections are per thread: open one on every request thread
+        barrier = threading.Barrier(worker.cfg.threads)
+
+        def connect_thread(_):
+            barrier.wait(timeout=10)
+            warmup.connect_database()
+
+        list(pool.map(connect_thread, range(worker.cfg.threads)))
+    timings = warmup.connect(database=pool is None)
+    worker.log.info("Worker %s warmed up in ms: %s", worker.pid, timings)
@@ -60,6 +60,10 @@ LOGIN_REDIRECT_URL = "/"
 LOGOUT_REDIRECT_URL = "/"
 
 MIDDLEWARE = [
+    # Answers /healthz and /readyz before host validation and sessions
+    "books.middleware.HealthCheckMiddleware",
+    # Opt-in; removes itself unless REQUEST_TIMING["ENABLED"] is set
+    "books.middleware.ServerTimingMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -83,6 +87,7 @@ TEMPLATES = [
                 "django.template.context_processors.request",
                 "django.contrib.auth.context_processors.auth",
                 "django.contrib.messages.context_processors.messages",
+                "books.context_processors.fragment_cache",
             ],
         },
     },
@@ -90,6 +95,18 @@ TEMPLATES = [
 
 WSGI_APPLICATION = "config.wsgi.application"
 
+# Server warmup (set by the gunicorn profile, config/gunicorn.py): templates
+# under TEMPLATE_DIRS are compiled before workers fork, and /readyz fails
+# until that is done
+WARMUP = {
+    "ENABLED": os.environ.get("SERVER_WARMUP", "False") == "True",
+    "TEMPLATE_DIRS": ("books", "account"),
+    "HTTP_TIMEOUT": float(os.environ.get("SERVER_WARMUP_HTTP_TIMEOUT", "2")),
+}
+
+# Route the search pages to their async views (enable when serving via ASGI)
+ASYNC_SEARCH_VIEWS = os.environ.get("ASYNC_SEARCH_VIEWS", "False") == "True"
+
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
@@ -100,7 +117,170 @@ WSGI_APPLICATION = "config.wsgi.application"
 #     }
 # }
 
-DATABASES = {"default": dj_database_url.parse(os.environ.get("DATABASE_URL"))}
+# Each thread keeps its connection for DATABASE_CONN_MAX_AGE seconds instead
+# of reconnecting (and, on Heroku, renegotiating TLS) on every request, and
+# checks it with a round trip before reusing it. DATABASE_POOL=True switches
+# PostgreSQL to Django's psycopg 3 pool (needs psycopg[pool]): each process
+# shares MIN_SIZE..MAX_SIZE connections among its threads, checked on
+# checkout. Keep workers x MAX_SIZE (or workers x threads) under the
+# server's connection limit.
+DATABASES = {
+    "default": dj_database_url.parse(
+        os.environ.get("DATABASE_URL"),
+        conn_max_age=int(os.environ.get("DATABASE_CONN_MAX_AGE", "600")),
+    )
+}
+DATABASES["default"]["CONN_HEALTH_CHECKS"] = True
+if os.environ.get("DATABASE_POOL", "False") == "True":
+    # Pooled connections go back to the pool after each request instead
+    DATABASES["default"]["CONN_MAX_AGE"] = 0
+    DATABASES["default"].setdefault("OPTIONS", {})["pool"] = {
+        "min_size": int(os.environ.get("DATABASE_POOL_MIN_SIZE", "2")),
+        "max_size": int(os.environ.get("DATABASE_POOL_MAX_SIZE", "10")),
+        "timeout": float(os.environ.get("DATABASE_POOL_TIMEOUT", "10")),
+        "max_idle": 300,
+        "max_lifetime": 1800,
+    }
+
+# Caches
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# The Google Books result cache can be moved to a shared backend, e.g.
+# GOOGLE_BOOKS_CACHE_BACKEND=django.core.cache.backends.db.DatabaseCache
+# with GOOGLE_BOOKS_CACHE_LOCATION=google_books_cache (run createcachetable).
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    "google_books": {
+        "BACKEND": os.environ.get(
+            "GOOGLE_BOOKS_CACHE_BACKEND",
+            "django.core.cache.backends.locmem.LocMemCache",
+        ),
+        "LOCATION": os.environ.get("GOOGLE_BOOKS_CACHE_LOCATION", "google-books"),
+        "OPTIONS": {
+            "MAX_ENTRIES": int(
+                os.environ.get("GOOGLE_BOOKS_CACHE_MAX_ENTRIES", "5000")
+            ),
+        },
+    },
+    # Rendered shelf fragments and their version keys. Use a backend shared by
+    # all workers in production (e.g. DatabaseCache) so invalidation reaches them.
+    "template_fragments": {
+        "BACKEND": os.environ.get(
+            "FRAGMENT_CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"
+        ),
+        "LOCATION": os.environ.get("FRAGMENT_CACHE_LOCATION", "template-fragments"),
+    },
+    # Search results awaiting selection. They must be visible to every worker,
+    # hence the database cache (created by `manage.py createcachetable`).
+    "search_results": {
+        "BACKEND": os.environ.get(
+            "SEARCH_RESULTS_CACHE_BACKEND",
+            (
+                "django.core.cache.backends.locmem.LocMemCache"
+                if DEBUG
+                else "django.core.cache.backends.db.DatabaseCache"
+            ),
+        ),
+        "LOCATION": os.environ.get(
+            "SEARCH_RESULTS_CACHE_LOCATION", "search_results_cache"
+        ),
+        "OPTIONS": {"MAX_ENTRIES": 10000},
+    },
+}
+
+FRAGMENT_CACHE_ALIAS = "template_fragments"
+FRAGMENT_CACHE_TIMEOUT = int(os.environ.get("FRAGMENT_CACHE_TIMEOUT", "3600"))
+
+SEARCH_RESULTS_CACHE_ALIAS = "search_results"
+SEARCH_RESULTS_TTL = int(os.environ.get("SEARCH_RESULTS_TTL", "900"))  # 15 minutes
+SEARCH_RESULTS_MAX = 20
+
+GOOGLE_BOOKS_CACHE = {
+    "ALIAS": "google_books",
+    "TIMEOUT": int(os.environ.get("GOOGLE_BOOKS_CACHE_TTL", "21600")),  # 6 hours
+    "NEGATIVE_TIMEOUT": int(os.environ.get("GOOGLE_BOOKS_CACHE_NEGATIVE_TTL", "300")),
+    "MAX_ENTRIES": int(os.environ.get("GOOGLE_BOOKS_CACHE_MAX_ENTRIES", "5000")),
+}
+
+# Local catalog matches needed before a search skips the Google Books API
+LOCAL_SEARCH_MIN_RESULTS = int(os.environ.get("LOCAL_SEARCH_MIN_RESULTS", "5"))
+
+# Google Books API endpoint (overridable to point load tests at a stub)
+GOOGLE_BOOKS_BASE_URL = os.environ.get(
+    "GOOGLE_BOOKS_BASE_URL", "https://www.googleapis.com/books/v1"
+)
+
+# Connection pool, timeouts and retry policy for Google Books API calls
+GOOGLE_BOOKS_HTTP = {
+    "POOL_MAXSIZE": int(os.environ.get("GOOGLE_BOOKS_POOL_MAXSIZE", "10")),
+    "CONNECT_TIMEOUT": float(os.environ.get("GOOGLE_BOOKS_CONNECT_TIMEOUT", "3.05")),
+    "READ_TIMEOUT": float(os.environ.get("GOOGLE_BOOKS_READ_TIMEOUT", "10")),
+    "RETRIES": int(os.environ.get("GOOGLE_BOOKS_RETRIES", "3")),
+    "BACKOFF_FACTOR": 0.3,
+    "BACKOFF_JITTER": 0.2,
+    # Longer Retry-After waits fail the call rather than hold the worker
+    "MAX_RETRY_AFTER": float(os.environ.get("GOOGLE_BOOKS_MAX_RETRY_AFTER", "30")),
+}
+
+# Upstream call limits for Google Books: a token bucket of QPS calls per
+# second (bursts of BURST, queueing at most MAX_WAIT seconds) and a daily
+# budget (0 = unlimited) shared by all workers through the google_books cache.
+# Identical concurrent lookups share one call; CROSS_PROCESS extends that to
+# other workers through a lock in the same cache, so it needs a shared backend.
+GOOGLE_BOOKS_LIMITS = {
+    "QPS": float(os.environ.get("GOOGLE_BOOKS_QPS", "10")),
+    "BURST": int(os.environ.get("GOOGLE_BOOKS_BURST", "20")),
+    "MAX_WAIT": float(os.environ.get("GOOGLE_BOOKS_MAX_WAIT", "2")),
+    "DAILY_BUDGET": int(os.environ.get("GOOGLE_BOOKS_DAILY_BUDGET", "0")),
+    "CROSS_PROCESS": os.environ.get("GOOGLE_BOOKS_CROSS_PROCESS", "False") == "True",
+    "LOCK_TIMEOUT": 15,
+    "POLL_INTERVAL": 0.05,
+}
+
+# Circuit breaker for Google Books: it opens when FAILURE_RATE of the last
+# WINDOW calls failed or took over SLOW_CALL seconds, then fails fast for
+# OPEN_SECONDS. Meanwhile the last good result of a lookup (kept STALE_TTL
+# seconds) is served and a job refreshes it once the API answers again.
+GOOGLE_BOOKS_BREAKER = {
+    "WINDOW": int(os.environ.get("GOOGLE_BOOKS_BREAKER_WINDOW", "20")),
+    "MIN_CALLS": 5,
+    "FAILURE_RATE": float(os.environ.get("GOOGLE_BOOKS_BREAKER_FAILURE_RATE", "0.5")),
+    "SLOW_CALL": float(os.environ.get("GOOGLE_BOOKS_BREAKER_SLOW_CALL", "5")),
+    "OPEN_SECONDS": int(os.environ.get("GOOGLE_BOOKS_BREAKER_OPEN_SECONDS", "30")),
+    "STALE_TTL": int(os.environ.get("GOOGLE_BOOKS_STALE_TTL", "604800")),  # 7 days
+    "STALE_MAX_ENTRIES": 20000,
+}
+
+# Bulk CSV/Goodreads imports: rows resolved per batch, concurrent Google
+# lookups and the rate they are limited to (requests per second)
+BOOK_IMPORT = {
+    "BATCH_SIZE": int(os.environ.get("BOOK_IMPORT_BATCH_SIZE", "100")),
+    "WORKERS": int(os.environ.get("BOOK_IMPORT_WORKERS", "4")),
+    "RATE_LIMIT": float(os.environ.get("BOOK_IMPORT_RATE_LIMIT", "5")),
+    "MAX_UPLOAD_BYTES": 5 * 1024 * 1024,
+}
+
+# Per-request Server-Timing headers and timing logs, with the query count and
+# latency above which a request is logged as over budget
+REQUEST_TIMING = {
+    "ENABLED": os.environ.get("REQUEST_TIMING", "False") == "True",
+    "QUERY_BUDGET": int(os.environ.get("REQUEST_QUERY_BUDGET", "25")),
+    "LATENCY_BUDGET_MS": int(os.environ.get("REQUEST_LATENCY_BUDGET_MS", "500")),
+}
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {"console": {"class": "logging.StreamHandler"}},
+    "loggers": {
+        "books": {
+            "handlers": ["console"],
+            "level": os.environ.get("BOOKS_LOG_LEVEL", "INFO"),
+        },
+    },
+}
 
 CSRF_TRUSTED_ORIGINS = ["https://*.herokuapp.com"]
 
@@ -155,8 +335,27 @@ STATICFILES_DIRS = [
 ]
 STATIC_ROOT = os.path.join(BASE_DIR, "staticfiles")
 
-# WhiteNoise static file serving
-STATICFILES_STORAGE = "whitenoise.storage.CompressedStaticFilesStorage"
+MEDIA_ROOT = os.path.join(BASE_DIR, "media")
+
+# WhiteNoise static file serving. Uploaded import files go to Cloudinary
+# (as raw files) when it is configured, since the web and worker dynos don't
+# share a disk, and to MEDIA_ROOT otherwise.
+STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {
+        "BACKEND": "whitenoise.storage.CompressedStaticFilesStorage",
+    },
+    "imports": {
+        "BACKEND": os.environ.get(
+            "BOOK_IMPORT_STORAGE_BACKEND",
+            (
+                "cloudinary_storage.storage.RawMediaCloudinaryStorage"
+                if os.environ.get("CLOUDINARY_URL")
+                else "django.core.files.storage.FileSystemStorage"
+            ),
+        ),
+    },
+}
 
 # Cloudinary Configuration
 # Force HTTPS for all Cloudinary URLs to avoid mixed content warnings
@@ -164,6 +363,44 @@ cloudinary.config(
     secure=True,  # Use HTTPS instead of HTTP for all URLs
 )
 
+# Shelves page layout
+SHELVES_USERS_PER_PAGE = int(os.environ.get("SHELVES_USERS_PER_PAGE", "3"))
+SHELVES_BOOKS_PER_USER = int(os.environ.get("SHELVES_BOOKS_PER_USER", "3"))
+USER_SHELF_PAGE_SIZE = int(os.environ.get("USER_SHELF_PAGE_SIZE", "24"))
+
+# Book page reviews, and the approved comments shown under each review
+REVIEWS_PAGE_SIZE = int(os.environ.get("REVIEWS_PAGE_SIZE", "10"))
+REVIEW_COMMENTS_PREVIEW = int(os.environ.get("REVIEW_COMMENTS_PREVIEW", "3"))
+REVIEW_COMMENTS_PAGE_SIZE = int(os.environ.get("REVIEW_COMMENTS_PAGE_SIZE", "20"))
+
+# Top-rated leaderboard; the minimum must stay at or above the threshold of
+# the book_top_rated_idx partial index (3) for the index to be used
+TOP_RATED_MIN_REVIEWS = int(os.environ.get("TOP_RATED_MIN_REVIEWS", "3"))
+TOP_RATED_PAGE_SIZE = int(os.environ.get("TOP_RATED_PAGE_SIZE", "20"))
+
+# Search title autocomplete (books.suggest)
+SUGGEST = {
+    # Shortest query answered
+    "MIN_LENGTH": int(os.environ.get("SUGGEST_MIN_LENGTH", "2")),
+    "LIMIT": 10,
+    # Browser and shared-cache lifetime of a suggestion response
+    "MAX_AGE": int(os.environ.get("SUGGEST_MAX_AGE", "300")),
+    # Seconds before a process reloads its in-memory index (non-PostgreSQL)
+    "MEMORY_TTL": int(os.environ.get("SUGGEST_MEMORY_TTL", "300")),
+}
+
+# Related-book recommendations (manage.py build_recommendations)
+RECOMMENDATIONS = {
+    # Neighbors stored per volume
+    "TOP_K": int(os.environ.get("RECOMMENDATIONS_TOP_K", "12")),
+    # Share of the score from genre overlap rather than co-shelving
+    "GENRE_WEIGHT": float(os.environ.get("RECOMMENDATIONS_GENRE_WEIGHT", "0.2")),
+    # Readers with bigger shelves are ignored as co-shelving evidence
+    "MAX_SHELF_SIZE": int(os.environ.get("RECOMMENDATIONS_MAX_SHELF_SIZE", "2000")),
+    # Volumes recomputed per batch
+    "BATCH_SIZE": int(os.environ.get("RECOMMENDATIONS_BATCH_SIZE", "500")),
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
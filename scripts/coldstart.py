@@ -0,0 +1,123 @@
+"""
+Measure cold-start latency of bare gunicorn against the serving profile.
+
+Usage:
+    python scripts/coldstart.py --runs 3
+
+For each server a fresh single-worker gunicorn is started. The script times
+how long it takes until /healthz answers, then the first and second request
+to a few pages, so the cost of lazy imports and template compilation on the
+first request shows up. Google Books is replaced by a local stub.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+# pylint: disable-next=wrong-import-position
+from books.benchmarks import start_stub_upstream  # noqa: E402
+
+PAGES = ("/", "/accounts/login/", "/top-rated/", "/genres/")
+
+SERVERS = {
+    "bare": ["gunicorn", "config.wsgi"],
+    "profile": ["gunicorn", "-c", "config/gunicorn.py", "config.wsgi"],
+}
+
+
+def cold_start(command, port, env):
+    """Start a server and time its boot and its first and second page loads."""
+    started = time.perf_counter()
+    process = subprocess.Popen(  # pylint: disable=consider-using-with
+        [*command, "--bind", f"127.0.0.1:{port}", "--workers", "1"],
+        cwd=BASE_DIR,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=30) as client:
+            deadline = time.monotonic() + 60
+            while True:
+                try:
+                    client.get("/healthz")
+                    break
+                except httpx.HTTPError:
+                    if time.monotonic() > deadline:
+                        raise
+                    time.sleep(0.05)
+            result = {"boot_ms": (time.perf_counter() - started) * 1000}
+            result["ready"] = client.get("/readyz").status_code == 200
+            for attempt in ("first", "second"):
+                for page in PAGES:
+                    request_started = time.perf_counter()
+                    client.get(page)
+                    result[f"{attempt}:{page}"] = (
+                        time.perf_counter() - request_started
+                    ) * 1000
+            return result
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def main():
+    """Cold-start each server ``--runs`` times and print the median timings."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--json", action="store_true", help="print JSON results")
+    args = parser.parse_args()
+
+    stub = start_stub_upstream(0)
+    database = Path(tempfile.mkdtemp()) / "coldstart.sqlite3"
+    env = {
+        **os.environ,
+        "DATABASE_URL": f"sqlite:///{database}",
+        "SECRET_KEY": os.environ.get("SECRET_KEY", "coldstart-secret-key"),
+        "GOOGLE_BOOKS_BASE_URL": f"http://127.0.0.1:{stub.server_port}",
+        "SERVER_WARMUP_HTTP_TIMEOUT": "0.5",
+        "WEB_CONCURRENCY": "1",
+    }
+    # With DEBUG off the search results are kept in a database cache table
+    for command in ("migrate", "createcachetable"):
+        subprocess.run(
+            [sys.executable, "manage.py", command, "--verbosity", "0"],
+            cwd=BASE_DIR,
+            env=env,
+            check=True,
+        )
+
+    results = {}
+    for port, (name, command) in enumerate(SERVERS.items(), start=8711):
+        runs = [cold_start(command, port, env) for _ in range(args.runs)]
+        results[name] = {
+            key: (
+                all(run[key] for run in runs)
+                if key == "ready"
+                else round(statistics.median(run[key] for run in runs), 1)
+            )
+            for key in runs[0]
+        }
+    stub.shutdown()
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'ms (median)':<28}" + "".join(f"{name:>10}" for name in results))
+    for key in results["bare"]:
+        print(f"{key:<28}" + "".join(f"{r[key]!s:>10}" for r in results.values()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+"""
+Compare WSGI (gunicorn, sync views) and ASGI (uvicorn, async views) throughput
+of the AJAX book search against a local stub of the Google Books API.
+
+Usage:
+    python scripts/loadtest_search.py --requests 500 --concurrency 100
+
+The stub answers every volumes search after --upstream-delay seconds, so the
+measured throughput reflects how many searches each server can keep in flight
+rather than Google's latency. Every request uses a unique title so the
+result cache never short-circuits the upstream call.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+# pylint: disable-next=wrong-import-position
+from books.benchmarks import start_stub_upstream  # noqa: E402
+
+
+def prepare_database(env):
+    """Migrate a throwaway database and return session and CSRF cookies."""
+    # With DEBUG off the search results are kept in a database cache table
+    for command in ("migrate", "createcachetable"):
+        subprocess.run(
+            [sys.executable, "manage.py", command, "--verbosity", "0"],
+            cwd=BASE_DIR,
+            env=env,
+            check=True,
+        )
+    os.environ.update(env)
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+    import django  # pylint: disable=import-outside-toplevel
+
+    django.setup()
+    # pylint: disable=import-outside-toplevel
+    from django.test import Client
+    from django.utils.crypto import get_random_string
+    from books.models import CustomUser
+
+    user, _ = CustomUser.objects.get_or_create(username="loadtest")
+    client = Client()
+    client.force_login(user)
+    return {
+        "sessionid": client.cookies["sessionid"].value,
+        "csrftoken": get_random_string(32),
+    }
+
+
+def start_server(kind, port, workers, env):
+    """Start gunicorn (wsgi) or uvicorn (asgi) and wait until it responds."""
+    if kind == "wsgi":
+        command = [
+            "gunicorn",
+            "config.wsgi",
+            "--bind",
+            f"127.0.0.1:{port}",
+            "--workers",
+            str(workers),
+        ]
+        server_env = {**env, "ASYNC_SEARCH_VIEWS": "False"}
+    else:
+        command = [
+            "uvicorn",
+            "config.asgi:application",
+            "--port",
+            str(port),
+            "--workers",
+            str(workers),
+            "--log-level",
+            "warning",
+        ]
+        server_env = {**env, "ASYNC_SEARCH_VIEWS": "True"}
+
+    process = subprocess.Popen(  # pylint: disable=consider-using-with
+        command,
+        cwd=BASE_DIR,
+        env=server_env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/", timeout=1)
+            return process
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError(f"{kind} server did not start on port {port}")
+
+
+async def run_load(port, cookies, total, concurrency, label):
+    """Fire ``total`` AJAX searches with ``concurrency`` requests in flight."""
+    latencies = []
+    errors = 0
+    semaphore = asyncio.Semaphore(concurrency)
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(
+        base_url=f"http://127.0.0.1:{port}",
+        cookies=cookies,
+        headers={"X-CSRFToken": cookies["csrftoken"]},
+        limits=limits,
+        timeout=60,
+    ) as client:
+
+        async def one(i):
+            nonlocal errors
+            async with semaphore:
+                start = time.perf_counter()
+                response = await client.post(
+                    "/search-books-ajax/",
+                    json={"title": f"{label} load test {i}"},
+                )
+                latencies.append(time.perf_counter() - start)
+                if response.status_code != 200 or not response.json().get("count"):
+                    errors += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(total)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": total,
+        "errors": errors,
+        "seconds": round(elapsed, 3),
+        "rps": round(total / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies) * 1000, 1),
+        "p95_ms": round(latencies[int(len(latencies) * 0.95) - 1] * 1000, 1),
+    }
+
+
+def main():
+    """Run the WSGI and ASGI load tests and print a comparison."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--upstream-delay", type=float, default=0.5)
+    parser.add_argument("--json", action="store_true", help="print JSON results")
+    args = parser.parse_args()
+
+    stub = start_stub_upstream(args.upstream_delay)
+    database = Path(tempfile.mkdtemp()) / "loadtest.sqlite3"
+    env = {
+        **os.environ,
+        "DATABASE_URL": f"sqlite:///{database}",
+        "SECRET_KEY": os.environ.get("SECRET_KEY", "loadtest-secret-key"),
+        "GOOGLE_BOOKS_BASE_URL": f"http://127.0.0.1:{stub.server_port}",
+        "GOOGLE_BOOKS_POOL_MAXSIZE": str(args.concurrency),
+        # Every title is unique: don't let the QPS limit turn searches away
+        "GOOGLE_BOOKS_QPS": "0",
+    }
+    cookies = prepare_database(env)
+
+    results = {}
+    for port, kind in ((8701, "wsgi"), (8702, "asgi")):
+        process = start_server(kind, port, args.workers, env)
+        try:
+            results[kind] = asyncio.run(
+                run_load(port, cookies, args.requests, args.concurrency, kind)
+            )
+        finally:
+            process.terminate()
+            process.wait()
+    stub.shutdown()
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'server':<8}{'rps':>10}{'p50 ms':>10}{'p95 ms':>10}{'errors':>8}")
+    for kind, result in results.items():
+        print(
+            f"{kind:<8}{result['rps']:>10}{result['p50_ms']:>10}"
+            f"{result['p95_ms']:>10}{result['errors']:>8}"
+        )
+
+
+if __name__ == "__main__":
+    main()
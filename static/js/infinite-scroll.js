@@ -0,0 +1,64 @@
+// Infinite scroll for cursor-paginated pages (shelves and user shelves)
+
+// Links marked with data-infinite-scroll="<container selector>" load the next
+// page as JSON and append its rendered HTML to the container instead of
+// navigating. Without JavaScript they still work as plain "next page" links.
+document.addEventListener('DOMContentLoaded', function() {
+    const link = document.querySelector('[data-infinite-scroll]');
+
+    // Only run if the page has more results to load
+    if (!link) {
+        return;
+    }
+
+    const container = document.querySelector(link.dataset.infiniteScroll);
+    let loading = false;
+
+    function loadMore() {
+        if (loading || !link.getAttribute('href')) {
+            return;
+        }
+        loading = true;
+
+        const url = new URL(link.href, window.location.href);
+        url.searchParams.set('format', 'json');
+
+        fetch(url, { headers: { 'Accept': 'application/json' } })
+            .then(function(response) {
+                if (!response.ok) {
+                    throw new Error('Request failed: ' + response.status);
+                }
+                return response.json();
+            })
+            .then(function(data) {
+                container.insertAdjacentHTML('beforeend', data.html);
+                if (data.next_cursor) {
+                    url.searchParams.set('cursor', data.next_cursor);
+                    url.searchParams.delete('format');
+                    link.href = url.toString();
+                } else {
+                    link.closest('nav').remove();
+                    observer.disconnect();
+                }
+            })
+            .catch(function(error) {
+                console.error('Error loading more results:', error);
+            })
+            .finally(function() {
+                loading = false;
+            });
+    }
+
+    link.addEventListener('click', function(event) {
+        event.preventDefault();
+        loadMore();
+    });
+
+    // Load the next page automatically as the link scrolls into view
+    const observer = new IntersectionObserver(function(entries) {
+        if (entries.some(function(entry) { return entry.isIntersecting; })) {
+            loadMore();
+        }
+    }, { rootMargin: '400px' });
+    observer.observe(link);
+});